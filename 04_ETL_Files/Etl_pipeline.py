@@ -1,11 +1,37 @@
 
 
+import argparse
 import pandas as pd
-import mysql.connector
-from datetime import datetime, timedelta
+import numpy as np
 import logging
 import os
-import re
+import io
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Shared pooled connection factory lives in the analytics package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '05_Analytics_Package'))
+
+from book_stream import BATCH_ROWS as BOOK_BATCH_ROWS, BookTransactionReader
+from date_keys import DateKeyResolver
+from digital_stream import BATCH_ROWS, DigitalUsageReader, read_digital_usage
+from bulk_audit import BulkAudit
+from dashboard_extract import DashboardExtract
+from canonical import UNKNOWN_DEPARTMENT, UNKNOWN_ROOM, Canonicalizer
+from calendar_dim import DIM_DATE_COLUMNS, DateKeyCache, build_calendar, load_holidays
+from dimension_sync import DimensionSync
+from fact_loader import make_fact_loader
+from natural_keys import SourceKeys, ensure_hash_column, ensure_hash_table
+from partitions import GRANULARITIES, FactPartitions
+from sharded import ShardedTransformer, is_sharded
+from run_report import CountingConnection, CountingCursor, RoundTrips, RunReport
+from staging_schema import FACT_DTYPES, STAGING_SCHEMAS, apply_schema, concat_staged
+from watermark import WatermarkStore
+from db_pool import get_connection
+from query_cache import bump_fact_version, ensure_version_table
+from usage_aggregates import UsageAggregates
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,9 +42,38 @@ logging.basicConfig(
     ]
 )
 
+DATE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'dim_date_keys.npz')
+DATE_FORMATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'date_formats.json')
+DASHBOARDS_DIR  = None           # dashboard extracts are opt-in (--dashboards-dir), see dashboard_extract.py
+
 class LibraryETL:
-    def __init__(self, db_config=None):
+    def __init__(self, db_config=None, fact_loader='insert', fact_batch_size=10000, commit_every=None,
+                 bulk_audit=False, holiday_file=None, date_cache_path=DATE_CACHE_PATH,
+                 date_formats_path=DATE_FORMATS_PATH,
+                 dashboards_dir=DASHBOARDS_DIR, dashboards_parquet=False, parse_in_process=False,
+                 report_path=None, metrics_path=None, alias_file=None, partition_by=None,
+                 partition_drop_foreign_keys=False):
         self.db_config = db_config or {}
+        self.fact_loader = fact_loader            # 'insert' or 'load_data', see fact_loader.py
+        self.fact_batch_size = fact_batch_size
+        self.commit_every = commit_every          # None = one transaction per load
+        self.bulk_audit = bulk_audit              # one audit row per chunk instead of per fact row
+        self.run_id = uuid.uuid4().hex
+        self.holiday_file = holiday_file          # CSV with a 'date' column, feeds dim_date.is_holiday
+        self.date_key_cache = DateKeyCache(date_cache_path)
+        self.source_keys = SourceKeys()           # source_hash of every fact row, see natural_keys.py
+        self.aliases = Canonicalizer(alias_file)  # department / room / resource-type aliases, see canonical.py
+        self.partition_by = partition_by          # 'month' / 'year' RANGE partitions on date_key, see partitions.py
+        self.partition_drop_foreign_keys = partition_drop_foreign_keys  # confirms dropping the fact table's FKs
+        self.dashboards_dir = dashboards_dir      # None = skip the dashboard extract stage
+        self.dashboards_parquet = dashboards_parquet
+        self.parse_in_process = parse_in_process  # parse digital_usage.csv in a worker process during staging
+        self.staging_timings = {}                 # source -> seconds spent extracting it
+        self.staging_errors = {}
+        self.report_path = report_path            # JSON run report, see run_report.py
+        self.metrics_path = metrics_path          # Prometheus textfile with the same figures
+        self.report = RunReport(self.run_id)
+        self.round_trips = RoundTrips()           # statements on every connection of the run
         self.connection = None
         self.cursor = None
         self.valid_date_keys = set()
@@ -27,18 +82,28 @@ class LibraryETL:
         self.valid_room_keys = set()                  
         self.student_id_to_key = {}       
         self.resource_id_to_key = {}      
+        self.department_name_to_key = {}
+        self.room_key_map = {}
         self.default_department_key = None 
+        self.date_resolver = DateKeyResolver(formats_path=date_formats_path)  # later runs reuse the detected formats
+        self.incremental = False
+        self.watermarks = None
+        self.dim_sync = None
+        self.aggregates = None
 
     # - connect
     def connect_database(self):
-        self.connection = mysql.connector.connect(
-            host=self.db_config.get('host','localhost'),
-            user=self.db_config.get('user','root'),
-            password=self.db_config.get('password',''),
-            database=self.db_config.get('database','university library analytics'),
-            auth_plugin="mysql_native_password"
+        # db_config overrides db_pool's file/env settings; close() hands the connection back to the pool
+        self.connection = get_connection(
+            allow_local_infile=(self.fact_loader == 'load_data'),
+            **self.db_config
         )
-        self.cursor = self.connection.cursor(dictionary=True)
+        if getattr(self.connection, 'dialect', 'mysql') != 'mysql' and (self.fact_loader == 'load_data' or self.bulk_audit):
+            self.connection.close()
+            raise ValueError("--fact-loader load_data and --bulk-audit need the MySQL backend")
+        self.connection.autocommit = False     # the ETL commits explicitly
+        self.cursor = CountingCursor(self.connection.cursor(dictionary=True), self.round_trips)
+        self.dim_sync = DimensionSync(self.connection, self.cursor)
         logging.info("✓ Database connected")
 
     def close_database(self):
@@ -49,19 +114,12 @@ class LibraryETL:
         logging.info("Database closed")
 
     # - helpers
-    def get_date_key(self, value):
-        if not value or str(value).upper() in ['NULL','UNKNOWN','NAN','']:
-            return 20240101
-        
-        value_str = str(value).strip()
-        for fmt in ('%Y-%m-%d','%d/%m/%Y','%m/%d/%Y','%Y/%m/%d','%d-%m-%Y'):
-            try:
-                dt = datetime.strptime(value_str, fmt)
-                dk = int(dt.strftime('%Y%m%d'))
-                return max(20100101, min(dk, 20351231))
-            except:
-                continue
-        return 20240101
+    def get_date_key(self, value, column=None):
+        return self.date_resolver.resolve_one(value, column)
+
+    def date_keys(self, series, column=None):
+        """Bulk get_date_key: int32 date_keys for a whole column, aligned to its index"""
+        return pd.Series(self.date_resolver.resolve(series, column), index=series.index)
 
     def safe_int(self, value):
         try:
@@ -76,13 +134,8 @@ class LibraryETL:
             return 0.0
 
     def standardize_room(self, value):
-        """Extract digits from any room string and return R + digits.
-        Examples: 'Room101' -> 'R101', '101' -> 'R101', 'R-101' -> 'R101'
-        """
-        if not value or str(value).upper() in ['NULL', 'UNKNOWN', '']:
-            return 'R-UNKNOWN'
-        digits = re.sub(r'\D', '', str(value))          
-        return f"R{digits}" if digits else 'R-UNKNOWN'
+        """Canonical room_key of one room string ('Room101', '101', 'R-101' -> 'R101')"""
+        return self.aliases.room(value)
 
     #  dim_date
     def fix_dim_date_table(self):
@@ -98,34 +151,19 @@ class LibraryETL:
             self.cursor.execute("DELETE FROM dim_date")
             self.connection.commit()
         
+        holidays = load_holidays(self.holiday_file)
+
         self.cursor.execute("SELECT COUNT(*) as c FROM dim_date WHERE date_key >= 20100101 AND date_key <= 20351231")
         if self.cursor.fetchone()['c'] > 9000:
             logging.info("✓ dim_date already correctly populated")
+            if holidays:
+                self.sync_holidays(holidays)
             self.load_valid_date_keys()
             return
 
         logging.info("Rebuilding dim_date (2010-2035)...")
-        start   = datetime(2010,1,1)
-        end     = datetime(2035,12,31)
-        current = start
-        rows    = []
-
-        while current <= end:
-            rows.append((
-                int(current.strftime('%Y%m%d')),
-                current.strftime('%Y-%m-%d'),
-                current.strftime('%A'),
-                current.day,
-                current.timetuple().tm_yday,
-                current.isocalendar()[1],
-                current.month,
-                current.strftime('%B'),
-                (current.month-1)//3 + 1,
-                current.year,
-                1 if current.weekday()>=5 else 0,
-                0
-            ))
-            current += timedelta(days=1)
+        calendar = build_calendar(holidays=holidays)
+        rows = list(zip(*[calendar[col].tolist() for col in DIM_DATE_COLUMNS]))
 
         self.cursor.executemany("""
             INSERT INTO dim_date
@@ -137,64 +175,83 @@ class LibraryETL:
         logging.info(f"dim_date rebuilt with {len(rows)} records")
         self.load_valid_date_keys()
 
+    def sync_holidays(self, holidays):
+        """Bring dim_date.is_holiday in line with the configured calendar file"""
+        placeholders = ', '.join(['%s'] * len(holidays))
+        self.cursor.execute(
+            f"UPDATE dim_date SET is_holiday = (date_key IN ({placeholders}))",
+            sorted(holidays)
+        )
+        if self.cursor.rowcount:
+            logging.info(f" Updated is_holiday on {self.cursor.rowcount} dim_date rows")
+        self.connection.commit()
+
+    def dim_date_checksum(self):
+        self.cursor.execute("CHECKSUM TABLE dim_date")
+        row = self.cursor.fetchone()
+        return row['Checksum'] if row else None
+
     def load_valid_date_keys(self):
+        """Valid date_keys, from the on-disk cache unless dim_date's checksum changed"""
+        checksum = self.dim_date_checksum()
+        keys = self.date_key_cache.load(checksum)
+        if keys is not None:
+            self.valid_date_keys = set(keys.tolist())
+            logging.info(f" Loaded {len(self.valid_date_keys)} valid date_keys from cache")
+            return
+
         self.cursor.execute("SELECT date_key FROM dim_date")
         self.valid_date_keys = {row['date_key'] for row in self.cursor.fetchall()}
         if self.valid_date_keys:
             logging.info(f" Loaded {len(self.valid_date_keys)} valid date_keys")
+            self.date_key_cache.save(checksum, self.valid_date_keys)
 
     # CSV parsing
     def parse_digital_usage_csv(self, path):
         """Parse the malformed digital_usage.csv file"""
         logging.info(f"Parsing {path}...")
-        
-        with open(path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        if not lines:
-            return pd.DataFrame()
-        
-        header = lines[0].strip()
-        header = re.sub(r'"+"', '', header)
-        header = header.replace('""', '')
-        
-        columns = [col.strip().strip('"') for col in header.split(';')]
-        
-        # Fix duplicate column names
-        seen = {}
-        unique_columns = []
-        for col in columns:
-            if col in seen:
-                seen[col] += 1
-                unique_columns.append(f"{col}_{seen[col]}")
-            else:
-                seen[col] = 0
-                unique_columns.append(col)
-        
-        data_rows = []
-        for line in lines[1:]:
-            line = line.strip()
-            if not line:
-                continue
-            line = re.sub(r'"+"', '"', line)
-            values = [val.strip().strip('"') for val in line.split(';')]
-            data_rows.append(values)
-        
-        df = pd.DataFrame(data_rows, columns=unique_columns)
+
+        if self.parse_in_process:
+            # The line parser is pure Python (GIL-bound), so it gets its own process
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                df = pool.submit(read_digital_usage, path).result()
+        else:
+            df = read_digital_usage(path)
         logging.info(f" Parsed {len(df)} digital usage records")
-        
+
         return df
 
-    #  staging
-    def load_staging(self, digital_path, bookings_path):
-        # Books from database
-        self.cursor.execute("SELECT * FROM book_transactions")
-        df_books = pd.DataFrame(self.cursor.fetchall()).fillna('NULL')
-        logging.info(f"Loaded {len(df_books)} book transactions")
+    def iter_digital_usage(self, path, batch_rows=BATCH_ROWS):
+        """Stream digital_usage.csv as prepared DataFrame batches of at most batch_rows rows"""
+        start = self.watermarks.resume_offset('digital_usage', path) if self.incremental else 0
+        logging.info(f"Streaming {path} from byte {start} in batches of {batch_rows} rows...")
 
-        # Digital usage
-        df_digital = self.parse_digital_usage_csv(digital_path)
-        
+        reader = DigitalUsageReader(path, batch_rows=batch_rows, start_offset=start,
+                                    complete_lines=self.incremental)
+        for batch in reader:
+            yield self.prepare_digital(batch)
+        logging.info(f" Streamed {reader.rows_read} digital usage records")
+
+        if self.incremental:
+            self.watermarks.stage_file('digital_usage', path, reader.offset)
+        elif reader.rows_read == 0:
+            yield self.prepare_digital(pd.DataFrame())
+
+    def read_room_bookings(self, path, start_offset=0):
+        """Read room_bookings.csv from start_offset (header kept); returns (df, end_offset).
+
+        Stops at the last newline: a line still being written is read by the next run.
+        """
+        with open(path, 'rb') as f:
+            header = f.readline()
+            f.seek(max(start_offset, len(header)))
+            body = f.read()
+        body = body[:body.rfind(b'\n') + 1]
+        df = pd.read_csv(io.BytesIO(header + body))
+        return df, max(start_offset, len(header)) + len(body)
+
+    def prepare_digital(self, df_digital):
+        """Normalise parsed digital usage columns to Date/ResourceType/DownloadCount/Duration_Minutes"""
         if df_digital.empty:
             df_digital = pd.DataFrame({
                 'Date': ['2024-01-01'],
@@ -226,47 +283,172 @@ class LibraryETL:
         if 'DownloadCount'   not in df_digital.columns: df_digital['DownloadCount']   = 1
         if 'Duration_Minutes' not in df_digital.columns: df_digital['Duration_Minutes'] = 30
         
-        df_digital['DownloadCount']   = df_digital['DownloadCount'].apply(self.safe_int)
-        df_digital['Duration_Minutes'] = df_digital['Duration_Minutes'].apply(self.safe_int)
+        df_digital['DownloadCount']    = self._to_int_column(df_digital['DownloadCount'])
+        df_digital['Duration_Minutes'] = self._to_int_column(df_digital['Duration_Minutes'])
+        return apply_schema(df_digital, STAGING_SCHEMAS['digital_usage'])
 
-        # Room bookings
-        df_rooms = pd.read_csv(bookings_path).fillna('NULL')
+    #  staging
+    def book_reader(self, last_id=0, batch_rows=None):
+        """BookTransactionReader on its own pooled connection (rows past last_id when incremental)"""
+        return BookTransactionReader(lambda: CountingConnection(get_connection(**self.db_config), self.round_trips),
+                                     last_id if self.incremental else None,
+                                     batch_rows or BOOK_BATCH_ROWS)
+
+    def extract_books(self, last_id=0):
+        """book_transactions from the database (rows past last_id when incremental); returns (df, watermark)"""
+        reader = self.book_reader(last_id)
+        chunks = list(reader)
+        df_books = concat_staged(chunks) if chunks else pd.DataFrame()
+        logging.info(f"Loaded {len(df_books)} book transactions")
+        return df_books, reader.mark if self.incremental else None
+
+    def stream_books(self, last_id=0, batch_rows=None):
+        """A BookTransactionReader for populate_fact_usage; only the StudentIDs are read now"""
+        reader = self.book_reader(last_id, batch_rows)
+        students = reader.student_ids()
+        logging.info(f"Streaming book_transactions in chunks of {reader.batch_rows} rows "
+                     f"({len(students)} distinct students)")
+        return reader, None
+
+    def iter_books(self, reader):
+        """Yield the reader's chunks; stages the book watermark once they are all read"""
+        for chunk in reader:
+            yield chunk
+        logging.info(f" Streamed {reader.rows_read} book transactions")
+        if self.incremental and reader.mark:
+            self.watermarks.stage('book_transactions', **reader.mark)
+
+    def extract_digital(self, path):
+        return self.prepare_digital(self.parse_digital_usage_csv(path)), None
+
+    def extract_rooms(self, path, start_offset=0, last_id=0):
+        """room_bookings.csv (from start_offset when incremental); returns (df, watermark)"""
+        mark = None
+        if self.incremental:
+            df_rooms, end = self.read_room_bookings(path, start_offset)
+            if 'BookingID' in df_rooms.columns and not df_rooms.empty:
+                ids = pd.to_numeric(df_rooms['BookingID'], errors='coerce')
+                df_rooms = df_rooms[~(ids <= last_id)].reset_index(drop=True)
+                last_id = max(last_id, int(ids.max())) if ids.notna().any() else last_id
+            mark = dict(offset=end, last_id=last_id)
+        else:
+            df_rooms = pd.read_csv(path)
         logging.info(f"Loaded {len(df_rooms)} room bookings")
         
         if 'DurationHours' not in df_rooms.columns:
             df_rooms['DurationHours'] = df_rooms.get('Duration', 1.0)
         
-        df_rooms['DurationHours'] = df_rooms['DurationHours'].apply(self.safe_float)
-        
+        # Unparsable DurationHours become nulls here and 0.0 hours in build_room_facts
+        df_rooms = apply_schema(df_rooms, STAGING_SCHEMAS['room_bookings'])
+        return df_rooms, mark
+
+    def run_extract_tasks(self, tasks):
+        """Run {source: callable} concurrently; every source is timed and its error kept separately.
+
+        Raises once all tasks have finished if any of them failed.
+        """
+        self.staging_timings = {}
+        self.staging_errors = {}
+
+        def timed(name, func):
+            start = time.perf_counter()
+            try:
+                return func()
+            finally:
+                self.staging_timings[name] = time.perf_counter() - start
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='extract') as executor:
+            futures = {name: executor.submit(timed, name, func) for name, func in tasks.items()}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    self.staging_errors[name] = e
+
+        for name in tasks:
+            secs = self.staging_timings.get(name, 0.0)
+            if name in self.staging_errors:
+                logging.error(f"  extract {name}: failed after {secs:.3f}s – {self.staging_errors[name]}")
+            else:
+                logging.info(f"  extract {name}: {secs:.3f}s")
+        if self.staging_errors:
+            failed = ', '.join(self.staging_errors)
+            raise RuntimeError(f"Extraction failed for {failed}") from next(iter(self.staging_errors.values()))
+        return results
+
+    def load_staging(self, digital_path, bookings_path, digital_batch_rows=None, book_batch_rows=None):
+        """Extract the three sources concurrently (the database read and the CSVs on separate threads).
+
+        With digital_batch_rows set, df_digital is returned as a generator of
+        batches instead of one DataFrame, so it is parsed while facts are loaded.
+        With book_batch_rows set, df_books is a BookTransactionReader that
+        streams its chunks during populate_fact_usage.
+        """
+        # Watermarks are read up front so the extract threads never share the cursor
+        book_last_id = room_offset = room_last_id = 0
+        if self.incremental:
+            book_last_id = self.watermarks.get('book_transactions').get('last_id') or 0
+            room_offset  = self.watermarks.resume_offset('room_bookings', bookings_path)
+            room_last_id = self.watermarks.get('room_bookings').get('last_id') or 0
+
+        # Digital usage is always streamed in incremental mode so the byte offset can be tracked
+        streamed = bool(digital_batch_rows or self.incremental)
+        tasks = {
+            'book_transactions': (lambda: self.stream_books(book_last_id, book_batch_rows)) if book_batch_rows
+                                 else (lambda: self.extract_books(book_last_id)),
+            'room_bookings':     lambda: self.extract_rooms(bookings_path, room_offset, room_last_id),
+        }
+        if not streamed:
+            tasks['digital_usage'] = lambda: self.extract_digital(digital_path)
+
+        start = time.perf_counter()
+        results = self.run_extract_tasks(tasks)
+        logging.info(f"✓ Staging extracted {len(tasks)} sources in {time.perf_counter() - start:.3f}s "
+                     f"(sum of sources {sum(self.staging_timings.values()):.3f}s)")
+
+        df_books, book_mark = results['book_transactions']
+        df_rooms, room_mark = results['room_bookings']
+        if book_mark:
+            self.watermarks.stage('book_transactions', **book_mark)
+        if room_mark:
+            self.watermarks.stage_file('room_bookings', bookings_path, room_mark['offset'],
+                                       last_id=room_mark['last_id'])
+
+        if streamed:
+            df_digital = self.iter_digital_usage(digital_path, digital_batch_rows or BATCH_ROWS)
+        else:
+            df_digital = results['digital_usage'][0]
+
         return df_books, df_digital, df_rooms
 
     #  dimensions
+    RESOURCE_ROWS = [
+        ('RES-BOOK',    'Physical Book', 'Book',    'Physical', 'Various', 'Various', None),
+        ('RES-E-BOOK',  'E-Book',        'E-Book',  'Digital',  'Various', 'Various', None),
+        ('RES-JOURNAL', 'Journal',       'Journal', 'Digital',  'Various', 'Various', None),
+        ('RES-ARTICLE', 'Article',       'Article', 'Digital',  'Various', 'Various', None)
+    ]
+
     def populate_dimensions(self, df_books, df_digital, df_rooms):
+        """Upsert dimension members with DimensionSync – only members missing from the
+        in-memory maps are sent, and only their keys are read back."""
 
         # ---------- dim_department ----------
-        
-        self.cursor.execute("""
-            INSERT IGNORE INTO dim_department (department_name)
-            VALUES ('Unknown')
-        """)
-        self.connection.commit()
+        # Every canonical department of the alias tables; raw values without an alias load as Unknown
+        department_rows = [(d,) for d in self.aliases.department.canonical_values]
+        self.dim_sync.sync('dim_department', department_rows, self.department_name_to_key)
 
-        # Fetch the auto-incremented department_id for 'Unknown'
-        self.cursor.execute("SELECT department_id FROM dim_department WHERE department_name = 'Unknown'")
-        dept_row = self.cursor.fetchone()
-        if dept_row:
-            self.default_department_key = dept_row['department_id']   # maps -> fact.department_key
+        self.default_department_key = self.department_name_to_key.get(UNKNOWN_DEPARTMENT)   # fallback fact.department_key
+        if self.default_department_key is not None:
             logging.info(f" Default department_key = {self.default_department_key} (from dim_department.department_id)")
         else:
-            logging.error(" Could not find 'Unknown' row in dim_department after INSERT IGNORE.")
+            logging.error(" Could not find 'Unknown' row in dim_department after sync.")
             raise Exception("No valid department_id found in dim_department")
 
         # ---------- dim_student ----------
-        self.cursor.execute(
-            "INSERT IGNORE INTO dim_student (student_id, student_type, enrollment_date, is_active) "
-            "VALUES ('UNKNOWN', 'Unknown', '2020-01-01', 1)"
-        )
-
+        if isinstance(df_books, BookTransactionReader):
+            df_books = df_books.students
         students = set()
         if 'StudentID' in df_books.columns:
             students |= set(df_books['StudentID'])
@@ -276,24 +458,12 @@ class LibraryETL:
         invalid = ['NULL','UNKNOWN','STAFF','FACULTY','DIGITAL','NAN']
         students = {s for s in students if s and not any(i in str(s).upper() for i in invalid)}
 
-        for s in sorted(students):
-            self.cursor.execute(
-                "INSERT IGNORE INTO dim_student (student_id, student_type, enrollment_date, is_active) "
-                "VALUES (%s, 'Student', '2024-01-01', 1)",
-                (s,)
-            )
-        
-        self.connection.commit()
-        logging.info(f" Inserted {len(students)} students")
-
-        # Load student_id -> student_key mapping
-        self.cursor.execute("SELECT student_key, student_id FROM dim_student")
-        for row in self.cursor.fetchall():
-            self.student_id_to_key[row['student_id']] = row['student_key']
-        logging.info(f" Loaded {len(self.student_id_to_key)} student mappings")
+        student_rows = [('UNKNOWN', 'Unknown', '2020-01-01', 1)]
+        student_rows += [(s, 'Student', '2024-01-01', 1) for s in sorted(students)]
+        inserted = self.dim_sync.sync('dim_student', student_rows, self.student_id_to_key)
+        logging.info(f" Inserted {inserted} students, {len(self.student_id_to_key)} student mappings")
 
         # ---------- dim_room ----------
-        
         self.cursor.execute("""
             DELETE FROM dim_room
             WHERE room_key != 'R-UNKNOWN'
@@ -302,237 +472,466 @@ class LibraryETL:
         self.connection.commit()
         logging.info("  Cleaned junk rows from dim_room")
 
-        # Insert the fallback row first
-        self.cursor.execute(
-            "INSERT IGNORE INTO dim_room (room_key, room_number, room_description, capacity, is_active) "
-            "VALUES ('R-UNKNOWN', 'UNKNOWN', 'Unknown', NULL, 1)"
-        )
-
-        # Insert one canonical row per unique room in the source CSV
+        # Fallback row first, then one canonical row per unique room in the source CSV
+        room_rows = [(UNKNOWN_ROOM, 'UNKNOWN', 'Unknown', None, 1)]
         if 'RoomNumber' in df_rooms.columns:
-            for r in sorted(set(df_rooms['RoomNumber'])):
-                rk = self.standardize_room(r)          
-                if rk == 'R-UNKNOWN':
-                    continue                           
-                self.cursor.execute(
-                    "INSERT IGNORE INTO dim_room (room_key, room_number, room_description, capacity, is_active) "
-                    "VALUES (%s, %s, 'Study Room', NULL, 1)",
-                    (rk, rk)
-                )
-
-        self.connection.commit()
+            for rk in sorted(self.aliases.room.column(df_rooms['RoomNumber']).unique()):
+                if rk != UNKNOWN_ROOM:
+                    room_rows.append((rk, rk, 'Study Room', None, 1))
+        self.dim_sync.sync('dim_room', room_rows, self.room_key_map)
 
         # Cache valid room_keys so we can validate before fact insert
-        self.cursor.execute("SELECT room_key FROM dim_room")
-        self.valid_room_keys = {row['room_key'] for row in self.cursor.fetchall()}
-        logging.info(f" dim_room rebuilt – valid keys: {sorted(self.valid_room_keys)}")
+        self.valid_room_keys = set(self.room_key_map)
+        logging.info(f" dim_room synced – {len(self.valid_room_keys)} valid keys")
 
         # ---------- dim_resource ----------
-        resource_inserts = [
-            ('RES-BOOK',    'Physical Book', 'Book',    'Physical', 'Various', 'Various', None),
-            ('RES-E-BOOK',  'E-Book',        'E-Book',  'Digital',  'Various', 'Various', None),
-            ('RES-JOURNAL', 'Journal',       'Journal', 'Digital',  'Various', 'Various', None),
-            ('RES-ARTICLE', 'Article',       'Article', 'Digital',  'Various', 'Various', None)
-        ]
-        
-        for res_id, res_name, res_type, res_cat, author, pub, year in resource_inserts:
-            self.cursor.execute(
-                "INSERT IGNORE INTO dim_resource "
-                "(resource_id, resource_name, resource_type, resource_category, author, publisher, publication_year) "
-                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
-                (res_id, res_name, res_type, res_cat, author, pub, year)
-            )
-
-        self.connection.commit()
-        
-        # Load resource_id -> resource_key mapping
-        self.cursor.execute("SELECT resource_key, resource_id FROM dim_resource")
-        for row in self.cursor.fetchall():
-            self.resource_id_to_key[row['resource_id']] = row['resource_key']
-        
+        self.dim_sync.sync('dim_resource', self.RESOURCE_ROWS, self.resource_id_to_key)
         logging.info(f"✓ Loaded {len(self.resource_id_to_key)} resource mappings")
-        logging.info(f"  Resource IDs: {list(self.resource_id_to_key.keys())}")
         
         # Cache valid key sets for validation
-        self.cursor.execute("SELECT student_key FROM dim_student")
-        self.valid_student_keys = {row['student_key'] for row in self.cursor.fetchall()}
-        
-        self.cursor.execute("SELECT resource_key FROM dim_resource")
-        self.valid_resource_keys = {row['resource_key'] for row in self.cursor.fetchall()}
+        self.valid_student_keys  = set(self.student_id_to_key.values())
+        self.valid_resource_keys = set(self.resource_id_to_key.values())
         
-        logging.info(f"✓ Dimensions populated")
+        logging.info(f"✓ Dimensions populated ({self.dim_sync.round_trips} round trips so far)")
         logging.info(f"  Valid students:    {len(self.valid_student_keys)}")
         logging.info(f"  Valid resources:   {len(self.valid_resource_keys)}")
-        logging.info(f"  department_key:    {self.default_department_key}")
+        logging.info(f"  Departments:       {len(self.department_name_to_key)} (Unknown = {self.default_department_key})")
 
     #  fact table
-    def populate_fact_usage(self, df_books, df_digital, df_rooms):
+    # Column order of every fact record (matches the INSERT column list)
+    FACT_COLUMNS = ['date_key', 'student_key', 'department_key', 'resource_key', 'room_key',
+                    'time_slot_key', 'duration_minutes', 'quantity', 'purpose', 'source_hash']
+
+    def _column(self, df, name, default):
+        """Return df[name] as a Series (last one if the name is duplicated), or a constant Series"""
+        if name not in df.columns:
+            return pd.Series(default, index=df.index, dtype=object)
+        col = df[name]
+        if isinstance(col, pd.DataFrame):
+            col = col.iloc[:, -1]
+        return col
+
+    def _to_float_column(self, series):
+        """Column version of safe_float: anything unparsable becomes 0.0"""
+        values = pd.to_numeric(series, errors='coerce').astype('float64')
+        return values.fillna(0.0)
+
+    def _to_int_column(self, series):
+        """Column version of safe_int: int(float(v)), 0 for unparsable or non-finite values"""
+        values = self._to_float_column(series)
+        values = values.where(np.isfinite(values), 0.0)
+        return np.trunc(values).astype('int64')
+
+    def _department_keys(self, series):
+        """department_key per raw department name (canonicalized once per distinct name)"""
+        keys = self.aliases.department.column(series, self.department_name_to_key)
+        return keys.where(keys.notna(), self.default_department_key)
+
+    def _student_keys(self, series):
+        unknown_key = self.student_id_to_key.get('UNKNOWN')
+        keys = series.map(self.student_id_to_key)
+        return keys.astype(object).where(keys.notna(), unknown_key)
+
+    def _fact_frame(self, index, **columns):
+        """Fact columns in their compact FACT_DTYPES (nullable ints, categorical text)"""
+        frame = pd.DataFrame(index=index)
+        for col in self.FACT_COLUMNS:
+            value = columns.get(col)
+            if not isinstance(value, pd.Series):
+                value = pd.Series(value, index=index, dtype=object)
+            frame[col] = value.astype(FACT_DTYPES[col])
+        return frame
+
+    def _apply_checks(self, frame, checks, skipped):
+        """Drop rows failing a check; each row is counted against the first check it fails"""
+        keep = pd.Series(True, index=frame.index)
+        for counter, failed in checks:
+            hit = keep & failed
+            skipped[counter] += int(hit.sum())
+            keep &= ~hit
+        return frame[keep]
+
+    def build_book_facts(self, df_books, skipped):
+        date_keys    = self.date_keys(self._column(df_books, 'CheckoutDate', None), 'CheckoutDate')
+        student_keys = self._student_keys(self._column(df_books, 'StudentID', None))
+        resource_key = self.resource_id_to_key.get('RES-BOOK')
+
+        frame = self._fact_frame(df_books.index,
+                                 date_key=date_keys, student_key=student_keys,
+                                 department_key=self._department_keys(self._column(df_books, 'Department', None)),
+                                 resource_key=resource_key,
+                                 duration_minutes=0, quantity=1, purpose='Book Transaction',
+                                 source_hash=self.source_keys.hashes('book', df_books, 'TransactionID'))
+        resource_invalid = resource_key is None or resource_key not in self.valid_resource_keys
+        return self._apply_checks(frame, [
+            ('no_date',     ~date_keys.isin(self.valid_date_keys)),
+            ('no_student',  student_keys.isna() | ~student_keys.isin(self.valid_student_keys)),
+            ('no_resource', pd.Series(resource_invalid, index=frame.index)),
+        ], skipped)
+
+    def build_digital_facts(self, df_digital, skipped):
+        date_keys = self.date_keys(self._column(df_digital, 'Date', None), 'Date')
+
+        resource_keys = self.aliases.resource_type.column(self._column(df_digital, 'ResourceType', 'E-Book'),
+                                                          self.resource_id_to_key)
+        student_key   = self.student_id_to_key.get('UNKNOWN')
+
+        frame = self._fact_frame(df_digital.index,
+                                 date_key=date_keys, student_key=student_key,
+                                 department_key=self._department_keys(self._column(df_digital, 'Faculty', None)),
+                                 resource_key=resource_keys,
+                                 duration_minutes=self._to_int_column(self._column(df_digital, 'Duration_Minutes', 0)),
+                                 quantity=self._to_int_column(self._column(df_digital, 'DownloadCount', 0)),
+                                 purpose='Digital Usage',
+                                 source_hash=self.source_keys.hashes('digital', df_digital, offsets=df_digital.index))
+        return self._apply_checks(frame, [
+            ('no_date',     ~date_keys.isin(self.valid_date_keys)),
+            ('no_student',  pd.Series(student_key is None, index=frame.index)),
+            ('no_resource', resource_keys.isna()),
+        ], skipped)
+
+    def build_room_facts(self, df_rooms, skipped):
+        date_keys    = self.date_keys(self._column(df_rooms, 'BookingDate', None), 'BookingDate')
+        student_keys = self._student_keys(self._column(df_rooms, 'StudentID', None))
+
+        # Rooms missing from dim_room fall back to R-UNKNOWN
+        room_keys = self.aliases.room.column(self._column(df_rooms, 'RoomNumber', UNKNOWN_ROOM))
+        room_keys = room_keys.where(room_keys.isin(self.valid_room_keys), UNKNOWN_ROOM)
+
+        hours = self._to_float_column(self._column(df_rooms, 'DurationHours', 1.0))
+        frame = self._fact_frame(df_rooms.index,
+                                 date_key=date_keys, student_key=student_keys,
+                                 department_key=self.default_department_key,
+                                 room_key=room_keys,
+                                 duration_minutes=self._to_int_column(hours * 60),
+                                 quantity=0,
+                                 purpose=self._column(df_rooms, 'Purpose', 'Study').astype(str),
+                                 source_hash=self.source_keys.hashes('room', df_rooms, 'BookingID'))
+        return self._apply_checks(frame, [
+            ('no_date',    ~date_keys.isin(self.valid_date_keys)),
+            ('no_student', student_keys.isna()),
+        ], skipped)
+
+    def fact_records(self, frame):
+        """Turn a fact frame into a list of tuples (FACT_COLUMNS order) with plain Python values (NULL -> None)"""
+        columns = []
+        for col in self.FACT_COLUMNS:
+            values = frame[col].astype(object)
+            columns.append(values.where(values.notna(), None).tolist())
+        return list(zip(*columns))
+
+    def iter_fact_frames(self, df_books, df_digital, df_rooms, skipped, sharder=None, loaded=None):
+        """Yield fact frames source by source.
+
+        df_digital may be one DataFrame or an iterable of batches, df_books
+        one DataFrame or a BookTransactionReader (see load_staging); batches
+        and chunks are transformed one at a time. With a
+        sharded.ShardedTransformer the digital and room files are
+        transformed by its worker pool and arrive as one merged frame.
+        loaded() returns the rows the caller's loader has inserted so far;
+        with it the per-source logs count inserted rows, not built ones.
+        """
+        def added(start, built):
+            return f"Added {loaded() - start}" if loaded else f"Built {built}"
+
+        self.source_keys.reset()
+        start = loaded() if loaded else 0
+        if isinstance(df_books, pd.DataFrame):
+            logging.info(f"Processing {len(df_books)} book transactions...")
+            books = self.build_book_facts(df_books, skipped)
+            yield books
+            logging.info(f"  ✓ {added(start, len(books))} book records")
+        else:
+            built = 0
+            for chunk in self.iter_books(df_books):
+                books = self.build_book_facts(chunk, skipped)
+                built += len(books)
+                yield books
+            logging.info(f"  ✓ {added(start, built)} book records")
+
+        start = loaded() if loaded else 0
+        if sharder:
+            shards = sharder.transform(skipped)
+            yield shards
+            logging.info(f"   {added(start, len(shards))} digital + room records from shard files")
+            return
+
+        batches = [df_digital] if isinstance(df_digital, pd.DataFrame) else df_digital
+        seen = built = 0
+        for batch in batches:
+            digital = self.build_digital_facts(batch, skipped)
+            seen  += len(batch)
+            built += len(digital)
+            yield digital
+        logging.info(f"Processed {seen} digital usage records...")
+        logging.info(f"   {added(start, built)} digital records")
+
+        logging.info(f"Processing {len(df_rooms)} room bookings...")
+        start = loaded() if loaded else 0
+        rooms = self.build_room_facts(df_rooms, skipped)
+        yield rooms
+        logging.info(f"   {added(start, len(rooms))} room records")
+
+        self.date_resolver.log_detected()
+        self.date_resolver.save_detected()
+        self.aliases.log_unmatched()
+
+    def build_fact_records(self, df_books, df_digital, df_rooms, sharder=None):
+        """Columnar fact builder – returns (records, skipped)"""
+        skipped = {'no_date': 0, 'no_student': 0, 'no_resource': 0, 'no_room': 0}
+        records = []
+        for frame in self.iter_fact_frames(df_books, df_digital, df_rooms, skipped, sharder):
+            records.extend(self.fact_records(frame))
+        return records, skipped
+
+    def populate_fact_usage(self, df_books, df_digital, df_rooms, sharder=None):
 
         # Safety gate – we cannot proceed without a department_key
         if self.default_department_key is None:
             logging.error(" default_department_key is None – aborting fact insert")
             return
 
-        records = []
-        skipped = {'no_date': 0, 'no_student': 0, 'no_resource': 0, 'no_room': 0}
+        # Frames are inserted as they are built, so streamed batches never pile up in memory
+        audit = None
+        if self.bulk_audit:
+            audit = BulkAudit(self.connection, self.cursor, self.run_id)
+            audit.ensure_schema()
+            audit.begin()
 
-        # ---- Books ----
-        logging.info(f"Processing {len(df_books)} book transactions...")
-        for _, r in df_books.iterrows():
-            date_key    = self.get_date_key(r.get('CheckoutDate'))
-            student_id  = r.get('StudentID')
-            student_key = self.student_id_to_key.get(student_id,
-                              self.student_id_to_key.get('UNKNOWN'))
-            resource_key = self.resource_id_to_key.get('RES-BOOK')
-            
-            if date_key not in self.valid_date_keys:
-                skipped['no_date'] += 1; continue
-            if student_key is None or student_key not in self.valid_student_keys:
-                skipped['no_student'] += 1; continue
-            if resource_key is None or resource_key not in self.valid_resource_keys:
-                skipped['no_resource'] += 1; continue
-
-            # Tuple order matches the INSERT column list below:
-            
-            records.append((
-                date_key,
-                student_key,
-                self.default_department_key,   
-                resource_key,                  
-                None,                          
-                None,                          
-                0,                             
-                1,                             
-                'Book Transaction'             
-            ))
-
-        logging.info(f"  ✓ Added {sum(1 for r in records if r[8] == 'Book Transaction')} book records")
-
-        # ---- Digital ----
-        logging.info(f"Processing {len(df_digital)} digital usage records...")
-        
-        resource_type_map = {
-            'E-Book':  'RES-E-BOOK',
-            'E-book':  'RES-E-BOOK',
-            'e-Book':  'RES-E-BOOK',
-            'ebook':   'RES-E-BOOK',
-            'Journal': 'RES-JOURNAL',
-            'journal': 'RES-JOURNAL',
-            'Article': 'RES-ARTICLE',
-            'article': 'RES-ARTICLE',
-        }
-        
-        for idx, r in df_digital.iterrows():
-            date_key = self.get_date_key(r.get('Date'))
-            
-            res_type_raw = r.get('ResourceType', 'E-Book')
-            if isinstance(res_type_raw, pd.Series):
-                resource_type = str(res_type_raw.iloc[-1] if len(res_type_raw) > 0 else 'E-Book').strip()
-            else:
-                resource_type = str(res_type_raw).strip()
-            
-            resource_id  = resource_type_map.get(resource_type, 'RES-E-BOOK')
-            resource_key = self.resource_id_to_key.get(resource_id)
-            student_key  = self.student_id_to_key.get('UNKNOWN')
-            
-            if date_key not in self.valid_date_keys:
-                skipped['no_date'] += 1; continue
-            if student_key is None:
-                skipped['no_student'] += 1; continue
-            if resource_key is None:
-                skipped['no_resource'] += 1; continue
-
-            records.append((
-                date_key,
-                student_key,
-                self.default_department_key,
-                resource_key,
-                None,                                          
-                None,                                          
-                self.safe_int(r.get('Duration_Minutes', 0)),
-                self.safe_int(r.get('DownloadCount', 0)),
-                'Digital Usage'
-            ))
-
-        logging.info(f"   Added {sum(1 for r in records if r[8] == 'Digital Usage')} digital records")
-
-        # ---- Rooms ----
-        logging.info(f"Processing {len(df_rooms)} room bookings...")
-        for _, r in df_rooms.iterrows():
-            date_key    = self.get_date_key(r.get('BookingDate'))
-            student_id  = r.get('StudentID')
-            student_key = self.student_id_to_key.get(student_id,
-                              self.student_id_to_key.get('UNKNOWN'))
-            room_key    = self.standardize_room(r.get('RoomNumber', 'R-UNKNOWN'))
-
-            # Validate room_key exists in dim_room; fall back to R-UNKNOWN if not
-            if room_key not in self.valid_room_keys:
-                logging.debug(f"  room_key '{room_key}' not in dim_room, falling back to R-UNKNOWN")
-                room_key = 'R-UNKNOWN'
-            
-            if date_key not in self.valid_date_keys:
-                skipped['no_date'] += 1; continue
-            if student_key is None:
-                skipped['no_student'] += 1; continue
-
-            records.append((
-                date_key,
-                student_key,
-                self.default_department_key,
-                None,                                                     
-                room_key,                                                  
-                None,                                                      
-                int(self.safe_float(r.get('DurationHours', 1.0)) * 60),
-                0,
-                str(r.get('Purpose', 'Study'))
-            ))
-
-        logging.info(f"   Added {sum(1 for r in records if r[8] not in ['Book Transaction','Digital Usage'])} room records")
-        logging.info(f"\n Total records prepared: {len(records)}")
-        logging.info(f"  Skipped – no_date: {skipped['no_date']}, no_student: {skipped['no_student']}, "
-                     f"no_resource: {skipped['no_resource']}, no_room: {skipped['no_room']}")
-        
-        if len(records) == 0:
-            logging.error(" No valid records to insert!")
-            return
-        
-        # Column order MUST match the tuple order built above
-        self.cursor.executemany("""
-            INSERT INTO fact_library_usage
-            (date_key, student_key, department_key, resource_key, room_key,
-             time_slot_key, duration_minutes, quantity, purpose)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, records)
-        self.connection.commit()
-        logging.info(f"\n fact_library_usage populated with {len(records)} records!")
+        try:
+            # Summary tables are folded per batch and always committed together with the facts
+            self.aggregates.start()
+
+            def before_commit():
+                self.aggregates.fold()
+                bump_fact_version(self.cursor)
+
+            skipped = {'no_date': 0, 'no_student': 0, 'no_resource': 0, 'no_room': 0}
+            # Rows whose source_hash is already in the table were loaded by an earlier run
+            loader = make_fact_loader(self.fact_loader, self.connection, self.cursor, self.FACT_COLUMNS,
+                                      batch_size=self.fact_batch_size, commit_every=self.commit_every,
+                                      audit=audit, before_commit=before_commit, skip_duplicates=True)
+            try:
+                for frame in self.iter_fact_frames(df_books, df_digital, df_rooms, skipped, sharder,
+                                                   loaded=lambda: loader.rows_loaded):
+                    records = self.fact_records(frame)
+                    if records:
+                        loader.load(records)
+                        self.aggregates.fold()
+            finally:
+                if audit:
+                    audit.end()
+            total = loader.rows_loaded
+            skipped['duplicate'] = loader.rows_skipped
+            stage = self.report.current
+            stage.rows_in, stage.rows_out, stage.skipped = total + sum(skipped.values()), total, skipped
+
+            logging.info(f"\n Total records prepared: {total}")
+            logging.info(f"  Skipped – no_date: {skipped['no_date']}, no_student: {skipped['no_student']}, "
+                         f"no_resource: {skipped['no_resource']}, no_room: {skipped['no_room']}, "
+                         f"already loaded: {skipped['duplicate']}")
+
+            # Watermarks go into the same transaction as the facts they describe
+            if self.incremental:
+                self.watermarks.save()
+                if total == 0:
+                    self.connection.commit()
+                    logging.info(" No new source rows since the last run")
+                    return
+        
+            if total == 0:
+                if skipped['duplicate']:
+                    self.connection.commit()
+                    logging.info(" Every record was already loaded by an earlier run")
+                else:
+                    logging.error(" No valid records to insert!")
+                return
+        
+            # New version stamp invalidates cached analytics results (see query_cache.py)
+            before_commit()
+            self.connection.commit()
+            logging.info(f"  {loader.summary()}")
+            logging.info(f"\n fact_library_usage populated with {total} records!")
+        finally:
+            if audit:
+                # The trigger DDL commits implicitly, so a failed load is rolled back first
+                self.connection.rollback()
+                audit.restore()
 
     #  orchestrator
-    def run_etl(self, digital_path, bookings_path):
+    def run_etl(self, digital_path, bookings_path, digital_batch_rows=None, incremental=False,
+                rebuild_aggregates=False, rebuild_dashboards=False, workers=None, book_batch_rows=None):
+        """Full reload by default; incremental=True only loads source rows past the stored watermarks.
+
+        digital_path / bookings_path may also be globs or lists of files; they
+        are then transformed in parallel by a sharded.ShardedTransformer.
+        """
+        sharder = None
+        if is_sharded(digital_path) or is_sharded(bookings_path):
+            if incremental:
+                raise ValueError("Sharded multi-file mode only supports full loads")
+            sharder = ShardedTransformer(self, digital_path, bookings_path, workers)
+        self.run_id = uuid.uuid4().hex
+        self.round_trips = RoundTrips()
+        self.report = RunReport(self.run_id, round_trips=lambda: self.round_trips.count,
+                                incremental=incremental, sharded=bool(sharder))
+        report = self.report
+        error = None
         try:
+            self.incremental = incremental
             self.connect_database()
-            self.fix_dim_date_table()
-            df_books, df_digital, df_rooms = self.load_staging(digital_path, bookings_path)
-            self.populate_dimensions(df_books, df_digital, df_rooms)
-            self.populate_fact_usage(df_books, df_digital, df_rooms)
+            ensure_version_table(self.cursor)
+            ensure_hash_column(self.cursor)
+            ensure_hash_table(self.cursor)
+            FactPartitions(self.connection, self.cursor, self.partition_by,
+                           allow_drop_foreign_keys=self.partition_drop_foreign_keys).ensure()
+            self.aggregates = UsageAggregates(self.cursor)
+            if self.aggregates.ensure_tables() or rebuild_aggregates:
+                self.aggregates.rebuild()
+                bump_fact_version(self.cursor)
+            self.connection.commit()
+            if incremental:
+                self.watermarks = WatermarkStore(self.connection, self.cursor)
+                self.watermarks.ensure_table()
+            with report.stage('fix_dim_date_table') as stage:
+                self.fix_dim_date_table()
+                stage.rows_in = stage.rows_out = len(self.valid_date_keys)
+            with report.stage('load_staging') as stage:
+                if sharder:
+                    # Only books are staged here; the shard files are read by the worker processes
+                    df_books, _ = (self.stream_books(batch_rows=book_batch_rows) if book_batch_rows
+                                   else self.extract_books())
+                    df_digital, df_rooms = None, sharder.collect_members()
+                else:
+                    df_books, df_digital, df_rooms = self.load_staging(digital_path, bookings_path,
+                                                                       digital_batch_rows, book_batch_rows)
+                    self.source_keys = SourceKeys(digital=os.path.basename(digital_path),
+                                                  room=os.path.basename(bookings_path))
+                # Streamed digital batches and book chunks are only read (and counted) by populate_fact_usage
+                stage.rows_in = stage.rows_out = sum(len(df) for df in (df_books, df_digital, df_rooms)
+                                                     if isinstance(df, pd.DataFrame))
+            with report.stage('populate_dimensions') as stage:
+                self.populate_dimensions(df_books, df_digital, df_rooms)
+                # A streamed book reader only contributes its distinct StudentIDs
+                stage.rows_in = sum(len(df) for df in (getattr(df_books, 'students', df_books), df_digital, df_rooms)
+                                    if isinstance(df, pd.DataFrame))
+                stage.rows_out = (len(self.department_name_to_key) + len(self.student_id_to_key) +
+                                  len(self.room_key_map) + len(self.resource_id_to_key))
+            with report.stage('populate_fact_usage'):
+                self.populate_fact_usage(df_books, df_digital, df_rooms, sharder)
+            if self.dashboards_dir:
+                with report.stage('dashboard_extract') as stage:
+                    stage.rows_in, stage.rows_out = DashboardExtract(
+                        self.connection, self.cursor, self.dashboards_dir,
+                        parquet=self.dashboards_parquet).run(rebuild=rebuild_dashboards)
             self.close_database()
             
             
             logging.info(" ETL COMPLETED SUCCESSFULLY ")
             
         except Exception as e:
+            error = e
             logging.error(f" ETL FAILED: {e}")
             import traceback
             traceback.print_exc()
             if self.connection:
                 self.close_database()
             raise
+        finally:
+            report.finish(error)
+            self.write_run_report()
+
+    def write_run_report(self):
+        """Write the JSON / Prometheus run report; a failed write never fails the run"""
+        try:
+            if self.report_path:
+                self.report.write_json(self.report_path)
+                logging.info(f"  Run report written to {self.report_path}")
+            if self.metrics_path:
+                self.report.write_prometheus(self.metrics_path)
+        except OSError as e:
+            logging.warning(f"  Could not write the run report: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="University library ETL")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only load source rows added since the last run")
+    parser.add_argument('--digital-batch-rows', type=int, default=None,
+                        help="stream digital_usage.csv in batches of this many rows")
+    parser.add_argument('--book-batch-rows', type=int, default=None,
+                        help="stream book_transactions from the database in chunks of this many rows")
+    parser.add_argument('--fact-loader', choices=['insert', 'load_data'], default='insert',
+                        help="how fact rows are sent to the database")
+    parser.add_argument('--fact-batch-size', type=int, default=10000,
+                        help="rows per INSERT / LOAD DATA chunk")
+    parser.add_argument('--commit-every', type=int, default=None,
+                        help="commit after this many fact rows (default: one transaction)")
+    parser.add_argument('--bulk-audit', action='store_true',
+                        help="write one audit_log row per loaded chunk instead of one per fact row "
+                             "(the per-row audit triggers are swapped for the load and restored after it)")
+    parser.add_argument('--holiday-file', default=None,
+                        help="CSV calendar with a 'date' column used for dim_date.is_holiday")
+    parser.add_argument('--alias-file', default=None,
+                        help="CSV of kind,alias,canonical rows extending the department/room/resource-type aliases")
+    parser.add_argument('--partition-by', choices=GRANULARITIES, default=None,
+                        help="RANGE-partition fact_library_usage on date_key by month or year (MySQL only)")
+    parser.add_argument('--partition-drop-foreign-keys', action='store_true',
+                        help="confirm that --partition-by may drop fact_library_usage's FOREIGN KEYs "
+                             "fk_fact_date/student/department/resource/room/activity_type/time_slot "
+                             "(InnoDB cannot partition a table with them; they are not restored – "
+                             "find orphaned keys with partitions.py --check-orphans)")
+    parser.add_argument('--rebuild-aggregates', action='store_true',
+                        help="recompute the agg_usage_* summary tables from the whole fact table")
+    parser.add_argument('--digital-files', nargs='+', default=None,
+                        help="digital_usage files or globs (one per branch) – enables sharded mode")
+    parser.add_argument('--room-files', nargs='+', default=None,
+                        help="room_bookings files or globs (one per branch) – enables sharded mode")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for sharded mode (default: all cores)")
+    parser.add_argument('--parse-in-process', action='store_true',
+                        help="parse digital_usage.csv in a separate process while the other sources load")
+    parser.add_argument('--dashboards-dir', default=DASHBOARDS_DIR,
+                        help="write the Executive/Operational dashboard extracts to this directory "
+                             "(off by default; the tracked 06_Dashboards CSVs use a different total_usage)")
+    parser.add_argument('--dashboards-parquet', action='store_true',
+                        help="also write a .parquet copy of each dashboard extract")
+    parser.add_argument('--rebuild-dashboards', action='store_true',
+                        help="regenerate the dashboard extracts from the whole fact table")
+    parser.add_argument('--backend', choices=['mysql', 'duckdb'], default=None,
+                        help="database backend (default: db_pool settings; duckdb = embedded file)")
+    parser.add_argument('--db-path', default=None,
+                        help="DuckDB database file for --backend duckdb")
+    parser.add_argument('--report-file', default='etl_run_report.json',
+                        help="JSON run report with per-stage timings, memory, rows and round trips")
+    parser.add_argument('--metrics-file', default=None,
+                        help="also write the run report as a Prometheus textfile (node_exporter)")
+    args = parser.parse_args()
+
     base = os.path.dirname(os.path.abspath(__file__))
-    etl  = LibraryETL()
+    db_config = {k: v for k, v in (('backend', args.backend), ('path', args.db_path)) if v is not None}
+    etl  = LibraryETL(db_config=db_config,
+                      fact_loader=args.fact_loader,
+                      fact_batch_size=args.fact_batch_size,
+                      commit_every=args.commit_every,
+                      bulk_audit=args.bulk_audit,
+                      holiday_file=args.holiday_file,
+                      alias_file=args.alias_file,
+                      partition_by=args.partition_by,
+                      partition_drop_foreign_keys=args.partition_drop_foreign_keys,
+                      dashboards_dir=args.dashboards_dir,
+                      dashboards_parquet=args.dashboards_parquet,
+                      parse_in_process=args.parse_in_process,
+                      report_path=args.report_file,
+                      metrics_path=args.metrics_file)
     etl.run_etl(
-        os.path.join(base, "digital_usage.csv"),
-        os.path.join(base, "room_bookings.csv")
+        args.digital_files or os.path.join(base, "digital_usage.csv"),
+        args.room_files or os.path.join(base, "room_bookings.csv"),
+        digital_batch_rows=args.digital_batch_rows,
+        book_batch_rows=args.book_batch_rows,
+        incremental=args.incremental,
+        rebuild_aggregates=args.rebuild_aggregates,
+        rebuild_dashboards=args.rebuild_dashboards,
+        workers=args.workers
     )
 
 if __name__ == "__main__":
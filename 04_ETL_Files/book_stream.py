@@ -0,0 +1,99 @@
+"""Chunked extract of book_transactions from the database.
+
+extract_books() used to fetchall() the table through the ETL's dictionary
+cursor and build a DataFrame from the dicts, so every row was held twice.
+BookTransactionReader reads it through an unbuffered tuple cursor with
+fetchmany() instead and yields typed DataFrame chunks (apply_schema) of
+at most `batch_rows` rows.
+
+The reader opens its own connection through `connect`: an unbuffered
+MySQL result ties up its connection until it has been read to the end,
+while the ETL keeps loading facts on its connection between chunks.
+student_ids() fetches only the distinct StudentIDs, which is all
+populate_dimensions needs before the rows are streamed.
+"""
+
+import pandas as pd
+
+from staging_schema import STAGING_SCHEMAS, apply_schema
+
+BATCH_ROWS = 50000           # rows per fetchmany() / yielded DataFrame
+
+SCHEMA = STAGING_SCHEMAS['book_transactions']
+
+
+class BookTransactionReader:
+    """Iterate book_transactions as typed DataFrame chunks.
+
+    With last_id set only rows past that TransactionID are read, in id
+    order; after iteration `mark` holds the watermark of the rows read.
+    """
+
+    def __init__(self, connect, last_id=None, batch_rows=BATCH_ROWS):
+        self.connect    = connect          # () -> connection, closed again by the reader
+        self.last_id    = last_id
+        self.batch_rows = batch_rows
+        self.rows_read  = 0
+        self.max_id     = None
+        self.max_date   = None
+        self.students   = None             # set by student_ids()
+
+    def _query(self, columns):
+        if self.last_id is None:
+            return f"SELECT {columns} FROM book_transactions", None
+        return (f"SELECT {columns} FROM book_transactions WHERE TransactionID > %s ORDER BY TransactionID",
+                (self.last_id,))
+
+    def student_ids(self):
+        """Distinct StudentIDs of the rows the reader will return, as a one-column staged frame"""
+        sql, params = self._query('DISTINCT StudentID')
+        if self.last_id is not None:
+            sql = sql.replace(' ORDER BY TransactionID', '')
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+        self.students = apply_schema(pd.DataFrame.from_records(rows, columns=['StudentID']), SCHEMA)
+        return self.students
+
+    def __iter__(self):
+        sql, params = self._query('*')
+        conn = self.connect()
+        try:
+            cursor = conn.cursor(buffered=False)
+            cursor.execute(sql, params)
+            columns = list(cursor.column_names)
+            rows = cursor.fetchmany(self.batch_rows)
+            try:
+                while rows:
+                    chunk = pd.DataFrame.from_records(rows, columns=columns)
+                    self._track(chunk)
+                    yield apply_schema(chunk, SCHEMA)
+                    rows = cursor.fetchmany(self.batch_rows)
+            finally:
+                # A connection with an unread result cannot go back to the pool
+                while rows:
+                    rows = cursor.fetchmany(self.batch_rows)
+                cursor.close()
+        finally:
+            conn.close()
+
+    def _track(self, chunk):
+        self.rows_read += len(chunk)
+        ids = pd.to_numeric(chunk['TransactionID'], errors='coerce').dropna()
+        dates = chunk['CheckoutDate'].dropna()
+        if len(ids):
+            self.max_id = max(self.max_id or 0, int(ids.max()))
+        if len(dates):
+            self.max_date = max(self.max_date, dates.max()) if self.max_date is not None else dates.max()
+
+    @property
+    def mark(self):
+        """Watermark for WatermarkStore.stage('book_transactions', ...), None if nothing was read"""
+        if self.max_id is None:
+            return None
+        return dict(last_id=self.max_id, last_date=self.max_date)
@@ -0,0 +1,155 @@
+"""Batch audit mode for bulk fact loads.
+
+The dump's trg_audit_*_fact triggers write one audit_log row per fact row.
+For the duration of a bulk load ensure_schema() re-creates them with a
+guard that only holds for the ETL account (the login the ETL connects
+with) in a session that has set @etl_bulk_audit, and restore() puts the
+original trigger bodies back once the load is committed or rolled back.
+Every other account – analysts, RBAC roles, manual fixes – is audited per
+row exactly as before, whatever variables it sets. The ETL session writes
+one 'BULK INSERT' audit row per loaded chunk instead, with the run id,
+row count and the chunk's actual usage_key range.
+
+The guard tests USER(), the session's login: inside a trigger
+CURRENT_USER() is the trigger's DEFINER, not the account writing the row.
+Run bulk loads under a dedicated ETL account – if the ETL connects as
+root, every root session can switch the per-row audit off.
+
+The triggers are swapped while the fact and audit tables are write-locked,
+so no other session can write a fact row between DROP and CREATE. A run
+killed before restore() leaves the guarded triggers installed; the next
+bulk load then restores the dump's trigger bodies instead. Restored
+triggers are re-created with the ETL account as their DEFINER.
+"""
+
+import logging
+
+AUDIT_COLUMNS = {
+    'run_id':    "varchar(32) DEFAULT NULL",
+    'row_count': "int(11) DEFAULT NULL",
+    'key_from':  "bigint DEFAULT NULL",
+    'key_to':    "bigint DEFAULT NULL",
+}
+
+FACT_TRIGGERS = {
+    'trg_audit_insert_fact': ('INSERT', 'AFTER INSERT'),
+    'trg_audit_update_fact': ('UPDATE', 'AFTER UPDATE'),
+    'trg_audit_delete_fact': ('DELETE', 'AFTER DELETE'),
+}
+
+GUARD = '@etl_bulk_audit'
+
+
+class BulkAudit:
+    def __init__(self, connection, cursor, run_id, table='fact_library_usage'):
+        self.connection = connection
+        self.cursor     = cursor
+        self.run_id     = run_id
+        self.table      = table
+        self.chunks     = 0
+        self.last_key   = 0            # highest usage_key before the next chunk
+        self.originals  = {}           # trigger name -> body to restore (None = no trigger)
+
+    def _plain_body(self, action):
+        """The dump's per-row trigger body"""
+        return (f"INSERT INTO audit_log(username, action_type, object_name) "
+                f"VALUES (USER(), '{action}', '{self.table}')")
+
+    def _trigger_body(self, action, account):
+        return (f"INSERT INTO audit_log(username, action_type, object_name) "
+                f"SELECT USER(), '{action}', '{self.table}' FROM DUAL "
+                f"WHERE {GUARD} IS NULL OR SUBSTRING_INDEX(USER(), '@', 1) <> '{account}'")
+
+    def ensure_schema(self):
+        """Add the summary columns to audit_log and install the guarded triggers (DDL – commits)"""
+        self.cursor.execute(
+            "SELECT COLUMN_NAME AS c FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'audit_log'"
+        )
+        existing = {row['c'] for row in self.cursor.fetchall()}
+        for col, ddl in AUDIT_COLUMNS.items():
+            if col not in existing:
+                self.cursor.execute(f"ALTER TABLE audit_log ADD COLUMN {col} {ddl}")
+                logging.info(f"  audit_log: added column {col}")
+
+        current = self._current_triggers()
+        # A guarded body left by a run that never restored is replaced by the dump's
+        self.originals = {}
+        for name, (action, _) in FACT_TRIGGERS.items():
+            body = current.get(name)
+            self.originals[name] = self._plain_body(action) if body and GUARD in body else body
+        self.cursor.execute("SELECT SUBSTRING_INDEX(USER(), '@', 1) AS account")
+        account = self.cursor.fetchone()['account'].replace("'", "''")
+        if account == 'root':
+            logging.warning("  bulk audit as root: any root session can skip the per-row audit – "
+                            "use a dedicated ETL account")
+
+        guarded = {name: self._trigger_body(action, account) for name, (action, _) in FACT_TRIGGERS.items()}
+        self._install(current, guarded)
+        logging.info(f"  installed guarded audit triggers (bypass for account {account})")
+
+    def _current_triggers(self):
+        """{trigger name: body} of the fact table's triggers"""
+        self.cursor.execute(
+            "SELECT TRIGGER_NAME AS t, ACTION_STATEMENT AS s FROM information_schema.TRIGGERS "
+            "WHERE TRIGGER_SCHEMA = DATABASE() AND EVENT_OBJECT_TABLE = %s",
+            (self.table,)
+        )
+        return {row['t']: row['s'] for row in self.cursor.fetchall()}
+
+    def _install(self, current, bodies):
+        """Re-create the triggers whose body differs from bodies[name] (None = drop it) – DDL, commits"""
+        stale = {name: body for name, body in bodies.items()
+                 if (current.get(name) or '').strip() != (body or '').strip()}
+        if not stale:
+            self.connection.commit()
+            return
+        # Writers wait on the lock, so every fact row is audited by the old or the new trigger
+        self.cursor.execute(f"LOCK TABLES {self.table} WRITE, audit_log WRITE")
+        try:
+            for name, body in stale.items():
+                self.cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                if body is not None:
+                    self.cursor.execute(f"CREATE TRIGGER {name} {FACT_TRIGGERS[name][1]} ON {self.table} "
+                                        f"FOR EACH ROW {body}")
+        finally:
+            self.cursor.execute("UNLOCK TABLES")
+        self.connection.commit()
+
+    def restore(self):
+        """Put the original per-row triggers back (DDL – commits: call after the load is committed or rolled back)"""
+        if not self.originals:
+            return
+        self._install(self._current_triggers(), self.originals)
+        self.originals = {}
+        logging.info("  restored the per-row audit triggers")
+
+    def _max_key(self):
+        self.cursor.execute(f"SELECT COALESCE(MAX(usage_key), 0) AS k FROM {self.table}")
+        return int(self.cursor.fetchone()['k'])
+
+    def begin(self):
+        self.cursor.execute(f"SET {GUARD} = %s", (self.run_id,))
+        self.last_key = self._max_key()
+        logging.info(f"  bulk audit mode on (run {self.run_id})")
+
+    def record_chunk(self, rows):
+        """One summary row for the chunk just inserted (call right after the INSERT/LOAD DATA)"""
+        # The real key range: skipped duplicates and auto-increment gaps make LAST_INSERT_ID() + rows wrong
+        self.cursor.execute(
+            f"SELECT MIN(usage_key) AS lo, MAX(usage_key) AS hi FROM {self.table} WHERE usage_key > %s",
+            (self.last_key,)
+        )
+        keys = self.cursor.fetchone()
+        self.cursor.execute(
+            "INSERT INTO audit_log(username, action_type, object_name, run_id, row_count, key_from, key_to) "
+            "VALUES (USER(), 'BULK INSERT', %s, %s, %s, %s, %s)",
+            (self.table, self.run_id, rows, keys['lo'], keys['hi'])
+        )
+        if keys['hi'] is not None:
+            self.last_key = int(keys['hi'])
+        self.chunks += 1
+
+    def end(self):
+        self.cursor.execute(f"SET {GUARD} = NULL")
+        logging.info(f"  bulk audit mode off – {self.chunks} summary audit rows written")
@@ -0,0 +1,85 @@
+"""dim_date generation and the on-disk date_key cache.
+
+build_calendar() produces the whole 2010-2035 calendar in one vectorised
+pass over a pandas date_range. Holidays come from an optional CSV file
+with a `date` column (any format DateKeyResolver understands) and an
+optional `name` column.
+
+DateKeyCache stores the valid date_keys as a compact int32 array next to
+the CHECKSUM TABLE value of dim_date, so the ETL only re-reads dim_date
+when the table actually changed.
+"""
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from date_keys import DateKeyResolver
+
+CALENDAR_START = '2010-01-01'
+CALENDAR_END   = '2035-12-31'
+
+DIM_DATE_COLUMNS = ['date_key', 'full_date', 'day_of_week', 'day_of_month', 'day_of_year', 'week_of_year',
+                    'month', 'month_name', 'quarter', 'year', 'is_weekend', 'is_holiday']
+
+
+def load_holidays(path):
+    """Set of holiday date_keys from a CSV calendar file (empty if no file is configured)"""
+    if not path:
+        return set()
+    df = pd.read_csv(path, dtype=str)
+    if 'date' not in df.columns:
+        raise ValueError(f"Holiday calendar {path} needs a 'date' column")
+    keys = DateKeyResolver(default_key=0).resolve(df['date'].dropna())
+    holidays = {int(k) for k in keys if k}
+    logging.info(f" Loaded {len(holidays)} holidays from {path}")
+    return holidays
+
+
+def build_calendar(start=CALENDAR_START, end=CALENDAR_END, holidays=()):
+    """dim_date rows for every day in [start, end] as a DataFrame in DIM_DATE_COLUMNS order"""
+    days = pd.date_range(start, end, freq='D')
+    date_key = days.year * 10000 + days.month * 100 + days.day
+
+    return pd.DataFrame({
+        'date_key':     date_key,
+        'full_date':    days.strftime('%Y-%m-%d'),
+        'day_of_week':  days.day_name(),
+        'day_of_month': days.day,
+        'day_of_year':  days.dayofyear,
+        'week_of_year': days.isocalendar().week.to_numpy(),
+        'month':        days.month,
+        'month_name':   days.month_name(),
+        'quarter':      days.quarter,
+        'year':         days.year,
+        'is_weekend':   (days.weekday >= 5).astype(int),
+        'is_holiday':   np.isin(date_key, list(holidays)).astype(int),
+    }, columns=DIM_DATE_COLUMNS)
+
+
+class DateKeyCache:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, checksum):
+        """Cached date_keys if the cache was written for this checksum, else None"""
+        if checksum is None or not os.path.exists(self.path):
+            return None
+        try:
+            with np.load(self.path) as data:
+                if str(data['checksum']) != str(checksum):
+                    return None
+                return data['keys']
+        except (OSError, KeyError, ValueError) as e:
+            logging.warning(f" Ignoring unreadable date_key cache {self.path}: {e}")
+            return None
+
+    def save(self, checksum, keys):
+        if checksum is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp.npz'
+        np.savez(tmp, keys=np.asarray(sorted(keys), dtype=np.int32), checksum=str(checksum))
+        os.replace(tmp, self.path)
@@ -0,0 +1,151 @@
+"""Canonical departments, rooms and resource types.
+
+The sources spell the same member several ways: "CS", "CompSci" and
+"Computer Science"; "R-102", "Room102" and "R102"; "E-book" and "e-Book".
+Each AliasTable maps raw values to one canonical value:
+
+  1. the raw value is folded (case, spaces and punctuation dropped) and
+     looked up in the alias table,
+  2. values without an alias go through the table's fallback rule (rooms:
+     R + the digits of the value) or become the table's default.
+
+Every distinct raw value is resolved once and cached; column() applies
+the result to a whole Series by code/hash lookup, so the rule never runs
+per row.
+
+The built-in tables can be extended with a CSV file (--alias-file) with
+the columns kind (department / room / resource_type), alias and canonical:
+
+    kind,alias,canonical
+    department,Comp Eng,Engineering
+    room,Library Annex,R201
+"""
+
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN_DEPARTMENT = 'Unknown'
+UNKNOWN_ROOM       = 'R-UNKNOWN'
+
+# canonical value -> aliases (the canonical value itself always matches)
+DEPARTMENT_ALIASES = {
+    'Business':         ['BUS', 'BSNS', 'Biz'],
+    'Chemistry':        ['CHEM', 'Chem'],
+    'Computer Science': ['CS', 'CompSci', 'Comp Sci', 'CSE'],
+    'Engineering':      ['ENG', 'Engr', 'Engg'],
+    'Mathematics':      ['MATH', 'Maths'],
+    'Physics':          ['PHY', 'PHYS'],
+    UNKNOWN_DEPARTMENT: ['NULL', 'NAN', ''],
+}
+ROOM_ALIASES = {
+    UNKNOWN_ROOM:       ['NULL', 'UNKNOWN', 'NAN', ''],
+}
+# resource type -> dim_resource.resource_id
+RESOURCE_TYPE_ALIASES = {
+    'RES-E-BOOK':       ['E-Book', 'ebook', 'Electronic Book'],
+    'RES-JOURNAL':      ['Journal', 'E-Journal'],
+    'RES-ARTICLE':      ['Article', 'Paper'],
+}
+
+_FOLD = re.compile(r'[\W_]+')
+
+
+def fold(value):
+    """Lookup form of a raw value: casefolded, without spaces or punctuation"""
+    return _FOLD.sub('', str(value).casefold())
+
+
+def room_number(value):
+    """R + the digits of a room string ('Room101', 'R-101', '101' -> 'R101')"""
+    digits = re.sub(r'\D', '', str(value))
+    return f"R{digits}" if digits else UNKNOWN_ROOM
+
+
+class AliasTable:
+    def __init__(self, aliases, default, fallback=None):
+        self.default  = default
+        self.fallback = fallback             # rule for values without an alias, None -> default
+        self.lookup   = {}
+        self.cache    = {}                   # raw value -> canonical value
+        self.unmatched = set()
+        for canonical, names in aliases.items():
+            self.add(canonical, canonical)
+            for name in names:
+                self.add(name, canonical)
+
+    def add(self, alias, canonical):
+        self.lookup[fold(alias)] = canonical
+        self.cache.clear()
+
+    @property
+    def canonical_values(self):
+        return sorted(set(self.lookup.values()))
+
+    def __call__(self, value):
+        try:
+            return self.cache[value]
+        except KeyError:
+            pass
+        if value is None or pd.isna(value):
+            return self.default
+        canonical = self.lookup.get(fold(value))
+        if canonical is None:
+            if self.fallback is not None:
+                canonical = self.fallback(value)
+            else:
+                canonical = self.default
+                self.unmatched.add(str(value))
+        self.cache[value] = canonical
+        return canonical
+
+    def column(self, series, keys=None):
+        """Canonical value of every element – or keys.get(canonical value), e.g. a dimension
+        key map – resolved once per distinct value"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+        # code -1 (missing) picks the trailing default
+        values = [self(u) for u in uniques] + [self.default]
+        if keys is not None:
+            values = [keys.get(v) for v in values]
+        mapped = np.array(values, dtype=object)
+        return pd.Series(mapped[codes], index=series.index, dtype=object)
+
+
+class Canonicalizer:
+    """The department, room and resource-type tables of one ETL run"""
+
+    KINDS = ('department', 'room', 'resource_type')
+
+    def __init__(self, alias_file=None):
+        self.department    = AliasTable(DEPARTMENT_ALIASES, UNKNOWN_DEPARTMENT)
+        self.room          = AliasTable(ROOM_ALIASES, UNKNOWN_ROOM, fallback=room_number)
+        self.resource_type = AliasTable(RESOURCE_TYPE_ALIASES, 'RES-E-BOOK')
+        if alias_file:
+            self.load(alias_file)
+
+    def load(self, path):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        missing = {'kind', 'alias', 'canonical'} - set(df.columns)
+        if missing:
+            raise ValueError(f"Alias file {path} needs the columns kind, alias, canonical")
+        for kind, alias, canonical in df[['kind', 'alias', 'canonical']].itertuples(index=False):
+            kind = kind.strip()
+            if kind not in self.KINDS:
+                raise ValueError(f"Alias file {path}: unknown kind '{kind}' (choose from {', '.join(self.KINDS)})")
+            getattr(self, kind).add(alias.strip(), canonical.strip())
+        logging.info(f" Loaded {len(df)} aliases from {path}")
+
+    def log_unmatched(self, limit=10):
+        """Warn about raw departments / resource types that fell back to the default"""
+        for kind in ('department', 'resource_type'):
+            table = getattr(self, kind)
+            if table.unmatched:
+                values = sorted(table.unmatched)
+                more = f" (+{len(values) - limit} more)" if len(values) > limit else ''
+                logging.warning(f"  {len(values)} unrecognised {kind} values mapped to '{table.default}': "
+                                f"{', '.join(values[:limit])}{more} – add them to the alias file")
@@ -0,0 +1,194 @@
+"""Bulk date_key resolution for the library ETL.
+
+Source files repeat the same few hundred dates over and over, in a mix of
+formats ('2024-01-15', '01/15/2024', 'Jan 25, 2024', '15-Jan-2024').
+DateKeyResolver works on a whole column at once: every distinct string is
+parsed once (vectorised, one format at a time) and memoised, so later
+batches only pay for strings they have not seen before.
+
+Ambiguous strings such as '01/02/2024' depend on the format order, so the
+order is detected once per column, from all distinct values of the first
+batch, and kept for every later batch of that column. With `formats_path`
+the detected orders are saved (save_detected) and reused by later runs, so
+an incremental run does not guess again from a handful of new rows. The
+memo is kept per format order: the same string may resolve differently
+in two columns, but never differently within one.
+"""
+
+import json
+import logging
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DATE_KEY = 20240101
+MIN_DATE_KEY     = 20100101
+MAX_DATE_KEY     = 20351231
+
+# Tried in this order unless a column shows a different dominant format
+DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%d/%m/%Y',
+    '%m/%d/%Y',
+    '%Y/%m/%d',
+    '%d-%m-%Y',
+    '%b %d, %Y',    # Jan 25, 2024
+    '%d-%b-%Y',     # 15-Jan-2024
+    '%B %d, %Y',    # January 25, 2024
+    '%d %b %Y',     # 25 Jan 2024
+    '%d %B %Y',     # 25 January 2024
+)
+
+NULL_TOKENS = {'', 'NULL', 'UNKNOWN', 'NAN', 'NAT', 'NONE', '<NA>'}
+
+
+class DateKeyResolver:
+    def __init__(self, formats=DATE_FORMATS, default_key=DEFAULT_DATE_KEY,
+                 min_key=MIN_DATE_KEY, max_key=MAX_DATE_KEY, max_cache=200000, formats_path=None):
+        self.formats      = tuple(formats)
+        self.default_key  = default_key
+        self.min_key      = min_key
+        self.max_key      = max_key
+        self.max_cache    = max_cache
+        self.formats_path = formats_path   # JSON file with the detected orders of earlier runs
+        self.caches       = {}             # format order -> {raw string -> date_key}
+        self.detected     = {}             # column name -> format order used
+        if formats_path and os.path.exists(formats_path):
+            self.load_detected()
+
+    # - helpers
+    def clamp(self, key):
+        return max(self.min_key, min(int(key), self.max_key))
+
+    def _normalize(self, value):
+        """Return a date_key for date objects, otherwise the stripped string to parse"""
+        if isinstance(value, (datetime, date)):
+            return self.clamp(value.year * 10000 + value.month * 100 + value.day)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return self.default_key
+        return str(value).strip()
+
+    def _parse_slow(self, text, formats):
+        for fmt in formats:
+            try:
+                dt = datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            return self.clamp(dt.year * 10000 + dt.month * 100 + dt.day)
+        return self.default_key
+
+    def detect_formats(self, strings):
+        """Order the candidate formats by how many of the (distinct) strings they parse"""
+        values = pd.Index([s for s in strings if s.upper() not in NULL_TOKENS])
+        if len(values) == 0:
+            return self.formats
+        hits = []
+        for i, fmt in enumerate(self.formats):
+            parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+            hits.append((-int(parsed.notna().sum()), i, fmt))
+        return tuple(fmt for _, _, fmt in sorted(hits))
+
+    def formats_for(self, column, strings):
+        """Format order of a column – detected from `strings` the first time the column is seen"""
+        if column is not None and column in self.detected:
+            return self.detected[column]
+        formats = self.detect_formats(strings)
+        if column is not None:
+            self.detected[column] = formats
+        return formats
+
+    def _cache(self, formats, pending=0):
+        if sum(len(c) for c in self.caches.values()) + pending > self.max_cache:
+            self.caches.clear()
+        return self.caches.setdefault(formats, {})
+
+    def _parse_new(self, strings, formats, cache):
+        """Parse strings missing from `cache`, one vectorised pass per format of `formats`"""
+        remaining = [s for s in strings if s.upper() not in NULL_TOKENS]
+        for s in strings:
+            if s.upper() in NULL_TOKENS:
+                cache[s] = self.default_key
+
+        for fmt in formats:
+            if not remaining:
+                break
+            index  = pd.Index(remaining)
+            parsed = pd.to_datetime(index, format=fmt, errors='coerce')
+            ok     = np.asarray(parsed.notna())
+            if not ok.any():
+                continue
+            good = parsed[ok]
+            keys = np.clip(good.year * 10000 + good.month * 100 + good.day, self.min_key, self.max_key)
+            cache.update(zip(index[ok], keys.tolist()))
+            remaining = index[~ok].tolist()
+
+        # Whatever pandas could not handle (e.g. out-of-range years) gets the scalar path
+        for s in remaining:
+            cache[s] = self._parse_slow(s, formats)
+
+    # - public API
+    def resolve(self, values, column=None):
+        """Resolve a column of raw date values to an int32 array of date_keys"""
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            # Staged columns are already dictionary-encoded – resolve the categories only
+            codes, uniques = values.cat.codes.to_numpy(), list(values.cat.categories)
+        else:
+            codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+
+        normalized = [self._normalize(u) for u in uniques]
+        strings = sorted({v for v in normalized if isinstance(v, str)})
+        formats = self.formats_for(column, strings)
+        cache = self.caches.get(formats, {})
+        pending = [s for s in strings if s not in cache]
+        if pending:
+            cache = self._cache(formats, len(pending))
+            self._parse_new([s for s in strings if s not in cache], formats, cache)
+
+        unique_keys = np.fromiter(
+            (v if isinstance(v, int) else cache[v] for v in normalized),
+            dtype=np.int32, count=len(normalized)
+        )
+        if len(unique_keys) == 0:
+            return np.full(len(codes), self.default_key, dtype=np.int32)
+        keys = unique_keys[np.maximum(codes, 0)]
+        keys[codes < 0] = self.default_key
+        return keys
+
+    def resolve_one(self, value, column=None):
+        """Scalar resolve; uses the column's detected format order if there is one"""
+        v = self._normalize(value)
+        if isinstance(v, int):
+            return v
+        formats = self.detected.get(column, self.formats)
+        cache = self.caches.get(formats, {})
+        if v not in cache:
+            cache = self._cache(formats, 1)
+            self._parse_new([v], formats, cache)
+        return cache[v]
+
+    def log_detected(self):
+        for column, formats in self.detected.items():
+            logging.info(f"  date format for {column}: {formats[0]}")
+
+    def load_detected(self):
+        try:
+            with open(self.formats_path, encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f" Ignoring unreadable date format file {self.formats_path}: {e}")
+            return
+        # Only orders of formats this resolver knows are reused
+        known = set(self.formats)
+        self.detected.update({column: tuple(order) for column, order in stored.items()
+                              if set(order) == known and len(order) == len(known)})
+
+    def save_detected(self):
+        if not self.formats_path or not self.detected:
+            return
+        os.makedirs(os.path.dirname(self.formats_path) or '.', exist_ok=True)
+        tmp = self.formats_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({column: list(order) for column, order in self.detected.items()}, f, indent=2)
+        os.replace(tmp, self.formats_path)
@@ -0,0 +1,141 @@
+"""Streaming parser for the malformed digital_usage.csv export.
+
+The file is semicolon separated with every field wrapped in doubled quotes
+("Date;""UserType"";""ResourceType""..."), so pandas.read_csv cannot read it
+directly. Instead of loading the whole file with readlines(), the file is
+read in fixed-size byte chunks and yielded as DataFrame batches of at most
+`batch_rows` rows, which keeps memory bounded for multi-GB exports. Every
+batch is indexed by the byte offset at which each row's line starts
+(natural_keys.py keys digital rows by it).
+"""
+
+import re
+
+import pandas as pd
+
+CHUNK_BYTES  = 1 << 20        # 1 MiB per read()
+BATCH_ROWS   = 50000          # rows per yielded DataFrame
+OFFSET_INDEX = 'line_offset'  # batch index: byte offset at which each row's line starts
+
+_QUOTES = re.compile(r'"+"')
+
+
+def parse_header(line):
+    """Column names from the header line, duplicates renamed to name_1, name_2, ..."""
+    header = _QUOTES.sub('', line.strip())
+    header = header.replace('""', '')
+    columns = [col.strip().strip('"') for col in header.split(';')]
+
+    seen = {}
+    unique_columns = []
+    for col in columns:
+        if col in seen:
+            seen[col] += 1
+            unique_columns.append(f"{col}_{seen[col]}")
+        else:
+            seen[col] = 0
+            unique_columns.append(col)
+    return unique_columns
+
+
+def parse_line(line):
+    """Field values of one data line ("" unescaped, quotes stripped)"""
+    line = _QUOTES.sub('"', line)
+    return [val.strip().strip('"') for val in line.split(';')]
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        return f.readline().decode('utf-8')
+
+
+def iter_lines(path, chunk_bytes=CHUNK_BYTES, start_offset=0, complete_only=False):
+    """Yield (line, end_offset) for each line of `path` from start_offset, reading chunk_bytes at a time.
+
+    With complete_only a last line without a newline (still being written) is not returned.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start_offset)
+        pos  = start_offset
+        tail = b''
+        while True:
+            chunk = f.read(chunk_bytes)
+            if not chunk:
+                break
+            lines = (tail + chunk).split(b'\n')
+            tail = lines.pop()
+            for line in lines:
+                pos += len(line) + 1
+                yield line.decode('utf-8'), pos
+        if tail and not complete_only:
+            pos += len(tail)
+            yield tail.decode('utf-8'), pos
+
+
+class DigitalUsageReader:
+    """Iterate digital_usage.csv as DataFrame batches.
+
+    start_offset lets an incremental run skip the part of the file it has
+    already loaded; after iteration `offset` is the byte position reached.
+    complete_lines stops at the last newline, so that offset never points
+    into a line that is still being appended. Batches are indexed by the
+    start offset of each row's line.
+    """
+
+    def __init__(self, path, batch_rows=BATCH_ROWS, chunk_bytes=CHUNK_BYTES, start_offset=0,
+                 complete_lines=False):
+        self.path           = path
+        self.batch_rows     = batch_rows
+        self.chunk_bytes    = chunk_bytes
+        self.start          = start_offset
+        self.offset         = start_offset
+        self.rows_read      = 0
+        self.complete_lines = complete_lines
+
+    def __iter__(self):
+        lines = iter_lines(self.path, self.chunk_bytes, self.start, self.complete_lines)
+        if self.start > 0:
+            columns = parse_header(read_header(self.path))
+        else:
+            columns = None
+            for line, pos in lines:
+                columns = parse_header(line)
+                self.offset = pos
+                break
+            if columns is None:
+                return
+
+        rows, starts = [], []
+        line_start = self.offset
+        for line, pos in lines:
+            line = line.strip()
+            if line:
+                rows.append(parse_line(line))
+                starts.append(line_start)
+            line_start = pos
+            if len(rows) >= self.batch_rows:
+                self.rows_read += len(rows)
+                self.offset = pos
+                yield self._frame(rows, starts, columns)
+                rows, starts = [], []
+            elif not rows:
+                self.offset = pos
+        if rows:
+            self.rows_read += len(rows)
+            self.offset = pos
+            yield self._frame(rows, starts, columns)
+
+    @staticmethod
+    def _frame(rows, starts, columns):
+        return pd.DataFrame(rows, columns=columns, index=pd.Index(starts, dtype='int64', name=OFFSET_INDEX))
+
+
+def iter_digital_usage(path, batch_rows=BATCH_ROWS, chunk_bytes=CHUNK_BYTES, start_offset=0):
+    """Yield the parsed file as DataFrame batches of at most `batch_rows` rows"""
+    return iter(DigitalUsageReader(path, batch_rows, chunk_bytes, start_offset))
+
+
+def read_digital_usage(path, batch_rows=BATCH_ROWS):
+    """The whole file as one DataFrame (empty if it has no rows) – module level so process pools can run it"""
+    batches = list(iter_digital_usage(path, batch_rows))
+    return pd.concat(batches) if batches else pd.DataFrame()
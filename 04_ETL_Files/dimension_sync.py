@@ -0,0 +1,93 @@
+"""Set-based dimension upserts.
+
+Instead of one INSERT IGNORE per member followed by a full re-read of the
+dimension, DimensionSync
+  1. drops members already present in the caller's in-memory key map,
+  2. bulk-loads the rest into a temporary copy of the dimension,
+  3. inserts the ones the dimension does not have yet with one
+     INSERT ... SELECT ... LEFT JOIN, and
+  4. reads back the surrogate keys of just that batch to patch the map.
+That is four round trips per batch of `batch_size` members.
+"""
+
+import logging
+
+# table -> (surrogate key column, natural key column, insertable columns)
+DIMENSIONS = {
+    'dim_department': ('department_id', 'department_name', ['department_name']),
+    'dim_student':    ('student_key', 'student_id',
+                       ['student_id', 'student_type', 'enrollment_date', 'is_active']),
+    'dim_room':       ('room_key', 'room_key',
+                       ['room_key', 'room_number', 'room_description', 'capacity', 'is_active']),
+    'dim_resource':   ('resource_key', 'resource_id',
+                       ['resource_id', 'resource_name', 'resource_type', 'resource_category',
+                        'author', 'publisher', 'publication_year']),
+}
+
+
+class DimensionSync:
+    def __init__(self, connection, cursor, batch_size=1000):
+        self.connection = connection
+        self.cursor     = cursor
+        self.batch_size = batch_size
+        self.round_trips = 0
+
+    def _execute(self, sql, params=None):
+        self.round_trips += 1
+        self.cursor.execute(sql, params)
+
+    def _executemany(self, sql, rows):
+        self.round_trips += 1
+        self.cursor.executemany(sql, rows)
+
+    def sync(self, table, rows, key_map):
+        """Make sure every row exists in `table` and key_map[natural] holds its surrogate key.
+
+        rows are tuples in DIMENSIONS[table] column order. Returns the number
+        of members that were actually inserted.
+        """
+        key_col, natural_col, columns = DIMENSIONS[table]
+        nat_idx = columns.index(natural_col)
+
+        pending = {}
+        for row in rows:
+            natural = row[nat_idx]
+            if natural not in key_map and natural not in pending:
+                pending[natural] = row
+        if not pending:
+            return 0
+
+        tmp      = f"tmp_{table}"
+        col_list = ', '.join(columns)
+        inserted = 0
+
+        self._execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {tmp} LIKE {table}")
+        members = list(pending.values())
+        for start in range(0, len(members), self.batch_size):
+            batch = members[start:start + self.batch_size]
+
+            self._execute(f"DELETE FROM {tmp}")
+            self._executemany(
+                f"INSERT INTO {tmp} ({col_list}) VALUES ({', '.join(['%s'] * len(columns))})",
+                batch
+            )
+            self._execute(
+                f"INSERT INTO {table} ({col_list}) "
+                f"SELECT {', '.join('t.' + c for c in columns)} FROM {tmp} t "
+                f"LEFT JOIN {table} d ON d.{natural_col} = t.{natural_col} "
+                f"WHERE d.{natural_col} IS NULL"
+            )
+            inserted += max(self.cursor.rowcount, 0)
+
+            # Older dumps can hold duplicate natural keys (dim_resource has no unique index) – take the first
+            self._execute(
+                f"SELECT MIN(d.{key_col}) AS k, d.{natural_col} AS n FROM {table} d "
+                f"JOIN {tmp} t ON d.{natural_col} = t.{natural_col} GROUP BY d.{natural_col}"
+            )
+            for row in self.cursor.fetchall():
+                key_map[row['n']] = row['k']
+
+        self._execute(f"DROP TEMPORARY TABLE IF EXISTS {tmp}")
+        self.connection.commit()
+        logging.info(f"  {table}: {len(pending)} candidates, {inserted} new")
+        return inserted
@@ -0,0 +1,185 @@
+"""Pluggable loaders for fact_library_usage.
+
+Both strategies load in chunks of `batch_size` rows, log rows/sec per
+chunk and commit every `commit_every` rows (None = leave the commit to
+the caller, i.e. one transaction for the whole load). With an `audit`
+(bulk_audit.BulkAudit) one summary audit row is written per chunk.
+With skip_duplicates, rows whose source_hash (see natural_keys.py) is
+already recorded in `hash_table`, or repeats an earlier row of the chunk,
+are filtered out before the chunk is sent; they are counted in
+rows_skipped. The new hashes are inserted into `hash_table` before the
+facts, in the same transaction, so its primary key fails a concurrent
+load of the same rows. The chunk itself is loaded without IGNORE, so a
+foreign key violation, a truncated or an invalid value still fails the
+load instead of being counted as "already loaded".
+
+    insert     multi-row INSERTs (mysql.connector rewrites executemany on an
+               INSERT ... VALUES into one multi-row statement per chunk)
+    load_data  each chunk is written to a TSV file and sent with
+               LOAD DATA LOCAL INFILE – needs allow_local_infile on the
+               connection and local_infile=ON on the server. LOCAL loads
+               turn bad rows into warnings, so any warning fails the load.
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from natural_keys import HASH_COLUMN, HASH_TABLE
+
+
+class FactLoader:
+    name = None
+
+    def __init__(self, connection, cursor, columns, table='fact_library_usage',
+                 batch_size=10000, commit_every=None, audit=None, before_commit=None,
+                 skip_duplicates=False, hash_table=HASH_TABLE):
+        self.connection   = connection
+        self.cursor       = cursor
+        self.columns      = list(columns)
+        self.table        = table
+        self.batch_size   = batch_size
+        self.commit_every = commit_every
+        self.audit        = audit          # optional bulk_audit.BulkAudit
+        self.before_commit = before_commit # called inside the transaction before each interim commit
+        self.skip_duplicates = skip_duplicates
+        self.hash_table   = hash_table     # source_hash of every loaded row, see natural_keys.py
+        self.rows_loaded  = 0
+        self.rows_skipped = 0
+        self.chunks       = 0
+        self.seconds      = 0.0
+        self._uncommitted = 0
+
+    def _load_chunk(self, chunk):
+        """Send one chunk; returns the number of rows inserted"""
+        raise NotImplementedError
+
+    def _inserted(self, chunk):
+        rowcount = self.cursor.rowcount
+        return len(chunk) if rowcount is None or rowcount < 0 else rowcount
+
+    def _new_rows(self, chunk):
+        """The rows of chunk whose source_hash is not recorded yet (first occurrence only)"""
+        pos = self.columns.index(HASH_COLUMN)
+        hashes = {row[pos] for row in chunk if row[pos] is not None}
+        loaded = set()
+        if hashes:
+            self.cursor.execute(
+                f"SELECT {HASH_COLUMN} AS h FROM {self.hash_table} "
+                f"WHERE {HASH_COLUMN} IN ({', '.join(['%s'] * len(hashes))})",
+                tuple(hashes)
+            )
+            loaded = {row['h'] for row in self.cursor.fetchall()}
+        rows = []
+        for row in chunk:
+            if row[pos] is not None:
+                if row[pos] in loaded:
+                    continue
+                loaded.add(row[pos])
+            rows.append(row)
+        return rows
+
+    def _record_hashes(self, rows):
+        """Record the rows' hashes; a concurrent load of the same rows fails on the primary key"""
+        pos = self.columns.index(HASH_COLUMN)
+        hashes = [(row[pos],) for row in rows if row[pos] is not None]
+        if hashes:
+            self.cursor.executemany(f"INSERT INTO {self.hash_table} ({HASH_COLUMN}) VALUES (%s)", hashes)
+
+    def load(self, records):
+        """Load a list of tuples in FACT_COLUMNS order"""
+        for start in range(0, len(records), self.batch_size):
+            chunk = records[start:start + self.batch_size]
+            t0 = time.perf_counter()
+            rows = chunk
+            if self.skip_duplicates:
+                rows = self._new_rows(chunk)
+                self._record_hashes(rows)
+            inserted = self._load_chunk(rows) if rows else 0
+            if self.audit and inserted:
+                self.audit.record_chunk(inserted)
+            secs = time.perf_counter() - t0
+
+            self.chunks       += 1
+            self.rows_loaded  += inserted
+            self.rows_skipped += len(chunk) - inserted
+            self.seconds      += secs
+            self._uncommitted += inserted
+            skipped = f", {len(chunk) - inserted} already loaded" if inserted < len(chunk) else ''
+            logging.info(f"  [{self.name}] chunk {self.chunks}: {len(chunk)} rows in {secs:.3f}s "
+                         f"({len(chunk) / max(secs, 1e-9):,.0f} rows/sec{skipped})")
+
+            if self.commit_every and self._uncommitted >= self.commit_every:
+                if self.before_commit:
+                    self.before_commit()
+                self.connection.commit()
+                self._uncommitted = 0
+
+    def summary(self):
+        rows = self.rows_loaded + self.rows_skipped
+        rate = rows / self.seconds if self.seconds else 0.0
+        skipped = f", {self.rows_skipped} already loaded" if self.rows_skipped else ''
+        return (f"[{self.name}] {rows} rows in {self.chunks} chunks, {self.seconds:.2f}s "
+                f"({rate:,.0f} rows/sec{skipped})")
+
+
+class InsertFactLoader(FactLoader):
+    name = 'insert'
+
+    def _load_chunk(self, chunk):
+        self.cursor.executemany(
+            f"INSERT INTO {self.table} ({', '.join(self.columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(self.columns))})",
+            chunk
+        )
+        return self._inserted(chunk)
+
+
+def _tsv_field(value):
+    if value is None:
+        return '\\N'
+    text = str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class LoadDataFactLoader(FactLoader):
+    name = 'load_data'
+
+    def _load_chunk(self, chunk):
+        fd, path = tempfile.mkstemp(prefix='fact_', suffix='.tsv')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='\n') as f:
+                for row in chunk:
+                    f.write('\t'.join(_tsv_field(v) for v in row))
+                    f.write('\n')
+            self.cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.table} "
+                f"CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' "
+                f"({', '.join(self.columns)})",
+                (path,)
+            )
+            inserted = self._inserted(chunk)
+        finally:
+            os.remove(path)
+        self.cursor.execute("SHOW WARNINGS LIMIT 5")
+        warnings = self.cursor.fetchall()
+        if warnings:
+            raise RuntimeError(f"LOAD DATA into {self.table} rejected or changed rows: " +
+                               '; '.join(f"{w['Level']} {w['Code']}: {w['Message']}" for w in warnings))
+        return inserted
+
+
+FACT_LOADERS = {
+    InsertFactLoader.name:   InsertFactLoader,
+    LoadDataFactLoader.name: LoadDataFactLoader,
+}
+
+
+def make_fact_loader(name, connection, cursor, columns, **options):
+    if name not in FACT_LOADERS:
+        raise ValueError(f"Unknown fact loader '{name}' (choose from {', '.join(FACT_LOADERS)})")
+    return FACT_LOADERS[name](connection, cursor, columns, **options)
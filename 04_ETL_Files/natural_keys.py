@@ -0,0 +1,146 @@
+"""Natural-key hashes that make fact loads idempotent.
+
+Every fact row carries source_hash, a signed 64-bit hash of the natural
+key of the source row it was built from:
+
+    book_transactions   book|<TransactionID>
+    room_bookings       room|<file>|<BookingID>
+    digital_usage       digital|<file>|<row fingerprint>|@<line offset>
+
+<file> is the base name of the source file, so branch files in sharded
+mode never collide, and a file hashes the same whether it is loaded
+alone or as a shard. digital_usage has no id column, so its key is the
+row fingerprint (all fields of the row) plus the byte offset at which
+the row's line starts. The offset tells apart a row that repeats an
+earlier one field for field, also when an incremental run resumes at
+the watermark offset; the fingerprint keeps the rows of a replaced file
+from colliding with the facts of the old file at the same offsets.
+Book and room rows without an id use the fingerprint plus n, which
+numbers identical rows 0, 1, 2, ... within one read.
+
+Every hash loaded is also recorded in etl_source_hash (source_hash
+PRIMARY KEY, never partitioned). The fact loaders filter out rows whose
+hash is already recorded and write the new hashes there in the same
+transaction as the facts, so re-running a load never duplicates facts
+and two concurrent loads of the same rows cannot both commit. This
+table, not the fact table, enforces uniqueness: fact_library_usage also
+has a unique index on source_hash, but a partitioned table widens it to
+(source_hash, date_key) (see partitions.py), and a source row's date_key
+can change between runs, e.g. when an ambiguous 01/02/2024 is detected
+the other way after .cache/date_formats.json is deleted. Hashes of
+archived partitions stay recorded, so a full load does not bring the
+archived facts back. Facts loaded before the column existed keep a NULL
+hash.
+
+Hashes are pandas' vectorised SipHash with a pinned key, so the same
+source row hashes the same in every run.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+HASH_KEY  = '0123456789123456'   # SipHash key – never change it, stored hashes depend on it
+SEPARATOR = '|'
+
+HASH_COLUMN = 'source_hash'
+HASH_INDEX  = 'uq_fact_source_hash'
+HASH_TABLE  = 'etl_source_hash'
+
+HASH_TABLE_DDL = f"""
+    CREATE TABLE IF NOT EXISTS {HASH_TABLE} (
+      {HASH_COLUMN} bigint NOT NULL,
+      PRIMARY KEY ({HASH_COLUMN})
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+"""
+
+
+def hash_keys(keys):
+    """Signed 64-bit hash of each key string (fits a BIGINT column)"""
+    values = np.asarray(keys, dtype=object)
+    return pd.util.hash_array(values, hash_key=HASH_KEY, categorize=False).view('int64')
+
+
+def fingerprints(df):
+    """All fields of every row joined into one string"""
+    text = pd.Series('', index=df.index, dtype=object)
+    for pos in range(df.shape[1]):
+        text = text + SEPARATOR + df.iloc[:, pos].astype(str).astype(object)
+    return text
+
+
+class SourceKeys:
+    """source_hash for the rows of one run (or, in sharded mode, of one file).
+
+    Keyword arguments name the source file of a kind, e.g.
+    SourceKeys(digital='digital_usage.csv').
+    """
+
+    def __init__(self, **files):
+        self.files = files             # kind -> source file name
+        self.seen  = {}                # kind -> Series: fingerprint -> identical rows numbered so far
+
+    def reset(self):
+        """Start numbering identical rows from 0 again (a new pass over the same files)"""
+        self.seen = {}
+
+    def _number(self, kind, prints):
+        """0, 1, 2, ... for repeated fingerprints, continuing across the frames of a run"""
+        seen = self.seen.get(kind, pd.Series(dtype='int64'))
+        n = prints.map(seen).fillna(0).astype('int64') + prints.groupby(prints, sort=False).cumcount()
+        self.seen[kind] = seen.add(prints.value_counts(sort=False), fill_value=0).astype('int64')
+        return n
+
+    def hashes(self, kind, df, id_column=None, offsets=None):
+        """source_hash of every row of a staged source frame, aligned to its index.
+
+        offsets (one per row, e.g. the line offsets digital_stream indexes
+        its batches by) number the fingerprints of the rows without an id
+        instead of counting identical rows.
+        """
+        prefix = kind + SEPARATOR + (self.files[kind] + SEPARATOR if self.files.get(kind) else '')
+        keys = pd.Series(None, index=df.index, dtype=object)
+        if id_column is not None and id_column in df.columns:
+            ids = pd.to_numeric(df[id_column], errors='coerce').astype('Int64')
+            has_id = ids.notna()
+            keys[has_id] = prefix + ids[has_id].astype(str).astype(object)
+        rest = keys.isna()
+        if rest.any():
+            prints = fingerprints(df[rest])
+            if offsets is not None:
+                n = '@' + pd.Series(np.asarray(offsets), index=df.index)[rest].astype(str).astype(object)
+            else:
+                n = self._number(kind, prints).astype(str).astype(object)
+            keys[rest] = prefix + prints + SEPARATOR + n
+        return pd.Series(hash_keys(keys), index=df.index)
+
+
+def ensure_hash_column(cursor, table='fact_library_usage'):
+    """Add source_hash and its unique index to the fact table (DDL – commits); True if added"""
+    cursor.execute(
+        "SELECT COLUMN_NAME AS c FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, HASH_COLUMN)
+    )
+    if cursor.fetchall():
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {HASH_COLUMN} BIGINT NULL DEFAULT NULL")
+    cursor.execute(f"CREATE UNIQUE INDEX {HASH_INDEX} ON {table} ({HASH_COLUMN})")
+    logging.info(f"  {table}: added {HASH_COLUMN} with unique index {HASH_INDEX}")
+    return True
+
+
+def ensure_hash_table(cursor, table='fact_library_usage'):
+    """Create etl_source_hash, seeded with the hashes already in the fact table (caller commits); True if created"""
+    cursor.execute(
+        "SELECT TABLE_NAME AS t FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (HASH_TABLE,)
+    )
+    if cursor.fetchall():
+        return False
+    cursor.execute(HASH_TABLE_DDL)
+    cursor.execute(f"INSERT INTO {HASH_TABLE} ({HASH_COLUMN}) "
+                   f"SELECT DISTINCT {HASH_COLUMN} FROM {table} WHERE {HASH_COLUMN} IS NOT NULL")
+    logging.info(f"  {HASH_TABLE}: created with {cursor.rowcount} hashes from {table}")
+    return True
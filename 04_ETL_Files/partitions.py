@@ -0,0 +1,312 @@
+"""RANGE partitions of fact_library_usage on date_key (MySQL backend only).
+
+With --partition-by month (or year) the ETL converts the fact table to
+
+    PARTITION BY RANGE (date_key) (
+      PARTITION p202401  VALUES LESS THAN (20240201),
+      PARTITION p202402  VALUES LESS THAN (20240301),
+      ...
+      PARTITION p_future VALUES LESS THAN MAXVALUE
+    )
+
+and on every later run adds the partitions up to `ahead` periods past
+max(today, latest fact date) by splitting the empty p_future, before any
+fact is loaded. p_future only catches rows beyond that horizon, so a load
+never fails for want of a partition. A table that is already partitioned
+is maintained without the flag; its period is read from the partition
+names.
+
+Queries that restrict f.date_key (not only d.year) are pruned to the
+partitions they need. Old terms are archived per partition instead of
+with row DELETEs, which would fire an audit trigger per row:
+
+    python 04_ETL_Files/partitions.py --archive-before 2023-09-01 [--drop]
+
+moves every partition that ends on or before the cutoff into its own
+table (fact_library_usage_p202308, ...) with EXCHANGE PARTITION, or just
+drops it with --drop, then rebuilds the agg_usage_* summaries. The
+source_hash of every archived fact stays in etl_source_hash (see
+natural_keys.py), so a later full load skips those source rows as
+already loaded instead of putting them back.
+
+InnoDB does not partition tables with foreign keys, and every unique key
+must contain date_key. Converting the table therefore drops every FOREIGN
+KEY constraint on it for good; with the dump's schema these are
+
+    fk_fact_date           date_key           -> dim_date
+    fk_fact_student        student_key        -> dim_student
+    fk_fact_department     department_key     -> dim_department (department_id)
+    fk_fact_resource       resource_key       -> dim_resource
+    fk_fact_room           room_key           -> dim_room
+    fk_fact_activity_type  activity_type_key  -> dim_activity_type
+    fk_fact_time_slot      time_slot_key      -> dim_time_slot
+
+Their indexes stay. The ETL only loads facts whose keys it has checked
+against the dimensions, but nothing checks what other writers (analytics
+users, the RBAC roles of 07_Security_Documentation) insert, or dimension
+rows deleted later. The conversion refuses to run on a table that has
+foreign keys unless it is confirmed with --partition-drop-foreign-keys,
+logs a warning naming the constraints it dropped, and
+
+    python 04_ETL_Files/partitions.py --check-orphans
+
+counts per dimension the facts whose key has no dimension row (exit
+status 1 if there are any).
+
+The conversion also adds date_key to the primary key and to the
+source_hash unique index. The widened index no longer keeps a
+source_hash unique, and a source row's date_key may change between runs
+(e.g. a re-detected date format), so uniqueness is enforced only by the
+unpartitioned etl_source_hash table the fact loader writes.
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '05_Analytics_Package'))
+
+from db_pool import get_connection
+from natural_keys import ensure_hash_table
+from query_cache import bump_fact_version
+from usage_aggregates import UsageAggregates
+
+GRANULARITIES = ('month', 'year')
+AHEAD         = {'month': 3, 'year': 1}    # periods partitioned in advance
+FUTURE        = 'p_future'
+
+# (fact column, dimension table, dimension key) of the foreign keys partitioning drops
+REFERENCES = (
+    ('date_key',          'dim_date',          'date_key'),
+    ('student_key',       'dim_student',       'student_key'),
+    ('department_key',    'dim_department',    'department_id'),
+    ('resource_key',      'dim_resource',      'resource_key'),
+    ('room_key',          'dim_room',          'room_key'),
+    ('activity_type_key', 'dim_activity_type', 'activity_type_key'),
+    ('time_slot_key',     'dim_time_slot',     'time_slot_key'),
+)
+
+
+def period_start(date_key, granularity):
+    """date_key of the first day of the month/year containing date_key"""
+    if granularity == 'month':
+        return date_key // 100 * 100 + 1
+    return date_key // 10000 * 10000 + 101
+
+
+def next_period(start, granularity):
+    year, month = divmod(start // 100, 100)
+    if granularity == 'year' or month == 12:
+        return (year + 1) * 10000 + 101
+    return year * 10000 + (month + 1) * 100 + 1
+
+
+def partition_name(start, granularity):
+    return f"p{start // 100}" if granularity == 'month' else f"p{start // 10000}"
+
+
+def to_date_key(value):
+    return int(value.strftime('%Y%m%d'))
+
+
+class FactPartitions:
+    def __init__(self, connection, cursor, granularity=None, table='fact_library_usage', ahead=None,
+                 allow_drop_foreign_keys=False):
+        if granularity is not None and granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown partition period '{granularity}' (choose from {', '.join(GRANULARITIES)})")
+        self.connection  = connection
+        self.cursor      = cursor
+        self.granularity = granularity
+        self.table       = table
+        self.ahead       = ahead
+        self.allow_drop_foreign_keys = allow_drop_foreign_keys
+
+    @property
+    def supported(self):
+        return getattr(self.connection, 'dialect', 'mysql') == 'mysql'
+
+    def current(self):
+        """[(partition name, upper bound or None for MAXVALUE)] in order; [] if not partitioned"""
+        self.cursor.execute(
+            "SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION",
+            (self.table,)
+        )
+        return [(row['name'], None if row['bound'] == 'MAXVALUE' else int(row['bound']))
+                for row in self.cursor.fetchall()]
+
+    def ensure(self, today=None):
+        """Partition the table (if asked to) and add the partitions ahead of new data (DDL – commits)"""
+        if not self.supported:
+            if self.granularity:
+                logging.info(f"  {self.table}: partitioning skipped – the DuckDB backend has no table partitions")
+            return
+        parts = self.current()
+        if not parts and self.granularity is None:
+            return
+        if parts:
+            self.granularity = 'month' if len(parts[0][0]) == len('p202401') else 'year'
+        today = to_date_key(today or datetime.date.today())
+        horizon = self._horizon(today)
+        if not parts:
+            self._partition(today, horizon)
+        else:
+            self._add_ahead(parts, horizon)
+
+    def _date_range(self):
+        self.cursor.execute(f"SELECT MIN(date_key) AS low, MAX(date_key) AS high FROM {self.table}")
+        row = self.cursor.fetchone()
+        return row['low'], row['high']
+
+    def _horizon(self, today):
+        """Start of the last period that must have its own partition"""
+        _, high = self._date_range()
+        start = period_start(max(today, high or 0), self.granularity)
+        for _ in range(AHEAD[self.granularity] if self.ahead is None else self.ahead):
+            start = next_period(start, self.granularity)
+        return start
+
+    def _periods(self, start, horizon):
+        while start <= horizon:
+            yield start
+            start = next_period(start, self.granularity)
+
+    def _definitions(self, starts):
+        return [f"PARTITION {partition_name(s, self.granularity)} VALUES LESS THAN "
+                f"({next_period(s, self.granularity)})" for s in starts] + \
+               [f"PARTITION {FUTURE} VALUES LESS THAN MAXVALUE"]
+
+    def _partition(self, today, horizon):
+        """Convert the unpartitioned table: drop its foreign keys (if allowed), widen unique keys, partition"""
+        self.cursor.execute(
+            "SELECT CONSTRAINT_NAME AS name FROM information_schema.TABLE_CONSTRAINTS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_TYPE = 'FOREIGN KEY'",
+            (self.table,)
+        )
+        foreign_keys = [row['name'] for row in self.cursor.fetchall()]
+        if foreign_keys and not self.allow_drop_foreign_keys:
+            raise ValueError(f"Partitioning {self.table} would drop its foreign keys {', '.join(foreign_keys)} "
+                             f"and never restore them – pass --partition-drop-foreign-keys to confirm")
+        if foreign_keys:
+            self.cursor.execute(f"ALTER TABLE {self.table} " +
+                                ', '.join(f"DROP FOREIGN KEY {name}" for name in foreign_keys))
+            logging.warning(f"  {self.table}: dropped foreign keys {', '.join(foreign_keys)} for partitioning "
+                            f"– they are not restored; check with partitions.py --check-orphans")
+
+        self.cursor.execute(
+            "SELECT INDEX_NAME AS name, COLUMN_NAME AS col FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND NON_UNIQUE = 0 ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+            (self.table,)
+        )
+        unique = {}
+        for row in self.cursor.fetchall():
+            unique.setdefault(row['name'], []).append(row['col'])
+        changes = []
+        for name, columns in unique.items():
+            if 'date_key' in columns:
+                continue
+            columns = ', '.join(columns + ['date_key'])
+            if name == 'PRIMARY':
+                changes += ["DROP PRIMARY KEY", f"ADD PRIMARY KEY ({columns})"]
+            else:
+                changes += [f"DROP INDEX {name}", f"ADD UNIQUE INDEX {name} ({columns})"]
+        if changes:
+            self.cursor.execute(f"ALTER TABLE {self.table} {', '.join(changes)}")
+
+        low, _ = self._date_range()
+        first = period_start(min(low or today, today), self.granularity)
+        definitions = self._definitions(self._periods(first, horizon))
+        self.cursor.execute(f"ALTER TABLE {self.table} PARTITION BY RANGE (date_key) ({', '.join(definitions)})")
+        logging.info(f"  {self.table}: partitioned by {self.granularity} on date_key "
+                     f"({len(definitions) - 1} partitions, {len(foreign_keys)} foreign keys dropped)")
+
+    def _add_ahead(self, parts, horizon):
+        bounds = [bound for _, bound in parts if bound is not None]
+        if parts[-1][0] != FUTURE or not bounds:
+            logging.warning(f"  {self.table}: partitions not managed by the ETL (no {FUTURE}) – left unchanged")
+            return
+        starts = list(self._periods(bounds[-1], horizon))
+        if not starts:
+            return
+        self.cursor.execute(f"ALTER TABLE {self.table} REORGANIZE PARTITION {FUTURE} "
+                            f"INTO ({', '.join(self._definitions(starts))})")
+        logging.info(f"  {self.table}: added partitions {partition_name(starts[0], self.granularity)}"
+                     f"..{partition_name(starts[-1], self.granularity)}")
+
+    def orphans(self):
+        """{fact column: facts whose key is missing from its dimension} for every entry of REFERENCES"""
+        counts = {}
+        for column, dimension, key in REFERENCES:
+            self.cursor.execute(
+                f"SELECT COUNT(*) AS n FROM {self.table} f LEFT JOIN {dimension} d ON f.{column} = d.{key} "
+                f"WHERE f.{column} IS NOT NULL AND d.{key} IS NULL"
+            )
+            counts[column] = int(self.cursor.fetchone()['n'])
+        return counts
+
+    def archive(self, before, drop=False):
+        """Remove every partition ending on or before `before` (a date); returns the partition names.
+
+        Unless `drop` is set, each partition's rows are first exchanged into
+        their own table, <table>_<partition name>.
+        """
+        if not self.supported:
+            raise ValueError("Partition archiving needs the MySQL backend")
+        # The archived hashes must already be recorded, or a full load would insert the facts again
+        ensure_hash_table(self.cursor, self.table)
+        self.connection.commit()
+        cutoff = to_date_key(before)
+        old = [name for name, bound in self.current() if bound is not None and bound <= cutoff]
+        for name in old:
+            if not drop:
+                archive = f"{self.table}_{name}"
+                self.cursor.execute(f"CREATE TABLE {archive} LIKE {self.table}")
+                self.cursor.execute(f"ALTER TABLE {archive} REMOVE PARTITIONING")
+                self.cursor.execute(f"ALTER TABLE {self.table} EXCHANGE PARTITION {name} WITH TABLE {archive}")
+                logging.info(f"  {self.table}: partition {name} moved to {archive}")
+            self.cursor.execute(f"ALTER TABLE {self.table} DROP PARTITION {name}")
+        return old
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old fact_library_usage partitions")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--archive-before', type=datetime.date.fromisoformat,
+                        help="remove the partitions that end on or before this date (YYYY-MM-DD)")
+    action.add_argument('--check-orphans', action='store_true',
+                        help="count the facts whose keys are missing from their dimension tables "
+                             "(no foreign keys enforce them once the table is partitioned)")
+    parser.add_argument('--drop', action='store_true', help="drop the rows instead of moving them to archive tables")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    connection = get_connection()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        if args.check_orphans:
+            counts = FactPartitions(connection, cursor).orphans()
+            for column, dimension, _ in REFERENCES:
+                logging.info(f"  {column:18s} -> {dimension:18s} {counts[column]} orphaned facts")
+            if any(counts.values()):
+                sys.exit(1)
+            return
+        removed = FactPartitions(connection, cursor).archive(args.archive_before, args.drop)
+        if not removed:
+            logging.info(f"No partitions end on or before {args.archive_before}")
+            return
+        # The summaries and cached reports must stop counting the removed facts
+        aggregates = UsageAggregates(cursor)
+        aggregates.rebuild()
+        bump_fact_version(cursor)
+        connection.commit()
+        logging.info(f"{'Dropped' if args.drop else 'Archived'} {len(removed)} partitions: {', '.join(removed)}")
+    finally:
+        cursor.close()
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""Structured per-stage instrumentation for ETL runs.
+
+run_etl wraps each stage in RunReport.stage(); for every stage the report
+keeps
+
+    wall_seconds     elapsed time
+    cpu_seconds      user + system CPU of this process and of finished
+                     child processes (sharded / parse-in-process workers)
+    peak_rss_bytes   process RSS high-water mark at the end of the stage,
+                     rss_growth_bytes how much the stage raised it
+    rows_in/out      set by the stage itself (rows read / rows produced)
+    skipped          skip counters (populate_fact_usage)
+    db_round_trips   statements sent on any of the run's connections – the
+                     ETL cursor and the connections opened through
+                     CountingConnection (e.g. the book_transactions reader)
+
+write_json() and write_prometheus() dump the report at the end of the run,
+also when it failed; the Prometheus file uses the text exposition format
+for node_exporter's textfile collector. Both files are replaced
+atomically.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:             # Windows
+    resource = None
+
+METRIC_PREFIX = 'library_etl'
+
+
+def peak_rss_bytes():
+    """RSS high-water mark of this process (None where getrusage is unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class RoundTrips:
+    """Statement counter shared by every connection of a run (extract threads count concurrently)"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, n=1):
+        with self._lock:
+            self.count += n
+
+
+class CountingCursor:
+    """DB-API cursor proxy counting execute/executemany/callproc calls"""
+
+    def __init__(self, cursor, counter=None):
+        self._cursor = cursor
+        self.counter = counter or RoundTrips()
+
+    @property
+    def round_trips(self):
+        return self.counter.count
+
+    def execute(self, *args, **kwargs):
+        self.counter.add()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self.counter.add()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def callproc(self, *args, **kwargs):
+        self.counter.add()
+        return self._cursor.callproc(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    """Connection proxy whose cursors count into a shared RoundTrips"""
+
+    def __init__(self, connection, counter):
+        self._connection = connection
+        self.counter = counter
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._connection.cursor(*args, **kwargs), self.counter)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.status = 'running'
+        self.error = None
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_bytes = None
+        self.rss_growth_bytes = None
+        self.rows_in = None
+        self.rows_out = None
+        self.skipped = {}
+        self.db_round_trips = 0
+
+    def to_dict(self):
+        return {
+            'name':             self.name,
+            'status':           self.status,
+            'error':            self.error,
+            'wall_seconds':     round(self.wall_seconds, 6),
+            'cpu_seconds':      round(self.cpu_seconds, 6),
+            'peak_rss_bytes':   self.peak_rss_bytes,
+            'rss_growth_bytes': self.rss_growth_bytes,
+            'rows_in':          self.rows_in,
+            'rows_out':         self.rows_out,
+            'skipped':          dict(self.skipped),
+            'db_round_trips':   self.db_round_trips,
+        }
+
+
+class RunReport:
+    def __init__(self, run_id, round_trips=None, **labels):
+        self.run_id      = run_id
+        self.labels      = labels                 # extra run attributes, e.g. incremental=True
+        self.round_trips = round_trips or (lambda: 0)
+        self.stages      = []
+        self.current     = Stage(None)            # stages record into this when no stage is open
+        self.started     = time.time()
+        self.finished    = None
+        self.status      = 'running'
+        self.error       = None
+
+    @contextmanager
+    def stage(self, name):
+        stage = Stage(name)
+        self.stages.append(stage)
+        outer, self.current = self.current, stage
+        wall, cpu = time.perf_counter(), cpu_seconds()
+        rss, trips = peak_rss_bytes(), self.round_trips()
+        try:
+            yield stage
+            stage.status = 'ok'
+        except BaseException as e:
+            stage.status = 'failed'
+            stage.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stage.wall_seconds = time.perf_counter() - wall
+            stage.cpu_seconds = cpu_seconds() - cpu
+            stage.peak_rss_bytes = peak_rss_bytes()
+            if rss is not None:
+                stage.rss_growth_bytes = stage.peak_rss_bytes - rss
+            stage.db_round_trips = self.round_trips() - trips
+            self.current = outer
+
+    def finish(self, error=None):
+        self.finished = time.time()
+        self.status = 'failed' if error else 'ok'
+        self.error = f"{type(error).__name__}: {error}" if error else None
+
+    def to_dict(self):
+        end = self.finished or time.time()
+        return {
+            'run_id':           self.run_id,
+            'started':          datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'finished':         datetime.fromtimestamp(self.finished).isoformat(timespec='seconds')
+                                if self.finished else None,
+            'status':           self.status,
+            'error':            self.error,
+            'duration_seconds': round(end - self.started, 6),
+            **self.labels,
+            'stages':           [s.to_dict() for s in self.stages],
+        }
+
+    # - output
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.to_dict(), indent=2, default=str) + '\n')
+
+    def prometheus_text(self):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            samples = [(labels, value) for labels, value in samples if value is not None]
+            if not samples:
+                return
+            full = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                value = int(value) if isinstance(value, (bool, int)) else float(value)
+                lines.append(f"{full}{{{label_text}}} {value!r}" if label_text else f"{full} {value!r}")
+
+        metric('run_info', 'gauge', 'Identifier of the last ETL run', [({'run_id': self.run_id}, 1)])
+        metric('run_success', 'gauge', 'Whether the last ETL run completed (1) or failed (0)',
+               [({}, self.status == 'ok')])
+        metric('run_timestamp_seconds', 'gauge', 'Unix time the last ETL run finished',
+               [({}, self.finished)])
+        metric('run_duration_seconds', 'gauge', 'Wall time of the last ETL run',
+               [({}, (self.finished or time.time()) - self.started)])
+
+        by_stage = [({'stage': s.name}, s) for s in self.stages]
+        metric('stage_success', 'gauge', 'Whether the stage completed (1) or failed (0)',
+               [(labels, s.status == 'ok') for labels, s in by_stage])
+        metric('stage_wall_seconds', 'gauge', 'Wall time per ETL stage',
+               [(labels, s.wall_seconds) for labels, s in by_stage])
+        metric('stage_cpu_seconds', 'gauge', 'CPU time per ETL stage, including finished child processes',
+               [(labels, s.cpu_seconds) for labels, s in by_stage])
+        metric('stage_peak_rss_bytes', 'gauge', 'Process RSS high-water mark at the end of the stage',
+               [(labels, s.peak_rss_bytes) for labels, s in by_stage])
+        metric('stage_rows_in', 'gauge', 'Rows read by the stage',
+               [(labels, s.rows_in) for labels, s in by_stage])
+        metric('stage_rows_out', 'gauge', 'Rows produced or loaded by the stage',
+               [(labels, s.rows_out) for labels, s in by_stage])
+        metric('stage_db_round_trips', 'gauge', 'Statements sent to the database by the stage',
+               [(labels, s.db_round_trips) for labels, s in by_stage])
+        metric('stage_skipped_rows', 'gauge', 'Source rows dropped by the stage, per reason',
+               [({**labels, 'reason': reason}, n) for labels, s in by_stage for reason, n in s.skipped.items()])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        _write_atomic(path, self.prometheus_text())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -0,0 +1,128 @@
+"""Sharded transformation for multi-file source drops.
+
+Branch libraries each send their own digital_usage / room_bookings file.
+In sharded mode run_etl takes a glob or a list of paths per source and
+spreads the files over a process pool:
+
+  1. collect_members() – workers read only StudentID/RoomNumber from every
+     room file so populate_dimensions can register all members up front
+  2. transform() – workers parse and transform one file each into a
+     compact fact frame; the dimension-key maps reach every worker once,
+     through the pool initializer, and are only read there
+  3. the partial frames (and skip counters) are merged in the parent and
+     loaded in one pass by populate_fact_usage
+
+Sharded mode is full-load only: incremental watermarks track one file per
+source.
+"""
+
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from date_keys import DateKeyResolver
+from digital_stream import read_digital_usage
+from natural_keys import SourceKeys
+from staging_schema import FACT_DTYPES
+
+# LibraryETL attributes the transforms read; shipped to each worker once
+SHARD_STATE = ('student_id_to_key', 'resource_id_to_key', 'department_name_to_key', 'default_department_key',
+               'aliases', 'valid_date_keys', 'valid_student_keys', 'valid_resource_keys', 'valid_room_keys')
+
+_worker_etl = None
+
+
+def is_sharded(spec):
+    return isinstance(spec, (list, tuple)) or glob.has_magic(spec)
+
+
+def expand_paths(spec):
+    """Sorted, de-duplicated file list from a path, a glob or a list of either"""
+    specs = [spec] if isinstance(spec, str) else list(spec)
+    paths = []
+    for s in specs:
+        paths.extend(sorted(glob.glob(s)) if glob.has_magic(s) else [s])
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        raise FileNotFoundError(f"No source files match {spec!r}")
+    return paths
+
+
+# - worker side
+def _init_worker(state):
+    global _worker_etl
+    from Etl_pipeline import LibraryETL
+    etl = LibraryETL(dashboards_dir=None, date_formats_path=None)
+    for name, value in state.items():
+        setattr(etl, name, value)
+    _worker_etl = etl
+
+
+def _room_members(path):
+    df = pd.read_csv(path, usecols=lambda c: c in ('StudentID', 'RoomNumber'), dtype=str)
+    return df.drop_duplicates()
+
+
+def _transform_file(kind, path):
+    """(fact frame or None, skip counters) for one source file"""
+    etl = _worker_etl
+    skipped = {'no_date': 0, 'no_student': 0, 'no_resource': 0, 'no_room': 0}
+    # Keys and date formats are scoped to the file, whichever worker transforms it
+    etl.date_resolver = DateKeyResolver()
+    etl.source_keys = SourceKeys(**{'digital' if kind == 'digital_usage' else 'room': os.path.basename(path)})
+    if kind == 'digital_usage':
+        df = read_digital_usage(path)
+        if df.empty:
+            return None, skipped
+        frame = etl.build_digital_facts(etl.prepare_digital(df), skipped)
+    else:
+        df, _ = etl.extract_rooms(path)
+        if df.empty:
+            return None, skipped
+        frame = etl.build_room_facts(df, skipped)
+    return frame, skipped
+
+
+# - parent side
+class ShardedTransformer:
+    def __init__(self, etl, digital_paths, room_paths, workers=None):
+        self.etl           = etl
+        self.digital_paths = expand_paths(digital_paths)
+        self.room_paths    = expand_paths(room_paths)
+        self.workers       = workers or os.cpu_count()
+
+    def collect_members(self):
+        """StudentID/RoomNumber pairs of every room file, for populate_dimensions"""
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            parts = list(pool.map(_room_members, self.room_paths))
+        members = pd.concat(parts, ignore_index=True).drop_duplicates().fillna('NULL')
+        logging.info(f"  {len(self.room_paths)} room files: {len(members)} distinct student/room pairs")
+        return members
+
+    def transform(self, skipped):
+        """One merged fact frame for all shard files (skip counters are added to `skipped`)"""
+        state = {name: getattr(self.etl, name) for name in SHARD_STATE}
+        jobs = ([('digital_usage', p) for p in self.digital_paths] +
+                [('room_bookings', p) for p in self.room_paths])
+        logging.info(f"Transforming {len(jobs)} source files on {self.workers} worker processes...")
+
+        frames = []
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(state,)) as pool:
+            futures = [(kind, path, pool.submit(_transform_file, kind, path)) for kind, path in jobs]
+            for kind, path, future in futures:
+                frame, part_skipped = future.result()
+                for counter, n in part_skipped.items():
+                    skipped[counter] += n
+                if frame is not None and len(frame):
+                    frames.append(frame)
+                logging.info(f"   {kind} {os.path.basename(path)}: {0 if frame is None else len(frame)} records")
+
+        if not frames:
+            return self.etl._fact_frame(pd.RangeIndex(0))
+        # Categorical columns only concatenate as categoricals when their categories match
+        merged = pd.concat(frames, ignore_index=True)
+        return merged.astype({col: dtype for col, dtype in FACT_DTYPES.items() if str(merged[col].dtype) != dtype})
@@ -0,0 +1,126 @@
+"""Typed staging schema for the ETL sources.
+
+Staged frames used to be all-object: every value a Python string, and
+fillna('NULL') turned numeric columns into object as well. apply_schema()
+gives each source column an explicit dtype instead:
+
+    category   repeated text (ids, departments, dates, purposes) is
+               dictionary-encoded; missing values become the 'NULL'
+               category the transforms already expect
+    Int64/...  pandas nullable integers / floats, so a missing number is a
+               null mask bit rather than the string 'NULL'
+    int32      non-null counters produced by prepare_digital
+
+Object columns without an entry are made categorical when they repeat
+enough (at most AUTO_CATEGORY_RATIO distinct values per row).
+
+concat_staged() joins chunks staged separately (e.g. the book_transactions
+chunks of book_stream.py) without falling back to object columns.
+
+frame_memory() gives a frame's deep memory footprint (the benchmarks
+compare staged and untyped frames with it; ETL runs report peak RSS per
+stage instead, see run_report.py).
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+NULL_TOKEN = 'NULL'
+AUTO_CATEGORY_RATIO = 0.5
+
+STAGING_SCHEMAS = {
+    'book_transactions': {
+        'TransactionID':    'Int64',
+        'StudentID':        'category',
+        'BookISBN':         'category',
+        'CheckoutDate':     'category',
+        'ReturnDate':       'category',
+        'Department':       'category',
+        'BookCategory':     'category',
+    },
+    'digital_usage': {
+        'Date':             'category',
+        'UserType':         'category',
+        'ResourceType':     'category',
+        'Faculty':          'category',
+        'DownloadCount':    'int32',
+        'Duration_Minutes': 'int32',
+    },
+    'room_bookings': {
+        'BookingID':        'Int64',
+        'RoomNumber':       'category',
+        'BookingDate':      'category',
+        'TimeSlot':         'category',
+        'StudentID':        'category',
+        'DurationHours':    'Float64',
+        'Purpose':          'category',
+    },
+}
+
+# fact_library_usage columns as built by LibraryETL._fact_frame
+FACT_DTYPES = {
+    'date_key':         'int32',
+    'student_key':      'Int32',
+    'department_key':   'Int32',
+    'resource_key':     'Int32',
+    'room_key':         'category',
+    'time_slot_key':    'Int32',
+    'duration_minutes': 'Int32',
+    'quantity':         'Int32',
+    'purpose':          'category',
+    'source_hash':      'int64',
+}
+
+
+def convert_column(series, dtype):
+    """One column converted to a schema dtype (unparsable numbers become nulls)"""
+    if dtype == 'category':
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if series.isna().any():
+                series = series.cat.add_categories([NULL_TOKEN]).fillna(NULL_TOKEN)
+            return series
+        return series.astype(object).where(series.notna(), NULL_TOKEN).astype('category')
+
+    values = pd.to_numeric(series, errors='coerce')
+    if dtype[0] in 'Ii':
+        values = values.astype('float64')
+        values = np.trunc(values.where(np.isfinite(values)))
+        if dtype[0] == 'i':
+            values = values.fillna(0)
+    return values.astype(dtype)
+
+
+def apply_schema(df, schema):
+    """Convert df's columns in place by position (duplicate column names are kept)"""
+    for pos, col in enumerate(df.columns):
+        series = df.iloc[:, pos]
+        dtype = schema.get(col)
+        if dtype is None:
+            if series.dtype.kind not in 'OT' or len(series) == 0:
+                continue
+            if series.nunique(dropna=False) > AUTO_CATEGORY_RATIO * len(series):
+                continue
+            dtype = 'category'
+        df.isetitem(pos, convert_column(series, dtype))
+    return df
+
+
+def concat_staged(frames):
+    """Concatenate staged frames; categorical columns stay categorical (categories are unioned)"""
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for col in frames[0].columns:
+        parts = [f[col] for f in frames]
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            columns[col] = union_categoricals(parts, ignore_order=True)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def frame_memory(df):
+    """Deep memory footprint of a DataFrame in bytes"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
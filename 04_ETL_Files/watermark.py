@@ -0,0 +1,95 @@
+"""Watermarks for incremental ETL runs.
+
+One row per source in etl_watermark records how far the last successful
+run got:
+
+    book_transactions  last_id = max TransactionID, last_date = max CheckoutDate
+    digital_usage      byte_offset + content_hash of the CSV prefix already read
+    room_bookings      byte_offset + content_hash, last_id = max BookingID
+
+The content hash covers the first HASH_BYTES of the file and the
+HASH_BYTES just before the stored offset, so a CSV that was replaced or
+truncated (rather than appended to) is detected and read again from the
+start. Edits elsewhere in the already-loaded part are not detected; the
+file is not re-read in full on every run. The stored offset is always at
+a line end: a last line that is still being written is left for the next
+run.
+"""
+
+import hashlib
+import logging
+import os
+
+HASH_BYTES = 1 << 16         # length of each window hashed for the content hash
+
+WATERMARK_DDL = """
+    CREATE TABLE IF NOT EXISTS etl_watermark (
+      source_name  varchar(50) NOT NULL,
+      last_id      bigint DEFAULT NULL,
+      last_date    date DEFAULT NULL,
+      byte_offset  bigint DEFAULT NULL,
+      content_hash char(40) DEFAULT NULL,
+      updated_at   timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+      PRIMARY KEY (source_name)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+"""
+
+
+def file_fingerprint(path, offset):
+    """sha1 of the first and the last HASH_BYTES bytes before `offset` (the whole prefix if shorter)"""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        h.update(f.read(min(offset, HASH_BYTES)))
+        if offset > HASH_BYTES:
+            f.seek(max(HASH_BYTES, offset - HASH_BYTES))
+            h.update(f.read(offset - f.tell()))
+    return h.hexdigest()
+
+
+class WatermarkStore:
+    def __init__(self, connection, cursor):
+        self.connection = connection
+        self.cursor     = cursor
+        self.pending    = {}           # source_name -> fields to save with the fact commit
+
+    def ensure_table(self):
+        self.cursor.execute(WATERMARK_DDL)
+        self.connection.commit()
+
+    def get(self, source):
+        self.cursor.execute(
+            "SELECT last_id, last_date, byte_offset, content_hash FROM etl_watermark WHERE source_name = %s",
+            (source,)
+        )
+        return self.cursor.fetchone() or {}
+
+    def resume_offset(self, source, path):
+        """Byte offset to continue reading `path` from, or 0 if the file is new/changed"""
+        mark = self.get(source)
+        offset = mark.get('byte_offset') or 0
+        if offset <= 0:
+            return 0
+        if os.path.getsize(path) < offset or file_fingerprint(path, offset) != mark.get('content_hash'):
+            logging.warning(f"  {source}: file changed since last run, reading from the start")
+            return 0
+        return offset
+
+    def stage(self, source, **fields):
+        """Remember new watermark values; they are written by save() inside the fact transaction"""
+        self.pending.setdefault(source, {}).update(fields)
+
+    def stage_file(self, source, path, offset, **fields):
+        self.stage(source, byte_offset=offset, content_hash=file_fingerprint(path, offset), **fields)
+
+    def save(self):
+        """Write the staged watermarks (no commit – the caller commits with the facts)"""
+        for source, fields in self.pending.items():
+            cols = ['source_name'] + list(fields)
+            self.cursor.execute(
+                f"INSERT INTO etl_watermark ({', '.join(cols)}) "
+                f"VALUES ({', '.join(['%s'] * len(cols))}) "
+                f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in fields)}",
+                [source] + list(fields.values())
+            )
+            logging.info(f"  watermark {source}: {fields}")
+        self.pending = {}
@@ -0,0 +1,292 @@
+"""Embedded DuckDB backend – the star schema in a local file, no server.
+
+With backend = duckdb (LIBRARY_DB_BACKEND=duckdb, or [database] backend
+in db_config.ini) db_pool.get_connection() returns a DuckDBConnection
+instead of a pooled MySQL connection. It speaks enough of the
+mysql.connector API for the ETL and the analytics scripts:
+
+    conn.cursor(dictionary=True)     dict rows, like mysql.connector
+    cursor.execute(sql, params)      MySQL SQL, translated by sql_dialect
+    cursor.executemany(sql, rows)    INSERT ... VALUES batches go through a
+                                     DataFrame in one statement
+    cursor.rowcount / description / fetchone / fetchmany / fetchall
+    conn.autocommit / commit / rollback / close
+
+The database file (LIBRARY_DB_PATH, default
+university_library_analytics.duckdb in the working directory) is
+bootstrapped from the MySQL dump in 03_Database_File the first time it is
+opened, so a fresh checkout can run the ETL and every report in-process.
+':memory:' gives a throwaway database shared by all connections of the
+process – handy for tests and benchmarks.
+
+A DuckDB file can only be open in one process at a time: run the ETL and
+the reports one after the other, not side by side.
+
+    python 05_Analytics_Package/db_backend.py --path library.duckdb --force
+"""
+
+import argparse
+import logging
+import os
+import re
+import threading
+
+import mysql.connector
+import pandas as pd
+
+from sql_dialect import to_duckdb, translate_dump
+
+try:
+    import duckdb
+except ImportError:             # only needed for backend = duckdb
+    duckdb = None
+
+DEFAULT_PATH = 'university_library_analytics.duckdb'
+DUMP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         '03_Database_File', 'university_library_analytics (1).sql')
+
+# "table doesn't exist" on either backend
+MISSING_TABLE_ERRORS = (mysql.connector.errors.ProgrammingError,) + \
+                       ((duckdb.CatalogException,) if duckdb is not None else ())
+
+_BATCH_INSERT = re.compile(r'^INSERT\s+(OR\s+IGNORE\s+)?INTO\s+(\S+)\s*\(([^)]*)\)\s*'
+                           r'VALUES\s*\(\s*\?(?:\s*,\s*\?)*\s*\)(.*)$', re.I | re.S)
+_DML = re.compile(r'^\s*(INSERT|UPDATE|DELETE)\b', re.I)
+
+_databases = {}             # absolute path -> root duckdb connection
+_lock = threading.Lock()
+
+
+def open_database(path=DEFAULT_PATH, dump_path=DUMP_FILE):
+    """Root DuckDB connection for `path`, opened once per process (bootstrapped if empty)"""
+    if duckdb is None:
+        raise ImportError("backend = duckdb needs the duckdb package (pip install duckdb)")
+    key = path if path == ':memory:' else os.path.abspath(path)
+    with _lock:
+        db = _databases.get(key)
+        if db is None:
+            db = duckdb.connect(key)
+            tables = db.execute("SELECT count(*) FROM information_schema.tables "
+                                "WHERE table_schema = current_schema()").fetchone()[0]
+            if not tables:
+                bootstrap(db, dump_path)
+            _databases[key] = db
+    return db
+
+
+def bootstrap(db, dump_path=DUMP_FILE):
+    """Create the star schema and its sample data from a MySQL dump"""
+    with open(dump_path, encoding='utf-8') as f:
+        statements, skipped = translate_dump(f.read())
+    db.execute("BEGIN TRANSACTION")
+    try:
+        for sql in statements:
+            db.execute(sql)
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    logging.info(f"Bootstrapped DuckDB schema from {os.path.basename(dump_path)}: "
+                 f"{len(statements)} statements")
+    for sql in skipped:
+        logging.info(f"  skipped (not supported by DuckDB): {sql[:80]}")
+
+
+def connect(path=DEFAULT_PATH, autocommit=True):
+    return DuckDBConnection(open_database(path), autocommit)
+
+
+class DuckDBConnection:
+    dialect = 'duckdb'
+
+    def __init__(self, database, autocommit=True):
+        self._con         = database.cursor()      # own connection to the shared database
+        self._autocommit  = autocommit
+        self._in_txn      = False
+        self._active      = None                   # cursor whose result is still pending
+        self._registered  = 0
+
+    @property
+    def autocommit(self):
+        return self._autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        if value and self._in_txn:
+            self.commit()
+        self._autocommit = bool(value)
+
+    def cursor(self, dictionary=False, **kwargs):
+        return DuckDBCursor(self, dictionary)
+
+    def commit(self):
+        if self._in_txn:
+            self._release()
+            self._con.execute("COMMIT")
+            self._in_txn = False
+
+    def rollback(self):
+        if self._in_txn:
+            self._release()
+            self._con.execute("ROLLBACK")
+            self._in_txn = False
+
+    def close(self):
+        if self._con is None:
+            return
+        self.rollback()
+        self._con.close()
+        self._con = None
+
+    def is_connected(self):
+        return self._con is not None
+
+    # - used by DuckDBCursor
+    def _release(self):
+        """Buffer the pending result of the active cursor before the connection runs anything else"""
+        if self._active is not None:
+            self._active._buffer()
+            self._active = None
+
+    def _execute(self, cursor, statements, params=None):
+        self._release()
+        if not self._autocommit and not self._in_txn:
+            self._con.execute("BEGIN TRANSACTION")
+            self._in_txn = True
+        for sql in statements[:-1]:
+            self._con.execute(sql)
+        self._con.execute(statements[-1], params)
+        self._active = cursor
+        return self._con
+
+    def _register_rows(self, frame):
+        self._registered += 1
+        name = f"_executemany_rows_{self._registered}"
+        self._con.register(name, frame)
+        return name
+
+
+class DuckDBCursor:
+    def __init__(self, connection, dictionary=False):
+        self.connection  = connection
+        self.dictionary  = dictionary
+        self.description = None
+        self.rowcount    = -1
+        self._result     = None        # live duckdb connection while a result is pending
+        self._rows       = None        # buffered rows once another cursor needed the connection
+
+    @property
+    def column_names(self):
+        return tuple(d[0] for d in self.description or ())
+
+    def execute(self, sql, params=None):
+        self._reset()
+        statements = to_duckdb(sql)
+        if not statements:
+            return
+        result = self.connection._execute(self, statements, list(params) if params is not None else None)
+        self._finish(result, statements[-1])
+
+    def executemany(self, sql, seq_of_params):
+        rows = [tuple(p) for p in seq_of_params]
+        self._reset()
+        statements = to_duckdb(sql)
+        if not rows or not statements:
+            return
+        m = _BATCH_INSERT.match(statements[-1]) if len(statements) == 1 else None
+        if m is None:
+            total = 0
+            for params in rows:
+                self.execute(sql, params)
+                total += max(self.rowcount, 0)
+            self.rowcount = total
+            return
+
+        ignore, table, columns, tail = m.groups()
+        frame = pd.DataFrame.from_records(rows, columns=[f"c{i}" for i in range(len(rows[0]))])
+        name = self.connection._register_rows(frame)
+        try:
+            result = self.connection._execute(self, (
+                f"INSERT {ignore or ''}INTO {table} ({columns}) SELECT * FROM {name}{tail}",))
+            self._finish(result, 'INSERT')
+        finally:
+            self.connection._con.unregister(name)
+
+    def _reset(self):
+        if self.connection._active is self:
+            self.connection._active = None
+        self.description = None
+        self.rowcount = -1
+        self._result = self._rows = None
+
+    def _finish(self, result, sql):
+        if _DML.match(sql):
+            row = result.fetchone()
+            self.rowcount = row[0] if row else 0
+            self.connection._active = None
+            return
+        self.description = result.description
+        self._result = result if self.description else None
+
+    def _buffer(self):
+        if self._result is not None:
+            self._rows = self._result.fetchall()
+            self._result = None
+
+    def _shape(self, rows):
+        if not self.dictionary:
+            return rows
+        names = self.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=1):
+        if self._rows is not None:
+            rows, self._rows = self._rows[:size], self._rows[size:]
+        elif self._result is not None:
+            rows = self._result.fetchmany(size)
+        else:
+            rows = []
+        return self._shape(rows)
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, []
+        elif self._result is not None:
+            rows = self._result.fetchall()
+            self._result = None
+            self.connection._active = None
+        else:
+            rows = []
+        return self._shape(rows)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._reset()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the embedded DuckDB star schema from the MySQL dump")
+    parser.add_argument('--path', default=os.environ.get('LIBRARY_DB_PATH', DEFAULT_PATH))
+    parser.add_argument('--dump', default=DUMP_FILE)
+    parser.add_argument('--force', action='store_true', help="replace an existing database file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if os.path.exists(args.path):
+        if not args.force:
+            parser.error(f"{args.path} exists (use --force to rebuild it)")
+        os.remove(args.path)
+    db = open_database(args.path, args.dump)
+    for (table,) in db.execute("SELECT table_name FROM information_schema.tables "
+                               "WHERE table_schema = current_schema() ORDER BY 1").fetchall():
+        print(f"  {table:28s} {db.execute(f'SELECT count(*) FROM {table}').fetchone()[0]:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Shared, pooled database access for the analytics scripts and the ETL.
+
+Connection settings are resolved in this order (later wins):
+  1. built-in defaults (localhost / root / no password)
+  2. the [database] section of an INI file – $LIBRARY_DB_CONFIG, or
+     db_config.ini next to this module (see db_config.example.ini)
+  3. environment variables LIBRARY_DB_HOST, LIBRARY_DB_PORT,
+     LIBRARY_DB_USER, LIBRARY_DB_PASSWORD, LIBRARY_DB_NAME,
+     LIBRARY_DB_POOL_SIZE, LIBRARY_DB_BACKEND, LIBRARY_DB_PATH
+  4. keyword overrides passed to get_pool()/get_connection()
+
+Connections handed out by get_connection() go back to the pool on
+close(), so repeated report refreshes in one process skip the
+connect/auth handshake.
+
+backend = duckdb swaps the MySQL server for the embedded DuckDB file at
+`path` (see db_backend.py); the host/user/password settings are then
+ignored.
+"""
+
+import configparser
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+import mysql.connector.pooling
+import pandas as pd
+
+import db_backend
+from query_cache import read_fact_version
+
+DEFAULTS = {
+    'host':        'localhost',
+    'port':        3306,
+    'user':        'root',
+    'password':    '',
+    'database':    'university library analytics',
+    'auth_plugin': 'mysql_native_password',
+    'autocommit':  True,        # analytics only read; every SELECT sees the latest ETL commit
+    'backend':     'mysql',     # or 'duckdb', see db_backend.py
+    'path':        db_backend.DEFAULT_PATH,
+}
+DEFAULT_POOL_SIZE = 5
+POOL_TIMEOUT      = 30          # seconds to wait for a free pooled connection
+
+ENV_VARS = {
+    'host':      'LIBRARY_DB_HOST',
+    'port':      'LIBRARY_DB_PORT',
+    'user':      'LIBRARY_DB_USER',
+    'password':  'LIBRARY_DB_PASSWORD',
+    'database':  'LIBRARY_DB_NAME',
+    'pool_size': 'LIBRARY_DB_POOL_SIZE',
+    'backend':   'LIBRARY_DB_BACKEND',
+    'path':      'LIBRARY_DB_PATH',
+}
+CONFIG_FILE = os.environ.get(
+    'LIBRARY_DB_CONFIG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db_config.ini')
+)
+
+_pools = {}
+_lock  = threading.Lock()
+
+
+def load_config(**overrides):
+    """Connection settings (including pool_size) from defaults, config file, env and overrides"""
+    config = dict(DEFAULTS, pool_size=DEFAULT_POOL_SIZE)
+
+    if os.path.exists(CONFIG_FILE):
+        parser = configparser.ConfigParser()
+        parser.read(CONFIG_FILE)
+        if parser.has_section('database'):
+            config.update(parser['database'])
+
+    for key, var in ENV_VARS.items():
+        if var in os.environ:
+            config[key] = os.environ[var]
+
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    config['port']      = int(config['port'])
+    config['pool_size'] = int(config['pool_size'])
+    return config
+
+
+def get_pool(**overrides):
+    """One MySQLConnectionPool per distinct configuration, created on first use"""
+    config = load_config(**overrides)
+    pool_size = config.pop('pool_size')
+    config.pop('backend')
+    config.pop('path')
+    key = tuple(sorted((k, str(v)) for k, v in config.items()))
+
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name=f"library_pool_{len(_pools) + 1}",
+                pool_size=min(pool_size, mysql.connector.pooling.CNX_POOL_MAXSIZE),
+                **config
+            )
+            _pools[key] = pool
+    return pool
+
+
+def get_connection(**overrides):
+    """A pooled connection; close() returns it to the pool. Waits up to POOL_TIMEOUT if all are busy."""
+    config = load_config(**overrides)
+    if config['backend'] == 'duckdb':
+        return db_backend.connect(config['path'], autocommit=config['autocommit'])
+    pool = get_pool(**overrides)
+    deadline = time.monotonic() + POOL_TIMEOUT
+    while True:
+        try:
+            return pool.get_connection()
+        except mysql.connector.errors.PoolError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def run_query(sql, params=None, conn=None, cache=None):
+    """Run a SELECT and return a DataFrame (DECIMALs coerced to float like pd.read_sql).
+
+    With a query_cache.QueryCache, results are reused until the ETL bumps
+    the fact-table version.
+    """
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        version = read_fact_version(conn) if cache is not None else None
+        if version is not None:
+            df = cache.get(sql, params, version)
+            if df is not None:
+                return df
+
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        if own:
+            conn.close()
+
+    df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    if version is not None:
+        cache.put(sql, params, version, df)
+    return df
+
+
+def run_queries(queries, parallelism=4, cache=None, **overrides):
+    """Run independent (name, sql) queries concurrently, one pooled connection per query.
+
+    Returns {name: DataFrame} in the order the queries were given, whatever
+    order they finished in. The pool is sized for `parallelism` when it is
+    first created; with a smaller existing pool, workers wait for a slot.
+    """
+    overrides.setdefault('pool_size', max(parallelism, DEFAULT_POOL_SIZE))
+
+    def task(sql):
+        conn = get_connection(**overrides)
+        try:
+            return run_query(sql, conn=conn, cache=cache)
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        futures = [(name, executor.submit(task, sql)) for name, sql in queries]
+        return {name: future.result() for name, future in futures}
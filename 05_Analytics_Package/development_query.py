@@ -1,26 +1,14 @@
-import mysql.connector
-import pandas as pd
+import argparse
+import os
+import time
 
-# -----------------------------
-# Database Connection
-# -----------------------------
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="",
-    database="university library analytics",
-    auth_plugin="mysql_native_password"
-)
-
-print("Connected to database")
+from db_pool import run_queries
+from query_cache import CACHE
 
 # -----------------------------
 # 1. Total book transactions
 # -----------------------------
 query1 = "SELECT COUNT(*) AS total_books FROM fact_library_usage WHERE purpose='Book Transaction';"
-df1 = pd.read_sql(query1, conn)
-print("\n1️⃣ Total Book Transactions")
-print(df1)
 
 # -----------------------------
 # 2. Total digital downloads by resource type
@@ -33,9 +21,6 @@ WHERE f.purpose='Digital Usage'
 GROUP BY r.resource_type
 ORDER BY total_downloads DESC;
 """
-df2 = pd.read_sql(query2, conn)
-print("\n2️⃣ Total Digital Downloads by Resource Type")
-print(df2)
 
 # -----------------------------
 # 3. Average duration per room booking
@@ -48,9 +33,6 @@ WHERE f.room_key IS NOT NULL
 GROUP BY r.room_number
 ORDER BY avg_duration DESC;
 """
-df3 = pd.read_sql(query3, conn)
-print("\n3️⃣ Average Duration per Room Booking")
-print(df3)
 
 # -----------------------------
 # 4. Max and Min downloads per month
@@ -64,9 +46,6 @@ GROUP BY d.month_name
 ORDER BY FIELD(d.month_name,
   'January','February','March','April','May','June','July','August','September','October','November','December');
 """
-df4 = pd.read_sql(query4, conn)
-print("\n4️⃣ Max & Min Downloads per Month")
-print(df4)
 
 # -----------------------------
 # 5. Total usage by department
@@ -78,9 +57,6 @@ JOIN dim_department dep ON f.department_key = dep.department_id
 GROUP BY dep.department_name
 ORDER BY total_usage DESC;
 """
-df5 = pd.read_sql(query5, conn)
-print("\n5️⃣ Total Usage by Department")
-print(df5)
 
 # -----------------------------
 # 6. Monthly usage trend for E-Books
@@ -94,9 +70,6 @@ WHERE r.resource_type='E-Book'
 GROUP BY d.year, d.month_name
 ORDER BY d.year, MONTH(STR_TO_DATE(d.month_name, '%M'));
 """
-df6 = pd.read_sql(query6, conn)
-print("\n6️⃣ Monthly Usage Trend for E-Books")
-print(df6)
 
 # -----------------------------
 # 7. Top 5 students by total usage
@@ -105,13 +78,10 @@ query7 = """
 SELECT s.student_id, s.student_type, SUM(f.quantity) AS total_usage
 FROM fact_library_usage f
 JOIN dim_student s ON f.student_key = s.student_key
-GROUP BY s.student_id
+GROUP BY s.student_id, s.student_type
 ORDER BY total_usage DESC
 LIMIT 5;
 """
-df7 = pd.read_sql(query7, conn)
-print("\n7️⃣ Top 5 Students by Total Usage")
-print(df7)
 
 # -----------------------------
 # 8. Rank departments by digital usage
@@ -125,9 +95,6 @@ JOIN dim_resource r ON f.resource_key = r.resource_key
 WHERE f.purpose='Digital Usage'
 GROUP BY dep.department_name;
 """
-df8 = pd.read_sql(query8, conn)
-print("\n8️⃣ Departments Ranked by Digital Usage")
-print(df8)
 
 # -----------------------------
 # 9. Comparison of room vs digital usage
@@ -138,9 +105,6 @@ SELECT
     SUM(CASE WHEN f.purpose='Digital Usage' THEN f.quantity ELSE 0 END) AS total_digital_usage
 FROM fact_library_usage f;
 """
-df9 = pd.read_sql(query9, conn)
-print("\n9️⃣ Comparison of Room vs Digital Usage")
-print(df9)
 
 # -----------------------------
 # 10. Total usage per resource category per department
@@ -153,9 +117,6 @@ JOIN dim_resource r ON f.resource_key = r.resource_key
 GROUP BY dep.department_name, r.resource_category
 ORDER BY dep.department_name, total_usage DESC;
 """
-df10 = pd.read_sql(query10, conn)
-print("\n🔟 Total Usage per Resource Category per Department")
-print(df10)
 
 # -----------------------------
 # 11. Average usage per student type per resource type
@@ -168,12 +129,53 @@ JOIN dim_resource r ON f.resource_key = r.resource_key
 GROUP BY s.student_type, r.resource_type
 ORDER BY s.student_type;
 """
-df11 = pd.read_sql(query11, conn)
-print("\n1️⃣1️⃣ Average Usage per Student Type per Resource Type")
-print(df11)
 
-# -----------------------------
-# Close Connection
-# -----------------------------
-conn.close()
-print("\nConnection closed")
+# Report order and titles
+REPORTS = [
+    ("total_books", "1️⃣ Total Book Transactions", query1),
+    ("downloads_by_resource_type", "2️⃣ Total Digital Downloads by Resource Type", query2),
+    ("avg_room_duration", "3️⃣ Average Duration per Room Booking", query3),
+    ("monthly_download_range", "4️⃣ Max & Min Downloads per Month", query4),
+    ("usage_by_department", "5️⃣ Total Usage by Department", query5),
+    ("ebook_monthly_trend", "6️⃣ Monthly Usage Trend for E-Books", query6),
+    ("top_students", "7️⃣ Top 5 Students by Total Usage", query7),
+    ("department_digital_rank", "8️⃣ Departments Ranked by Digital Usage", query8),
+    ("room_vs_digital", "9️⃣ Comparison of Room vs Digital Usage", query9),
+    ("category_by_department", "🔟 Total Usage per Resource Category per Department", query10),
+    ("avg_usage_by_student_type", "1️⃣1️⃣ Average Usage per Student Type per Resource Type", query11),
+]
+
+
+def run_reports(parallelism=4, cache=CACHE):
+    """Run every report concurrently; returns {name: DataFrame} in REPORTS order"""
+    return run_queries([(name, query) for name, _, query in REPORTS], parallelism=parallelism, cache=cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Library analytics report suite")
+    parser.add_argument('--parallelism', type=int, default=4,
+                        help="number of reports run at the same time")
+    parser.add_argument('--export-dir', default=None,
+                        help="also write each report to <export-dir>/<name>.csv")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always query the database, ignoring cached results")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_reports(args.parallelism, cache=None if args.no_cache else CACHE)
+    elapsed = time.perf_counter() - start
+
+    if args.export_dir:
+        os.makedirs(args.export_dir, exist_ok=True)
+
+    for name, title, _ in REPORTS:
+        print(f"\n{title}")
+        print(results[name])
+        if args.export_dir:
+            results[name].to_csv(os.path.join(args.export_dir, f"{name}.csv"), index=False)
+
+    print(f"\n{len(REPORTS)} reports in {elapsed:.2f}s (parallelism {args.parallelism})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""In-memory OLAP cube over fact_library_usage.
+
+OlapCube.from_database() reads the fact table and dim_resource once and
+keeps one int32 code array per dimension level plus the measure arrays.
+After that every operation runs in NumPy with no database round trip:
+
+    drill_down / roll_up   move one level down/up a hierarchy
+                           (date: year > month > day,
+                            resource: resource_category > resource_type)
+    slice / dice           keep the rows matching one member / a set of
+                           members per level
+
+Each of them returns a new cube; view(measure) aggregates the current
+grouping with np.bincount over the combined level codes.
+
+    cube = OlapCube.from_database()
+    cube.drill_down('date').slice('resource_category', 'Digital').view('quantity')
+"""
+
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from db_pool import run_query
+
+FACT_SQL = """
+SELECT date_key, department_key, resource_key, quantity, duration_minutes
+FROM fact_library_usage;
+"""
+
+RESOURCE_SQL = """
+SELECT resource_key, resource_category, resource_type
+FROM dim_resource;
+"""
+
+HIERARCHIES = {
+    'date':       ['year', 'month', 'day'],
+    'resource':   ['resource_category', 'resource_type'],
+    'department': ['department_key'],
+}
+MEASURES = ('count', 'quantity', 'duration')
+
+# Above this many possible cells per row, view() compacts the cell ids with np.unique first
+DENSE_CELLS_PER_ROW = 4
+
+
+def _encode(values):
+    """(int32 codes, sorted labels) for a 1-D array"""
+    codes, labels = pd.factorize(values, sort=True)
+    return codes.astype(np.int32), np.asarray(labels)
+
+
+class OlapCube:
+    def __init__(self, codes, labels, measures, levels=None):
+        self.codes    = codes                  # level -> int32 code per fact row
+        self.labels   = labels                 # level -> labels indexed by code
+        self.measures = measures               # measure -> float64 per fact row ('count' is implicit)
+        self.levels   = dict(levels or {'date': 1, 'resource': 0, 'department': 0})
+
+    @classmethod
+    def from_frames(cls, facts, resources):
+        date_key = facts['date_key'].to_numpy(dtype=np.int64)
+        lookup   = resources.drop_duplicates('resource_key').set_index('resource_key')
+        category = facts['resource_key'].map(lookup['resource_category'])
+        rtype    = facts['resource_key'].map(lookup['resource_type'])
+
+        columns = {
+            'year':              date_key // 10000,
+            'month':             date_key // 100 % 100,
+            'day':               date_key % 100,
+            'resource_category': category.fillna('').to_numpy(dtype=object),
+            'resource_type':     rtype.fillna('').to_numpy(dtype=object),
+            'department_key':    facts['department_key'].to_numpy(dtype=np.int64),
+        }
+        codes, labels = {}, {}
+        for level, values in columns.items():
+            codes[level], labels[level] = _encode(values)
+
+        measures = {
+            'quantity': pd.to_numeric(facts['quantity'], errors='coerce').fillna(0).to_numpy(dtype=np.float64),
+            'duration': pd.to_numeric(facts['duration_minutes'], errors='coerce').fillna(0).to_numpy(dtype=np.float64),
+        }
+        return cls(codes, labels, measures)
+
+    @classmethod
+    def from_database(cls, conn=None):
+        return cls.from_frames(run_query(FACT_SQL, conn=conn), run_query(RESOURCE_SQL, conn=conn))
+
+    def __len__(self):
+        return len(self.codes['year'])
+
+    def _derive(self, mask=None, levels=None):
+        if mask is None:
+            return OlapCube(self.codes, self.labels, self.measures, levels or self.levels)
+        return OlapCube({k: v[mask] for k, v in self.codes.items()}, self.labels,
+                        {k: v[mask] for k, v in self.measures.items()}, levels or self.levels)
+
+    # - navigation
+    def grouping(self):
+        """Levels the current view is grouped by"""
+        return [level for h, depth in self.levels.items() for level in HIERARCHIES[h][:depth]]
+
+    def drill_down(self, hierarchy='date'):
+        levels = dict(self.levels)
+        if levels[hierarchy] >= len(HIERARCHIES[hierarchy]):
+            raise ValueError(f"'{hierarchy}' is already at its finest level")
+        levels[hierarchy] += 1
+        return self._derive(levels=levels)
+
+    def roll_up(self, hierarchy='date'):
+        levels = dict(self.levels)
+        if levels[hierarchy] == 0:
+            raise ValueError(f"'{hierarchy}' is already fully rolled up")
+        levels[hierarchy] -= 1
+        return self._derive(levels=levels)
+
+    # - filtering
+    def _member_mask(self, level, members):
+        if level not in self.codes:
+            raise ValueError(f"Unknown level '{level}'")
+        wanted = np.flatnonzero(np.isin(self.labels[level], list(members)))
+        return np.isin(self.codes[level], wanted)
+
+    def slice(self, level, member):
+        """Rows where `level` equals `member`"""
+        return self._derive(mask=self._member_mask(level, [member]))
+
+    def dice(self, **members):
+        """Rows matching every criterion, e.g. dice(year=[2023, 2024], resource_category=['Digital'])"""
+        mask = np.ones(len(self), dtype=bool)
+        for level, values in members.items():
+            if np.isscalar(values) or isinstance(values, str):
+                values = [values]
+            mask &= self._member_mask(level, values)
+        return self._derive(mask=mask)
+
+    # - aggregation
+    def view(self, measure='count'):
+        """DataFrame of `measure` per occupied cell of the current grouping"""
+        if measure not in MEASURES:
+            raise ValueError(f"Unknown measure '{measure}' (choose from {', '.join(MEASURES)})")
+        dims    = self.grouping()
+        weights = None if measure == 'count' else self.measures[measure]
+
+        if not dims:
+            total = len(self) if weights is None else int(np.rint(weights.sum()))
+            return pd.DataFrame({measure: [total]})
+
+        shape = tuple(len(self.labels[d]) for d in dims)
+        cells = int(np.prod(shape, dtype=np.int64))
+        cell  = np.ravel_multi_index([self.codes[d] for d in dims], shape)
+
+        if cells > DENSE_CELLS_PER_ROW * max(len(self), 1):
+            occupied, cell = np.unique(cell, return_inverse=True)
+            sums = np.bincount(cell, weights=weights, minlength=len(occupied))
+        else:
+            counts   = np.bincount(cell, minlength=cells)
+            occupied = np.flatnonzero(counts)
+            sums     = counts if weights is None else np.bincount(cell, weights=weights, minlength=cells)
+            sums     = sums[occupied]
+
+        index = np.unravel_index(occupied, shape)
+        result = pd.DataFrame({d: self.labels[d][i] for d, i in zip(dims, index)})
+        if 'month' in dims:
+            result.insert(dims.index('month') + 1, 'month_name',
+                          [calendar.month_name[m] for m in result['month']])
+        # Every measure is a whole number; the float weights are only bincount's accumulator
+        result[measure] = np.rint(sums).astype(np.int64)
+        return result
@@ -1,18 +1,12 @@
-import pandas as pd
-import mysql.connector
+import argparse
+import time
 
-# -----------------------------
-# Database Connection
-# -----------------------------
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="",
-    database="university library analytics",
-    auth_plugin="mysql_native_password"
-)
+import pandas as pd
 
-print("Connected to database")
+from db_pool import get_connection, run_query
+from olap_cube import OlapCube
+from query_cache import CACHE
+from usage_aggregates import aggregate_for
 
 # -----------------------------
 # OLAP 1: DRILL-DOWN
@@ -27,8 +21,6 @@ JOIN dim_date d ON f.date_key = d.date_key
 GROUP BY d.year
 ORDER BY d.year;
 """
-print("\nDRILL-DOWN: YEAR LEVEL")
-print(pd.read_sql(query_year, conn))
 
 # Month level
 query_month = """
@@ -38,18 +30,15 @@ JOIN dim_date d ON f.date_key = d.date_key
 GROUP BY d.year, d.month_name, d.month
 ORDER BY d.year, d.month;
 """
-print("\nDRILL-DOWN: MONTH LEVEL")
-print(pd.read_sql(query_month, conn))
 
 # Day level
 query_day = """
 SELECT d.full_date, COUNT(*) AS total_usage
 FROM fact_library_usage f
 JOIN dim_date d ON f.date_key = d.date_key
+GROUP BY d.full_date
 ORDER BY d.full_date;
 """
-print("\nDRILL-DOWN: DAY LEVEL")
-print(pd.read_sql(query_day, conn))
 
 # -----------------------------
 # OLAP 2: ROLL-UP
@@ -63,8 +52,6 @@ JOIN dim_date d ON f.date_key = d.date_key
 GROUP BY d.year, d.month_name, d.month
 ORDER BY d.year, d.month;
 """
-print("\nROLL-UP: MONTHLY")
-print(pd.read_sql(query_roll_month, conn))
 
 query_roll_year = """
 SELECT d.year, SUM(f.quantity) AS total_quantity
@@ -72,8 +59,6 @@ FROM fact_library_usage f
 JOIN dim_date d ON f.date_key = d.date_key
 GROUP BY d.year;
 """
-print("\nROLL-UP: YEARLY")
-print(pd.read_sql(query_roll_year, conn))
 
 # -----------------------------
 # OLAP 3: SLICE
@@ -87,8 +72,6 @@ JOIN dim_resource r ON f.resource_key = r.resource_key
 WHERE r.resource_category = 'Digital'
 GROUP BY d.full_date;
 """
-print("\nSLICE: DIGITAL RESOURCES")
-print(pd.read_sql(query_slice_digital, conn))
 
 # -----------------------------
 # OLAP 4: DICE
@@ -101,14 +84,145 @@ JOIN dim_date d ON f.date_key = d.date_key
 JOIN dim_resource r ON f.resource_key = r.resource_key
 WHERE r.resource_category = 'Digital'
   AND d.year = 2024
+  AND f.date_key BETWEEN 20240101 AND 20241231   -- lets MySQL prune date_key partitions
 GROUP BY d.month_name, d.month
 ORDER BY d.month;
 """
-print("\nDICE: DIGITAL RESOURCES IN 2024")
-print(pd.read_sql(query_dice, conn))
 
 # -----------------------------
-# Close connection
+# Same operations on the agg_usage_* summary tables
+# (maintained by the ETL; each reads the smallest table that can answer it)
 # -----------------------------
-conn.close()
-print("\nConnection closed")
+
+agg_query_year = f"""
+SELECT year, SUM(usage_count) AS total_usage
+FROM {aggregate_for('year', 'usage_count')}
+GROUP BY year
+ORDER BY year;
+"""
+
+agg_query_month = f"""
+SELECT year, month_name, SUM(usage_count) AS total_usage
+FROM {aggregate_for('year', 'month', 'month_name', 'usage_count')}
+GROUP BY year, month_name, month
+ORDER BY year, month;
+"""
+
+agg_query_day = f"""
+SELECT full_date, SUM(usage_count) AS total_usage
+FROM {aggregate_for('full_date', 'usage_count')}
+GROUP BY full_date
+ORDER BY full_date;
+"""
+
+agg_query_roll_month = f"""
+SELECT year, month_name, SUM(total_quantity) AS total_quantity
+FROM {aggregate_for('year', 'month', 'month_name', 'total_quantity')}
+GROUP BY year, month_name, month
+ORDER BY year, month;
+"""
+
+agg_query_roll_year = f"""
+SELECT year, SUM(total_quantity) AS total_quantity
+FROM {aggregate_for('year', 'total_quantity')}
+GROUP BY year;
+"""
+
+agg_query_slice_digital = f"""
+SELECT full_date, SUM(total_quantity) AS digital_usage
+FROM {aggregate_for('full_date', 'resource_category', 'total_quantity')}
+WHERE resource_category = 'Digital'
+GROUP BY full_date;
+"""
+
+agg_query_dice = f"""
+SELECT month_name, SUM(total_quantity) AS total_usage
+FROM {aggregate_for('year', 'month', 'month_name', 'resource_category', 'total_quantity')}
+WHERE resource_category = 'Digital'
+  AND year = 2024
+GROUP BY month_name, month
+ORDER BY month;
+"""
+
+# Report order and titles
+OPERATIONS = [
+    ("drill_year", "DRILL-DOWN: YEAR LEVEL", query_year),
+    ("drill_month", "DRILL-DOWN: MONTH LEVEL", query_month),
+    ("drill_day", "DRILL-DOWN: DAY LEVEL", query_day),
+    ("roll_month", "ROLL-UP: MONTHLY", query_roll_month),
+    ("roll_year", "ROLL-UP: YEARLY", query_roll_year),
+    ("slice_digital", "SLICE: DIGITAL RESOURCES", query_slice_digital),
+    ("dice", "DICE: DIGITAL RESOURCES IN 2024", query_dice),
+]
+
+AGGREGATE_QUERIES = {
+    "drill_year": agg_query_year,
+    "drill_month": agg_query_month,
+    "drill_day": agg_query_day,
+    "roll_month": agg_query_roll_month,
+    "roll_year": agg_query_roll_year,
+    "slice_digital": agg_query_slice_digital,
+    "dice": agg_query_dice,
+}
+
+
+def as_query(view, *columns):
+    """A cube view with the columns of the matching SQL query (the last one names the measure)"""
+    view = view.rename(columns={view.columns[-1]: columns[-1]})
+    if 'day' in view.columns:
+        view = view.assign(full_date=pd.to_datetime(view[['year', 'month', 'day']]).dt.date)
+    return view[list(columns)]
+
+
+# The same operations on an in-memory OlapCube (loaded once, no further queries)
+CUBE_OPERATIONS = {
+    "drill_year": lambda cube: as_query(cube.view('count'), 'year', 'total_usage'),
+    "drill_month": lambda cube: as_query(cube.drill_down('date').view('count'),
+                                         'year', 'month_name', 'total_usage'),
+    "drill_day": lambda cube: as_query(cube.drill_down('date').drill_down('date').view('count'),
+                                       'full_date', 'total_usage'),
+    "roll_month": lambda cube: as_query(cube.drill_down('date').drill_down('date').roll_up('date').view('quantity'),
+                                        'year', 'month_name', 'total_quantity'),
+    "roll_year": lambda cube: as_query(cube.drill_down('date').roll_up('date').view('quantity'),
+                                       'year', 'total_quantity'),
+    "slice_digital": lambda cube: as_query(cube.slice('resource_category', 'Digital')
+                                           .drill_down('date').drill_down('date').view('quantity'),
+                                           'full_date', 'digital_usage'),
+    "dice": lambda cube: as_query(cube.dice(resource_category='Digital', year=2024).drill_down('date').view('quantity'),
+                                  'month_name', 'total_usage'),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OLAP operations on library usage")
+    parser.add_argument('--from-facts', action='store_true',
+                        help="scan fact_library_usage instead of the agg_usage_* summary tables")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="load the facts once into an OlapCube and run every operation in NumPy")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    print("Connected to database")
+    try:
+        if args.in_memory:
+            start = time.perf_counter()
+            cube = OlapCube.from_database(conn=conn)
+            print(f"Loaded {len(cube)} fact rows into the cube in {time.perf_counter() - start:.3f}s")
+            for name, title, _ in OPERATIONS:
+                start = time.perf_counter()
+                result = CUBE_OPERATIONS[name](cube)
+                print(f"\n{title} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+                print(result)
+        else:
+            for name, title, query in OPERATIONS:
+                if not args.from_facts:
+                    query = AGGREGATE_QUERIES[name]
+                print(f"\n{title}")
+                print(run_query(query, conn=conn, cache=CACHE))
+    finally:
+        conn.close()
+    print("\nConnection closed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,117 +1,63 @@
 import pandas as pd
-import mysql.connector
 
-# -----------------------------
-# Database Connection
-# -----------------------------
-conn = mysql.connector.connect(
-    host="localhost",
-    user="root",
-    password="",
-    database="university library analytics",
-    auth_plugin="mysql_native_password"
-)
-
-print("Connected to database")
-
-# -----------------------------
-# PIVOT VIEW 1
-# Resource Type × Year
-# -----------------------------
-query1 = """
-SELECT d.year, r.resource_type, f.quantity
-FROM fact_library_usage f
-JOIN dim_date d ON f.date_key = d.date_key
-JOIN dim_resource r ON f.resource_key = r.resource_key;
-"""
-df1 = pd.read_sql(query1, conn)
-
-pivot_resource_year = pd.pivot_table(
-    df1,
-    values="quantity",
-    index="resource_type",
-    columns="year",
-    aggfunc="sum",
-    fill_value=0
-)
-
-print("\nPIVOT 1: Resource Type × Year")
-print(pivot_resource_year)
-
-# -----------------------------
-# PIVOT VIEW 2
-# Department × Resource Type
-# -----------------------------
-query2 = """
-SELECT dep.department_name, r.resource_type, f.quantity
-FROM fact_library_usage f
-JOIN dim_department dep ON f.department_key = dep.department_id
-JOIN dim_resource r ON f.resource_key = r.resource_key;
-"""
-df2 = pd.read_sql(query2, conn)
-
-pivot_dept_resource = pd.pivot_table(
-    df2,
-    values="quantity",
-    index="department_name",
-    columns="resource_type",
-    aggfunc="sum",
-    fill_value=0
-)
-
-print("\nPIVOT 2: Department × Resource Type")
-print(pivot_dept_resource)
-
-# -----------------------------
-# PIVOT VIEW 3
-# Student Type × Resource Category
-# -----------------------------
-query3 = """
-SELECT s.student_type, r.resource_category, f.quantity
-FROM fact_library_usage f
-JOIN dim_student s ON f.student_key = s.student_key
-JOIN dim_resource r ON f.resource_key = r.resource_key;
-"""
-df3 = pd.read_sql(query3, conn)
-
-pivot_student_resource = pd.pivot_table(
-    df3,
-    values="quantity",
-    index="student_type",
-    columns="resource_category",
-    aggfunc="sum",
-    fill_value=0
-)
-
-print("\nPIVOT 3: Student Type × Resource Category")
-print(pivot_student_resource)
+from db_pool import get_connection, run_query
+from query_cache import CACHE
 
 # -----------------------------
-# PIVOT VIEW 4
-# Month × Department
+# One scan for all pivots: the GROUP BY runs in the database at the
+# combined grain of every pivot dimension, so only aggregated cells are
+# transferred. LEFT JOINs keep each fact row once; a pivot whose own
+# dimension is missing (NULL) drops those cells just like the inner
+# joins of a per-pivot query would.
 # -----------------------------
-query4 = """
-SELECT d.month_name, dep.department_name, f.quantity
+query_cells = """
+SELECT d.year, d.month_name, r.resource_type, r.resource_category,
+       dep.department_name, s.student_type, SUM(f.quantity) AS quantity
 FROM fact_library_usage f
-JOIN dim_date d ON f.date_key = d.date_key
-JOIN dim_department dep ON f.department_key = dep.department_id;
+LEFT JOIN dim_date d ON f.date_key = d.date_key
+LEFT JOIN dim_resource r ON f.resource_key = r.resource_key
+LEFT JOIN dim_department dep ON f.department_key = dep.department_id
+LEFT JOIN dim_student s ON f.student_key = s.student_key
+GROUP BY d.year, d.month_name, r.resource_type, r.resource_category,
+         dep.department_name, s.student_type;
 """
-df4 = pd.read_sql(query4, conn)
-
-pivot_month_department = pd.pivot_table(
-    df4,
-    values="quantity",
-    index="month_name",
-    columns="department_name",
-    aggfunc="sum",
-    fill_value=0
-)
 
-print("\nPIVOT 4: Month × Department")
-print(pivot_month_department)
-
-# -----------------------------
-# Close connection
-# -----------------------------
-conn.close()
-print("\nConnection closed")
+# name, title, pivot index, pivot columns
+PIVOTS = [
+    ("pivot_resource_year", "PIVOT 1: Resource Type × Year", "resource_type", "year"),
+    ("pivot_dept_resource", "PIVOT 2: Department × Resource Type", "department_name", "resource_type"),
+    ("pivot_student_resource", "PIVOT 3: Student Type × Resource Category", "student_type", "resource_category"),
+    ("pivot_month_department", "PIVOT 4: Month × Department", "month_name", "department_name"),
+]
+
+
+def build_pivot(df, index, columns):
+    # Cells missing this pivot's dimensions only count towards the other pivots;
+    # year comes back as float once such NULL cells are in the frame
+    df = df.dropna(subset=[index, columns])
+    df = df.astype({c: 'int64' for c in (index, columns) if df[c].dtype.kind == 'f'})
+    return pd.pivot_table(
+        df,
+        values="quantity",
+        index=index,
+        columns=columns,
+        aggfunc="sum",
+        fill_value=0
+    )
+
+
+def main():
+    conn = get_connection()
+    print("Connected to database")
+    try:
+        cells = run_query(query_cells, conn=conn, cache=CACHE)
+        for _, title, index, columns in PIVOTS:
+            print(f"\n{title}")
+            print(build_pivot(cells, index, columns))
+    finally:
+        conn.close()
+    print("\nConnection closed")
+
+
+if __name__ == "__main__":
+    main()
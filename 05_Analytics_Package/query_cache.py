@@ -0,0 +1,143 @@
+"""Result cache for analytics queries.
+
+fact_library_usage only changes when the ETL commits, so LibraryETL bumps
+a version counter in etl_fact_version inside every fact commit. Cached
+results are keyed on the normalised SQL (+ parameters) and that version,
+so a new load invalidates everything at once without any explicit purge.
+
+Entries live in an in-memory LRU bounded by entry count and total
+DataFrame size; with disk_dir set (or $LIBRARY_QUERY_CACHE_DIR) they are
+also pickled to disk so a fresh process can reuse them.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+
+from db_backend import MISSING_TABLE_ERRORS
+
+VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS etl_fact_version (
+      id         tinyint NOT NULL,
+      version    bigint NOT NULL DEFAULT 0,
+      updated_at timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+      PRIMARY KEY (id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+"""
+
+
+# - version stamp (written by the ETL, read by the cache)
+def ensure_version_table(cursor):
+    cursor.execute(VERSION_DDL)
+    cursor.execute("INSERT IGNORE INTO etl_fact_version (id, version) VALUES (1, 0)")
+
+
+def bump_fact_version(cursor):
+    """Call inside the transaction that commits new fact rows"""
+    cursor.execute("UPDATE etl_fact_version SET version = version + 1 WHERE id = 1")
+
+
+def read_fact_version(conn):
+    """Current fact-table version, or None if the ETL has not created the stamp yet"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT version FROM etl_fact_version WHERE id = 1")
+        row = cursor.fetchone()
+    except MISSING_TABLE_ERRORS:
+        return None
+    finally:
+        cursor.close()
+    return row[0] if row else None
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and drop trailing semicolons (literals are left alone)"""
+    return re.sub(r'\s+', ' ', sql).strip().rstrip(';').strip()
+
+
+class QueryCache:
+    def __init__(self, max_entries=256, max_bytes=256 * 1024 * 1024, disk_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+        self.disk_dir    = disk_dir
+        self.entries     = OrderedDict()     # key -> (DataFrame, size in bytes)
+        self.total_bytes = 0
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, sql, params, version):
+        text = f"{normalize_sql(sql)}|{params!r}"
+        return f"{version}_{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def get(self, sql, params, version):
+        key = self.key(sql, params, version)
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0].copy(deep=False)
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    df = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                logging.warning(f"Ignoring unreadable cache file for {key}: {e}")
+            else:
+                self._remember(key, df)
+                with self._lock:
+                    self.hits += 1
+                return df.copy(deep=False)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, sql, params, version, df):
+        key = self.key(sql, params, version)
+        self._remember(key, df)
+        if self.disk_dir:
+            self._write_disk(key, version, df)
+
+    def _remember(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (df, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, old_size) = self.entries.popitem(last=False)
+                self.total_bytes -= old_size
+
+    def _write_disk(self, key, version, df):
+        os.makedirs(self.disk_dir, exist_ok=True)
+        # Files of older fact versions can never be hit again
+        for name in os.listdir(self.disk_dir):
+            if name.endswith('.pkl') and not name.startswith(f"{version}_"):
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except FileNotFoundError:
+                    pass
+        tmp = self._disk_path(key) + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._disk_path(key))
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+# Process-wide cache used by the analytics scripts
+CACHE = QueryCache(disk_dir=os.environ.get('LIBRARY_QUERY_CACHE_DIR'))
@@ -0,0 +1,332 @@
+"""MySQL -> DuckDB SQL translation.
+
+The ETL and the analytics scripts are written in MySQL's dialect.
+to_duckdb() rewrites one statement for the embedded DuckDB backend
+(db_backend.py); the result is a tuple of statements, empty for session
+settings DuckDB has no use for.
+
+    `ident`                          "ident"
+    %s                               ?
+    INSERT IGNORE                    INSERT OR IGNORE
+    ON DUPLICATE KEY UPDATE          ON CONFLICT DO UPDATE SET, VALUES(c) -> excluded.c
+      c = VALUES(c)
+    x [NOT] REGEXP 'p'               [NOT] regexp_matches(x, 'p', 'i')
+    FIELD(x, a, b, ...)              COALESCE(list_position([a, b, ...], x), 0)
+    STR_TO_DATE(x, '%M ...')         CAST(try_strptime(x, '%B ...') AS DATE)
+    DATABASE()                       current_schema()
+    LIKE '..\\_..'                   LIKE '..\\_..' ESCAPE '\\'
+    CHECKSUM TABLE t                 SELECT <sum of row hashes> AS "Checksum"
+    CREATE TEMPORARY TABLE t LIKE s  CREATE TEMPORARY TABLE t AS SELECT * FROM s LIMIT 0
+    CREATE TABLE column types        int(11) -> INTEGER, tinyint(1) -> SMALLINT, UNSIGNED,
+                                     AUTO_INCREMENT -> a sequence default, ENGINE/CHARSET/
+                                     COLLATE options, ON UPDATE current_timestamp() dropped
+    SET NAMES / SQL_MODE / ...       (dropped)
+
+translate_dump() turns a mysqldump/phpMyAdmin file such as
+03_Database_File/university_library_analytics (1).sql into DuckDB
+statements: the ALTER TABLE ... ADD PRIMARY KEY / UNIQUE KEY / MODIFY
+AUTO_INCREMENT that dumps put after the data are folded into each CREATE
+TABLE, zero dates become NULL, and what DuckDB cannot express (triggers,
+foreign keys, secondary indexes) is left out.
+"""
+
+import functools
+import re
+
+
+class UnsupportedStatement(ValueError):
+    """A MySQL feature with no DuckDB counterpart (LOAD DATA, triggers, session variables)"""
+
+
+# - string literals are swapped out while the code around them is rewritten
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'", re.S)
+_TOKEN = '\x00{}\x00'
+_TOKEN_RE = re.compile(r'\x00(\d+)\x00')
+_MYSQL_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a',
+                  '%': '\\%', '_': '\\_'}     # \% and \_ keep their backslash (LIKE escapes)
+
+
+def _unescape(literal):
+    """Body of a MySQL string literal as plain text"""
+    body = literal[1:-1].replace("''", "'")
+    return re.sub(r'\\(.)', lambda m: _MYSQL_ESCAPES.get(m.group(1), m.group(1)), body, flags=re.S)
+
+
+def _quote(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _protect(sql):
+    literals = []
+
+    def keep(m):
+        literals.append(_unescape(m.group(0)))
+        return _TOKEN.format(len(literals) - 1)
+    return _LITERAL.sub(keep, sql), literals
+
+
+def _restore(sql, literals):
+    return _TOKEN_RE.sub(lambda m: _quote(literals[int(m.group(1))]), sql)
+
+
+def _call_args(sql, open_paren):
+    """(argument strings, index after the closing paren) of the call whose '(' is at open_paren"""
+    depth, args, start = 0, [], open_paren + 1
+    for i in range(open_paren, len(sql)):
+        ch = sql[i]
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0:
+                args.append(sql[start:i].strip())
+                return args, i + 1
+        elif ch == ',' and depth == 1:
+            args.append(sql[start:i].strip())
+            start = i + 1
+    raise ValueError(f"Unbalanced parentheses in: {sql[open_paren:open_paren + 60]}")
+
+
+def _rewrite_calls(sql, name, build):
+    pattern = re.compile(rf'\b{name}\s*\(', re.I)
+    while True:
+        m = pattern.search(sql)
+        if not m:
+            return sql
+        args, end = _call_args(sql, m.end() - 1)
+        sql = sql[:m.start()] + build(args) + sql[end:]
+
+
+# MySQL DATE_FORMAT/STR_TO_DATE specifiers -> strftime
+STRPTIME_CODES = {'%M': '%B', '%c': '%-m', '%e': '%-d', '%i': '%M', '%s': '%S', '%W': '%A',
+                  '%T': '%H:%M:%S', '%h': '%I', '%k': '%-H', '%l': '%-I'}
+
+
+def _str_to_date(args, literals):
+    value, fmt = args
+    m = _TOKEN_RE.fullmatch(fmt)
+    if m:
+        i = int(m.group(1))
+        literals[i] = re.sub(r'%.', lambda c: STRPTIME_CODES.get(c.group(0), c.group(0)), literals[i])
+    return f"CAST(try_strptime({value}, {fmt}) AS DATE)"
+
+
+# - column types and table options
+_TYPES = [
+    (r'\b(?:tiny|small|medium)?int\(\d+\)\s+unsigned\b|\bint\s+unsigned\b', 'BIGINT'),
+    (r'\bbigint(?:\(\d+\))?(?:\s+unsigned)?\b',                           'BIGINT'),
+    (r'\btinyint(?:\(\d+\))?',                                           'SMALLINT'),
+    (r'\b(?:smallint|mediumint)(?:\(\d+\))?',                            'INTEGER'),
+    (r'\bint\(\d+\)',                                                    'INTEGER'),
+    (r'\bdouble\s*\(\d+,\s*\d+\)',                                       'DOUBLE'),
+    (r'\b(?:long|medium|tiny)text\b',                                    'TEXT'),
+    (r'\benum\s*\([^)]*\)',                                              'VARCHAR'),
+    (r'\bdatetime\b',                                                    'TIMESTAMP'),
+    (r'\bcurrent_timestamp\(\)',                                         'current_timestamp'),
+    (r'\s+ON\s+UPDATE\s+current_timestamp',                              ''),
+    (r'\s+(?:CHARACTER\s+SET|COLLATE)\s+\w+',                            ''),
+]
+_TABLE_OPTIONS = re.compile(r'\)\s*((?:ENGINE|DEFAULT\s+CHARSET|CHARSET|COLLATE|AUTO_INCREMENT|COMMENT)'
+                            r'\b[^()]*)$', re.I | re.S)
+_CREATE_TABLE = re.compile(r'^\s*CREATE\s+(TEMPORARY\s+)?TABLE\s+(IF\s+NOT\s+EXISTS\s+)?"?(\w+)"?\s*\(',
+                           re.I)
+
+
+def _create_table(sql):
+    """CREATE TABLE with MySQL column types / keys / options -> (sequence DDL..., CREATE TABLE)"""
+    m = _CREATE_TABLE.match(sql)
+    table = m.group(3)
+    start = 1
+    options = _TABLE_OPTIONS.search(sql)
+    if options:
+        auto = re.search(r'AUTO_INCREMENT\s*=\s*(\d+)', options.group(1), re.I)
+        start = int(auto.group(1)) if auto else 1
+        sql = sql[:options.start()] + ')'
+
+    body_args, end = _call_args(sql, m.end() - 1)
+    columns, sequences = [], []
+    for item in body_args:
+        head = item.split(None, 1)[0].upper() if item else ''
+        if head in ('KEY', 'INDEX', 'CONSTRAINT', 'FOREIGN', 'FULLTEXT', 'SPATIAL'):
+            continue                        # secondary indexes and foreign keys are left out
+        if head == 'UNIQUE':
+            cols = item[item.index('('):]
+            columns.append(f"UNIQUE {cols}")
+            continue
+        for pattern, replacement in _TYPES:
+            item = re.sub(pattern, replacement, item, flags=re.I)
+        if re.search(r'\bAUTO_INCREMENT\b', item, re.I):
+            column = item.split(None, 1)[0].strip('"')
+            seq = f"seq_{table}_{column}"
+            sequences.append(f"CREATE SEQUENCE IF NOT EXISTS {seq} START {start}")
+            item = re.sub(r'\s*\bAUTO_INCREMENT\b', f" DEFAULT nextval('{seq}')", item, flags=re.I)
+        columns.append(item)
+    return tuple(sequences) + (sql[:m.end()] + ',\n  '.join(columns) + ')' + sql[end:],)
+
+
+# - statements DuckDB does without
+_IGNORED = re.compile(r'^\s*(SET\s+(NAMES|SQL_MODE|time_zone|FOREIGN_KEY_CHECKS|UNIQUE_CHECKS|AUTOCOMMIT)\b'
+                      r'|LOCK\s+TABLES|UNLOCK\s+TABLES|START\s+TRANSACTION|COMMIT\s*;?\s*$)', re.I)
+_UNSUPPORTED = re.compile(r'^\s*(LOAD\s+DATA|SET\s+@|CREATE\s+(DEFINER\s*=\s*\S+\s+)?TRIGGER|DROP\s+TRIGGER)'
+                          r'|\bLAST_INSERT_ID\s*\(', re.I)
+
+
+@functools.lru_cache(maxsize=1024)
+def to_duckdb(sql):
+    """DuckDB statements equivalent to one MySQL statement (a tuple, possibly empty)"""
+    code, literals = _protect(sql.strip().rstrip(';'))
+    if _IGNORED.match(code):
+        return ()
+    if _UNSUPPORTED.search(code):
+        raise UnsupportedStatement(f"Not supported by the DuckDB backend: {sql.strip()[:80]}")
+
+    code = code.replace('`', '"')
+    code = re.sub(r'(?<!%)%s', '?', code)
+    code = re.sub(r'\bDATABASE\(\)', 'current_schema()', code, flags=re.I)
+    code = re.sub(r'\bINSERT\s+IGNORE\s+INTO\b', 'INSERT OR IGNORE INTO', code, flags=re.I)
+    code = re.sub(r'\bDROP\s+TEMPORARY\s+TABLE\b', 'DROP TABLE', code, flags=re.I)
+    code = re.sub(r'^\s*CREATE\s+TEMPORARY\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?([\w"]+)\s+LIKE\s+([\w"]+)\s*$',
+                  r'CREATE TEMPORARY TABLE \1\2 AS SELECT * FROM \3 LIMIT 0', code, flags=re.I)
+    code = re.sub(r'^\s*CHECKSUM\s+TABLE\s+([\w"]+)\s*$',
+                  r'SELECT COALESCE(SUM(hash(\1)), 0) AS "Checksum" FROM \1', code, flags=re.I)
+
+    code = re.sub(r'([\w."]+)\s+(NOT\s+)?REGEXP\s+(\x00\d+\x00)',
+                  lambda m: f"{'NOT ' if m.group(2) else ''}regexp_matches({m.group(1)}, {m.group(3)}, 'i')",
+                  code, flags=re.I)
+    code = _rewrite_calls(code, 'FIELD',
+                          lambda a: f"COALESCE(list_position([{', '.join(a[1:])}], {a[0]}), 0)")
+    code = _rewrite_calls(code, 'STR_TO_DATE', lambda a: _str_to_date(a, literals))
+
+    # LIKE patterns with MySQL's default backslash escape
+    def like(m):
+        if '\\' not in literals[int(m.group(2).strip('\x00'))]:
+            return m.group(0)
+        literals.append('\\')
+        return f"{m.group(1)}{m.group(2)} ESCAPE {_TOKEN.format(len(literals) - 1)}"
+    code = re.sub(r'(\bLIKE\s+)(\x00\d+\x00)(?!\s*ESCAPE)', like, code, flags=re.I)
+
+    dup = re.search(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', code, re.I)
+    if dup:
+        assignments = re.sub(r'\bVALUES\s*\(\s*([\w"]+)\s*\)', r'excluded.\1', code[dup.end():], flags=re.I)
+        code = code[:dup.start()] + 'ON CONFLICT DO UPDATE SET' + assignments
+
+    if _CREATE_TABLE.match(code):
+        return tuple(_restore(stmt, literals) for stmt in _create_table(code))
+    return (_restore(code, literals),)
+
+
+# -----------------------------
+# Dump files
+# -----------------------------
+def split_statements(text):
+    """Statements of a SQL dump, without comments; DELIMITER blocks (triggers) come back whole"""
+    statements, buf, delimiter = [], [], ';'
+    i, n = 0, len(text)
+    while i < n:
+        if text.startswith('DELIMITER ', i) and (i == 0 or text[i - 1] == '\n'):
+            end = text.find('\n', i)
+            end = n if end < 0 else end
+            delimiter = text[i + len('DELIMITER '):end].strip()
+            i = end + 1
+            continue
+        ch = text[i]
+        if ch in "'\"`":
+            j = i + 1
+            while j < n and text[j] != ch:
+                j += 2 if text[j] == '\\' else 1
+            buf.append(text[i:j + 1])
+            i = j + 1
+        elif text.startswith('--', i) or ch == '#':
+            end = text.find('\n', i)
+            i = n if end < 0 else end + 1
+        elif text.startswith('/*', i):
+            end = text.find('*/', i)
+            i = n if end < 0 else end + 2
+        elif text.startswith(delimiter, i):
+            statement = ''.join(buf).strip()
+            if statement:
+                statements.append(statement)
+            buf = []
+            i += len(delimiter)
+        else:
+            buf.append(ch)
+            i += 1
+    statement = ''.join(buf).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+_ALTER = re.compile(r'^\s*ALTER\s+TABLE\s+`?(\w+)`?\s+(.*)$', re.I | re.S)
+_ZERO_DATE = re.compile(r"'0000-00-00(?: 00:00:00)?'")
+
+
+def _alter_clauses(body):
+    """Top-level comma-separated clauses of an ALTER TABLE"""
+    clauses, depth, start = [], 0, 0
+    for i, ch in enumerate(body):
+        depth += ch == '('
+        depth -= ch == ')'
+        if ch == ',' and depth == 0:
+            clauses.append(body[start:i].strip())
+            start = i + 1
+    clauses.append(body[start:].strip())
+    return clauses
+
+
+def translate_dump(text):
+    """DuckDB statements recreating the schema and data of a MySQL dump; returns (statements, skipped)
+
+    skipped lists the statements that could not be carried over (triggers, ...).
+    """
+    statements = split_statements(text)
+
+    # Keys and AUTO_INCREMENT from the trailing ALTER TABLEs, folded into each CREATE TABLE
+    keys, autos = {}, {}
+    for statement in statements:
+        m = _ALTER.match(statement)
+        if not m:
+            continue
+        table = m.group(1)
+        for clause in _alter_clauses(m.group(2)):
+            if re.match(r'ADD\s+(PRIMARY|UNIQUE)\s+KEY', clause, re.I):
+                keys.setdefault(table, []).append(re.sub(r'^ADD\s+', '', clause, flags=re.I))
+            elif re.match(r'MODIFY\s', clause, re.I) and re.search(r'AUTO_INCREMENT', clause, re.I):
+                autos[table] = re.sub(r'^MODIFY\s+', '', clause, flags=re.I)
+            elif re.match(r'AUTO_INCREMENT\s*=', clause, re.I):
+                autos[table] = autos.get(table, '') + f" /*start*/ {clause}"
+
+    out, skipped = [], []
+    for statement in statements:
+        if _ALTER.match(statement):
+            continue
+        m = re.match(r'^\s*CREATE\s+TABLE\s+`?(\w+)`?\s*\(', statement, re.I)
+        if m and m.group(1) in keys.keys() | autos.keys():
+            statement = _fold_keys(statement, keys.get(m.group(1), []), autos.get(m.group(1)))
+        statement = re.sub(r'^\s*CREATE\s+ALGORITHM\s*=\s*\w+\s+DEFINER\s*=\s*\S+\s+SQL\s+SECURITY\s+\w+\s+VIEW',
+                           'CREATE VIEW', statement, flags=re.I)
+        if re.match(r'^\s*INSERT\b', statement, re.I):
+            statement = _ZERO_DATE.sub('NULL', statement)
+        try:
+            out.extend(to_duckdb(statement))
+        except UnsupportedStatement:
+            skipped.append(statement.split('\n', 1)[0][:100])
+    return out, skipped
+
+
+def _fold_keys(create, key_clauses, auto):
+    """Add PRIMARY/UNIQUE KEY clauses and the AUTO_INCREMENT column definition to a CREATE TABLE"""
+    close = create.rindex(')')
+    body, tail = create[:close].rstrip(), create[close:]
+    if auto:
+        definition, _, start = auto.partition('/*start*/')
+        definition = re.sub(r',\s*AUTO_INCREMENT\s*=\s*\d+\s*$', '', definition.strip())
+        start = re.search(r'AUTO_INCREMENT\s*=\s*(\d+)', auto, re.I)
+        column = definition.split(None, 1)[0]
+        body = re.sub(rf'^(\s*){re.escape(column)}\s.*?(,?)$', lambda m: f"{m.group(1)}{definition}{m.group(2)}",
+                      body, count=1, flags=re.M)
+        if start:
+            tail = tail.rstrip().rstrip(';') + f" AUTO_INCREMENT={start.group(1)}"
+    for clause in key_clauses:
+        body += ',\n  ' + clause
+    return body + '\n' + tail
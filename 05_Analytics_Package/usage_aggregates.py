@@ -0,0 +1,137 @@
+"""Pre-aggregated fact_library_usage for the OLAP roll-ups.
+
+Three summary tables hold usage counts, quantity and duration per
+(date grain, resource_category, resource_type, department_key):
+
+    agg_usage_year    year
+    agg_usage_month   year, month
+    agg_usage_day     year, month, day (date_key)
+
+LibraryETL folds every loaded batch into them (fold() only reads the fact
+rows with a usage_key above the last folded one) inside the same
+transaction as the facts, so the summaries always match the committed
+fact table. Fact rows without a resource (room bookings) are grouped
+under resource_category = resource_type = ''.
+
+aggregate_for() picks the smallest table whose grain covers the columns
+a query needs, so roll-ups and drill-downs scan a few hundred summary
+rows instead of the whole fact table.
+"""
+
+import logging
+
+DIMENSION_COLUMNS = ['resource_category', 'resource_type', 'department_key']
+MEASURE_COLUMNS   = ['usage_count', 'total_quantity', 'total_duration']
+
+# Smallest first: (table, date columns stored, of which key columns)
+AGGREGATES = [
+    ('agg_usage_year',  ['year'],                                           ['year']),
+    ('agg_usage_month', ['year', 'month', 'month_name'],                    ['year', 'month']),
+    ('agg_usage_day',   ['date_key', 'full_date', 'year', 'month', 'day'],  ['date_key']),
+]
+
+# dim_date expression for each stored date column
+DATE_EXPRESSIONS = {
+    'date_key':   'd.date_key',
+    'full_date':  'd.full_date',
+    'year':       'd.year',
+    'month':      'd.month',
+    'month_name': "COALESCE(d.month_name, '')",
+    'day':        'd.day_of_month',
+}
+
+COLUMN_DDL = {
+    'date_key':          'int(11) NOT NULL',
+    'full_date':         'date NOT NULL',
+    'year':              'int(11) NOT NULL',
+    'month':             'int(11) NOT NULL',
+    'month_name':        "varchar(10) NOT NULL DEFAULT ''",
+    'day':               'int(11) NOT NULL',
+    'resource_category': "varchar(50) NOT NULL DEFAULT ''",
+    'resource_type':     "varchar(50) NOT NULL DEFAULT ''",
+    'department_key':    'int(11) NOT NULL',
+    'usage_count':       'bigint NOT NULL DEFAULT 0',
+    'total_quantity':    'bigint NOT NULL DEFAULT 0',
+    'total_duration':    'bigint NOT NULL DEFAULT 0',
+}
+
+
+def aggregate_for(*columns):
+    """Name of the smallest aggregate table that has every one of `columns`"""
+    for table, date_columns, _ in AGGREGATES:
+        if set(columns) <= set(date_columns + DIMENSION_COLUMNS + MEASURE_COLUMNS):
+            return table
+    raise ValueError(f"No aggregate table covers {', '.join(columns)}")
+
+
+class UsageAggregates:
+    def __init__(self, cursor, fact_table='fact_library_usage'):
+        self.cursor     = cursor               # dictionary cursor
+        self.fact_table = fact_table
+        self.last_key   = None                 # highest usage_key already folded in
+
+    def ensure_tables(self):
+        """Create missing summary tables; True if any had to be created (they then need a rebuild)"""
+        self.cursor.execute(
+            "SELECT TABLE_NAME AS t FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME LIKE 'agg\\_usage\\_%'"
+        )
+        existing = {row['t'] for row in self.cursor.fetchall()}
+        created = False
+        for table, date_columns, key_columns in AGGREGATES:
+            if table in existing:
+                continue
+            columns = date_columns + DIMENSION_COLUMNS + MEASURE_COLUMNS
+            body = ',\n  '.join(f"{col} {COLUMN_DDL[col]}" for col in columns)
+            self.cursor.execute(
+                f"CREATE TABLE {table} (\n  {body},\n"
+                f"  PRIMARY KEY ({', '.join(key_columns + DIMENSION_COLUMNS)})\n"
+                f") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci"
+            )
+            logging.info(f"  created aggregate table {table}")
+            created = True
+        return created
+
+    def _max_usage_key(self):
+        self.cursor.execute(f"SELECT COALESCE(MAX(usage_key), 0) AS k FROM {self.fact_table}")
+        return int(self.cursor.fetchone()['k'])
+
+    def _fold_range(self, low, high):
+        """Add the fact rows with low < usage_key <= high to every summary table"""
+        for table, date_columns, _ in AGGREGATES:
+            group = [DATE_EXPRESSIONS[col] for col in date_columns] + [
+                "COALESCE(r.resource_category, '')", "COALESCE(r.resource_type, '')", "f.department_key"
+            ]
+            columns = date_columns + DIMENSION_COLUMNS + MEASURE_COLUMNS
+            self.cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"SELECT {', '.join(group)}, COUNT(*), "
+                f"SUM(COALESCE(f.quantity, 0)), SUM(COALESCE(f.duration_minutes, 0)) "
+                f"FROM {self.fact_table} f "
+                f"JOIN dim_date d ON f.date_key = d.date_key "
+                f"LEFT JOIN dim_resource r ON f.resource_key = r.resource_key "
+                f"WHERE f.usage_key > %s AND f.usage_key <= %s "
+                f"GROUP BY {', '.join(group)} "
+                f"ON DUPLICATE KEY UPDATE "
+                + ', '.join(f"{m} = {m} + VALUES({m})" for m in MEASURE_COLUMNS),
+                (low, high)
+            )
+
+    def rebuild(self):
+        """Recompute all summaries from the full fact table (first run, or after facts were changed)"""
+        for table, _, _ in AGGREGATES:
+            self.cursor.execute(f"DELETE FROM {table}")
+        self.last_key = self._max_usage_key()
+        self._fold_range(0, self.last_key)
+        logging.info(f"  aggregates rebuilt from {self.fact_table} (usage_key <= {self.last_key})")
+
+    def start(self):
+        """Remember the current end of the fact table; later folds only read rows past it"""
+        self.last_key = self._max_usage_key()
+
+    def fold(self):
+        """Fold fact rows inserted since the last fold/start into the summaries (no commit)"""
+        high = self._max_usage_key()
+        if high > self.last_key:
+            self._fold_range(self.last_key, high)
+            self.last_key = high
@@ -0,0 +1,83 @@
+"""Benchmark: fact loader strategies against a local MySQL/MariaDB.
+
+Loads synthetic fact rows into a scratch copy of fact_library_usage
+(bench_fact_library_usage, created with CREATE TABLE ... LIKE, so no
+triggers or foreign keys) with every strategy in fact_loader.py and
+prints rows/sec. The server needs local_infile=ON for load_data.
+
+    python 11_Benchmarks/bench_fact_loader.py --rows 500000 --batch-size 10000
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+import mysql.connector
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '04_ETL_Files'))
+
+from Etl_pipeline import LibraryETL          # noqa: E402
+from fact_loader import FACT_LOADERS, make_fact_loader   # noqa: E402
+
+SCRATCH = 'bench_fact_library_usage'
+
+
+def make_records(rows, seed=11):
+    rng = random.Random(seed)
+    purposes = ['Study', 'Group Project', 'Meeting']
+    records = []
+    for i in range(rows):
+        kind = i % 3
+        date_key = 20240101 + rng.randrange(0, 28) + 100 * rng.randrange(0, 12)
+        if kind == 0:
+            records.append((date_key, rng.randrange(1, 5000), 18, 1, None, None, 0, 1, 'Book Transaction', i))
+        elif kind == 1:
+            records.append((date_key, 1, 18, rng.randrange(2, 5), None, None,
+                            rng.randrange(0, 120), rng.randrange(0, 10), 'Digital Usage', i))
+        else:
+            records.append((date_key, rng.randrange(1, 5000), 18, None, f"R10{rng.randrange(1, 5)}", None,
+                            rng.choice([60, 90, 120, 180]), 0, rng.choice(purposes), i))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--user', default='root')
+    parser.add_argument('--password', default='')
+    parser.add_argument('--database', default='university library analytics')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    conn = mysql.connector.connect(host=args.host, user=args.user, password=args.password,
+                                   database=args.database, allow_local_infile=True)
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(f"DROP TABLE IF EXISTS {SCRATCH}")
+    cursor.execute(f"CREATE TABLE {SCRATCH} LIKE fact_library_usage")
+
+    records = make_records(args.rows)
+    print(f"rows: {len(records)}   batch size: {args.batch_size}")
+    try:
+        for name in FACT_LOADERS:
+            cursor.execute(f"TRUNCATE TABLE {SCRATCH}")
+            loader = make_fact_loader(name, conn, cursor, LibraryETL.FACT_COLUMNS,
+                                      table=SCRATCH, batch_size=args.batch_size)
+            start = time.perf_counter()
+            loader.load(records)
+            conn.commit()
+            secs = time.perf_counter() - start
+            print(f"{name:10s} {secs:8.2f} s  {len(records) / secs:12,.0f} rows/sec (incl. commit)")
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {SCRATCH}")
+        cursor.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
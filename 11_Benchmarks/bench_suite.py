@@ -0,0 +1,307 @@
+"""Benchmark suite: every ETL stage and analytics script on synthetic data.
+
+For each --rows size the three source files are generated with
+synthetic_data.py (mixed date formats, R-102 / Room103 rooms, the
+doubled-quote digital_usage layout, NULLs) and timed stage by stage:
+
+  offline    extract of each source, the columnar transform, fact tuple
+             conversion and the in-memory OlapCube operations. No database
+             is needed; the dimension maps are filled from the generated
+             members the way populate_dimensions() would.
+  database   with --database, a scratch database holding the schema from
+             03_Database_File is seeded with the synthetic book
+             transactions and the whole LibraryETL run is timed method by
+             method, followed by development_query, olap_operations (fact
+             and summary-table queries, in-memory cube) and pivot_views.
+             The fact and agg_usage_* tables of that database are emptied.
+             --duckdb runs the same stages against a throwaway in-memory
+             DuckDB stand-in (db_backend.py) instead of a MySQL server.
+
+Results go to <results-dir>/suite_<timestamp>.json; --compare prints the
+per-stage change against an earlier file and flags stages that got more
+than --threshold (and 5 ms) slower.
+
+    python 11_Benchmarks/bench_suite.py --rows 10000 100000 1000000
+    python 11_Benchmarks/bench_suite.py --rows 100000 --database library_bench --compare results/suite_old.json
+    python 11_Benchmarks/bench_suite.py --rows 100000 --duckdb
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE, '04_ETL_Files'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Etl_pipeline import LibraryETL        # noqa: E402  (also puts 05_Analytics_Package on sys.path)
+from staging_schema import STAGING_SCHEMAS, apply_schema  # noqa: E402
+from synthetic_data import DAYS, generate  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+REGRESSION_THRESHOLD = 0.10
+MIN_REGRESSION_SECONDS = 0.005    # smaller absolute changes are timer noise
+SEED_BATCH_ROWS = 10000
+
+# LibraryETL methods timed individually in the database run, in call order
+ETL_STAGES = ['connect_database', 'fix_dim_date_table', 'load_staging',
+              'populate_dimensions', 'populate_fact_usage']
+
+
+class StageTimer:
+    """Collects (name, seconds, rows) for one run"""
+
+    def __init__(self):
+        self.stages = []
+
+    def time(self, name, func, *args, rows=None, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.record(name, time.perf_counter() - start, rows)
+        return result
+
+    def record(self, name, seconds, rows=None):
+        self.stages.append({
+            'name':         name,
+            'seconds':      round(seconds, 6),
+            'rows':         rows,
+            'rows_per_sec': round(rows / seconds, 1) if rows and seconds > 0 else None,
+        })
+        per_sec = f"{rows / seconds:14,.0f} rows/sec" if rows and seconds > 0 else ''
+        print(f"  {name:40s} {seconds:9.3f} s {per_sec}")
+
+    def wrap(self, obj, name, label, rows=None):
+        """Replace obj.name with a timed version (per instance, or per class for classes)"""
+        func = getattr(obj, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(label, time.perf_counter() - start, rows)
+        setattr(obj, name, timed)
+        return func
+
+
+# -----------------------------
+# Offline stages
+# -----------------------------
+def make_offline_etl(df_books, df_rooms):
+    """LibraryETL with the dimension maps populate_dimensions() would build for these sources"""
+    etl = LibraryETL(dashboards_dir=None, date_formats_path=None)
+    etl.valid_date_keys = {int(d.strftime('%Y%m%d')) for d in DAYS}
+
+    students = set(df_books['StudentID']) | set(df_rooms['StudentID'])
+    students = sorted(s for s in students if s != 'NULL')
+    etl.student_id_to_key = {'UNKNOWN': 1, **{s: i + 2 for i, s in enumerate(students)}}
+    etl.valid_student_keys = set(etl.student_id_to_key.values())
+
+    etl.resource_id_to_key = {row[0]: i + 1 for i, row in enumerate(LibraryETL.RESOURCE_ROWS)}
+    etl.valid_resource_keys = set(etl.resource_id_to_key.values())
+    rooms = {etl.standardize_room(r) for r in df_rooms['RoomNumber'].astype(str).unique()}
+    etl.valid_room_keys = rooms | {'R-UNKNOWN'}
+    etl.department_name_to_key = {d: i + 1 for i, d in enumerate(etl.aliases.department.canonical_values)}
+    etl.default_department_key = etl.department_name_to_key['Unknown']
+    return etl
+
+
+def resource_frame():
+    return pd.DataFrame([(i + 1, row[3], row[2]) for i, row in enumerate(LibraryETL.RESOURCE_ROWS)],
+                        columns=['resource_key', 'resource_category', 'resource_type'])
+
+
+def run_offline(timer, paths, rows):
+    from olap_cube import OlapCube
+    from olap_operations import CUBE_OPERATIONS
+
+    reader = LibraryETL(dashboards_dir=None, date_formats_path=None)
+    df_books = timer.time('extract.book_transactions', lambda: apply_schema(
+        pd.read_csv(paths['book_transactions']), STAGING_SCHEMAS['book_transactions']), rows=rows)
+    df_digital, _ = timer.time('extract.digital_usage', reader.extract_digital,
+                               paths['digital_usage'], rows=rows)
+    df_rooms, _ = timer.time('extract.room_bookings', reader.extract_rooms,
+                             paths['room_bookings'], rows=rows)
+
+    etl = make_offline_etl(df_books, df_rooms)
+    skipped = {'no_date': 0, 'no_student': 0, 'no_resource': 0, 'no_room': 0}
+    frames = timer.time('transform.fact_frames', lambda: list(
+        etl.iter_fact_frames(df_books, df_digital, df_rooms, skipped)), rows=3 * rows)
+    facts = pd.concat(frames, ignore_index=True)
+    timer.time('transform.fact_records', lambda: [etl.fact_records(f) for f in frames], rows=len(facts))
+
+    cube = timer.time('analytics.cube_build', OlapCube.from_frames, facts, resource_frame(), rows=len(facts))
+    for name, operation in CUBE_OPERATIONS.items():
+        timer.time(f'analytics.cube.{name}', operation, cube, rows=len(facts))
+
+
+# -----------------------------
+# Database stages
+# -----------------------------
+RESET_TABLES = ['fact_library_usage', 'agg_usage_day', 'agg_usage_month', 'agg_usage_year']
+
+
+def seed_database(etl, books_path):
+    """Replace book_transactions with the synthetic rows and empty the fact/summary tables"""
+    cursor = etl.connection.cursor()
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cursor.execute("SHOW TABLES")
+    existing = {row[0] for row in cursor.fetchall()}
+    for table in ['book_transactions'] + RESET_TABLES:
+        if table in existing:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+    columns = list(STAGING_SCHEMAS['book_transactions'])
+    sql = (f"INSERT INTO book_transactions ({', '.join(columns)}) "
+           f"VALUES ({', '.join(['%s'] * len(columns))})")
+    for chunk in pd.read_csv(books_path, dtype=str, chunksize=SEED_BATCH_ROWS):
+        chunk = chunk[columns].astype(object)
+        cursor.executemany(sql, chunk.where(chunk.notna(), None).values.tolist())
+    etl.connection.commit()
+    cursor.close()
+
+
+def run_database(timer, paths, rows, database, dashboards_dir):
+    import development_query
+    import pivot_views
+    from dashboard_extract import DashboardExtract
+    from db_pool import get_connection, run_query
+    from olap_cube import OlapCube
+    from olap_operations import AGGREGATE_QUERIES, OPERATIONS
+
+    etl = LibraryETL(db_config={'database': database}, dashboards_dir=dashboards_dir,
+                     date_formats_path=None)
+    etl.connect_database()
+    timer.time('setup.seed_book_transactions', seed_database, etl, paths['book_transactions'], rows=rows)
+    etl.close_database()
+
+    for name in ETL_STAGES:
+        timer.wrap(etl, name, f'etl.{name}', rows=3 * rows if name == 'populate_fact_usage' else None)
+    run = timer.wrap(DashboardExtract, 'run', 'etl.dashboard_extract')
+    try:
+        timer.time('etl.run_etl', etl.run_etl, paths['digital_usage'], paths['room_bookings'], rows=3 * rows)
+    finally:
+        DashboardExtract.run = run
+
+    timer.time('analytics.development_query', development_query.run_reports, cache=None)
+    conn = get_connection()
+    try:
+        for name, _, query in OPERATIONS:
+            timer.time(f'analytics.olap.{name}', run_query, query, conn=conn)
+            timer.time(f'analytics.olap_agg.{name}', run_query, AGGREGATE_QUERIES[name], conn=conn)
+        timer.time('analytics.olap_cube.from_database', OlapCube.from_database, conn=conn, rows=3 * rows)
+        cells = timer.time('analytics.pivot_views.query_cells', run_query, pivot_views.query_cells, conn=conn)
+        for name, _, index, columns in pivot_views.PIVOTS:
+            timer.time(f'analytics.pivot_views.{name}', pivot_views.build_pivot, cells, index, columns)
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# Results
+# -----------------------------
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path, threshold):
+    """Print per-stage deltas against an earlier result file; returns the regressed stage names"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    before = {(run['rows'], s['name']): s['seconds'] for run in baseline['runs'] for s in run['stages']}
+
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('git_commit')}):")
+    regressions = []
+    for run in current['runs']:
+        for stage in run['stages']:
+            old = before.get((run['rows'], stage['name']))
+            if not old or stage['seconds'] <= 0:
+                continue
+            change = stage['seconds'] / old - 1
+            flag = ''
+            if change > threshold and stage['seconds'] - old > MIN_REGRESSION_SECONDS:
+                flag = '  REGRESSION'
+                regressions.append(f"{stage['name']} @ {run['rows']} rows")
+            print(f"  {run['rows']:>10,} {stage['name']:40s} {old:9.3f} -> {stage['seconds']:9.3f} s "
+                  f"{change:+7.1%}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) more than {threshold:.0%} slower")
+    else:
+        print("\nNo regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000],
+                        help="rows per source file; one run per size (10k to 10M)")
+    parser.add_argument('--data-dir', default=None,
+                        help="where the synthetic files are written (default: a temporary directory)")
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--database', default=None,
+                        help="scratch database for the ETL/analytics stages (its fact tables are emptied)")
+    parser.add_argument('--duckdb', action='store_true',
+                        help="run the ETL/analytics stages on an in-memory DuckDB instead of MySQL")
+    parser.add_argument('--compare', default=None, help="earlier suite_*.json to compare against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown reported as a regression")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.duckdb:
+        os.environ['LIBRARY_DB_BACKEND'] = 'duckdb'
+        os.environ['LIBRARY_DB_PATH'] = ':memory:'
+        args.database = args.database or 'duckdb'
+    if args.database:
+        # run_query / run_reports connect through db_pool's environment settings
+        os.environ['LIBRARY_DB_NAME'] = args.database
+
+    result = {
+        'suite':      'library_etl',
+        'started':    datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python':     platform.python_version(),
+        'platform':   platform.platform(),
+        'seed':       args.seed,
+        'database':   args.database,
+        'backend':    'duckdb' if args.duckdb else 'mysql',
+        'runs':       [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix='library_bench_') as tmp:
+        for rows in args.rows:
+            data_dir = os.path.join(args.data_dir or tmp, f'rows_{rows}')
+            print(f"\n== {rows:,} rows per source ==")
+            timer = StageTimer()
+            paths = timer.time('setup.generate', generate, data_dir, rows, seed=args.seed, rows=3 * rows)
+            run_offline(timer, paths, rows)
+            if args.database:
+                run_database(timer, paths, rows, args.database, os.path.join(tmp, 'dashboards'))
+            result['runs'].append({'rows': rows, 'stages': timer.stages})
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    out = os.path.join(args.results_dir, f"suite_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        compare(result, args.compare, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Synthetic source files in the same messy formats as 09_Source_Data.
+
+    book_transactions.csv   every field quoted, NULL unquoted, ISO dates
+    digital_usage.csv       the semicolon / doubled-quote layout, dates as
+                            01/15/2024, 2024-01-20 or Jan 25, 2024,
+                            NULL durations
+    room_bookings.csv       rooms as R101 / R-102 / Room103, dates as
+                            2024-01-15, 15-Jan-2024 or Jan 20, 2024,
+                            NULL students
+
+Rows are generated with NumPy and written in chunks, so 10M-row files
+need only a chunk's worth of memory.
+
+    python 11_Benchmarks/synthetic_data.py --rows 1000000 --out-dir /tmp/library_1m
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 250000
+START_DATE = '2023-01-01'
+END_DATE   = '2024-12-31'
+
+DEPARTMENTS     = ['CS', 'Computer Science', 'CompSci', 'ENG', 'Engineering', 'Engr', 'BUS', 'Business',
+                   'BSNS', 'MATH', 'Mathematics', 'Math', 'Physics', 'PHY', 'PHYS', 'Chemistry', 'CHEM', 'Chem']
+BOOK_CATEGORIES = ['Textbook', 'Reference', 'Fiction']
+USER_TYPES      = ['Student', 'Grad Student', 'Faculty', 'Staff']
+RESOURCE_TYPES  = ['E-book', 'e-Book', 'Journal', 'Article']
+TIME_SLOTS      = ['Morning', '8AM-10AM', 'AM', 'Afternoon', '2PM-4PM', 'PM', 'Evening', '6PM-8PM', 'Night']
+PURPOSES        = ['Study', 'Group Project', 'Meeting']
+DURATION_HOURS  = ['1.0', '1.5', '2.0', '2.5', '3.0']
+
+DIGITAL_DATE_FORMATS = ['%m/%d/%Y', '%Y-%m-%d', '%b %d, %Y']
+ROOM_DATE_FORMATS    = ['%Y-%m-%d', '%d-%b-%Y', '%b %d, %Y']
+ROOM_PREFIXES        = ['R', 'R-', 'Room']
+
+
+DAYS = pd.date_range(START_DATE, END_DATE, freq='D')
+
+
+def _date_table(formats, extra_days=0):
+    """Every calendar day (plus `extra_days` past END_DATE) rendered in each format: shape (formats, days)"""
+    days = pd.date_range(START_DATE, periods=len(DAYS) + extra_days, freq='D')
+    return np.array([days.strftime(fmt) for fmt in formats], dtype=object)
+
+
+def _dates(rng, n, formats):
+    """(n random dates each rendered in one of `formats`, their day offsets from START_DATE)"""
+    day = rng.integers(0, len(DAYS), n)
+    return _date_table(formats)[rng.integers(0, len(formats), n), day], day
+
+
+def _choice(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def _students(rng, n, students):
+    return _join('STU-2024-', np.char.zfill(rng.integers(1, students + 1, n).astype(str), 5))
+
+
+def _nulls(rng, values, rate):
+    values = values.copy()
+    values[rng.random(len(values)) < rate] = None
+    return values
+
+
+def _join(*parts):
+    """Element-wise string concatenation of arrays and scalars (NumPy string ufuncs)"""
+    line = np.asarray(parts[0]).astype(str)
+    for part in parts[1:]:
+        line = np.char.add(line, np.asarray(part).astype(str))
+    return line
+
+
+def _lines(line):
+    return '\n'.join(line.tolist()) + '\n'
+
+
+def _quoted_csv(columns, data):
+    """Lines in the 09_Source_Data CSV style: "value" for every field, bare NULL for nulls"""
+    fields = []
+    for c in columns:
+        values = np.asarray(data[c], dtype=object)
+        fields.append(np.where(pd.isna(values), 'NULL', _join('"', values, '"')))
+    parts = [fields[0]]
+    for f in fields[1:]:
+        parts += [',', f]
+    return _lines(_join(*parts))
+
+
+def write_books(path, rows, rng, students, null_rate):
+    columns = ['TransactionID', 'StudentID', 'BookISBN', 'CheckoutDate', 'ReturnDate', 'Department', 'BookCategory']
+    isbns = np.array([f"978-{rng.integers(10 ** 9, 10 ** 10)}" for _ in range(500)], dtype=object)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(f'"{c}"' for c in columns) + '\n')
+        for start in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - start)
+            checkout, day = _dates(rng, n, ['%Y-%m-%d'])
+            returned = _date_table(['%Y-%m-%d'], extra_days=45)[0, day + rng.integers(7, 45, n)]
+            f.write(_quoted_csv(columns, {
+                'TransactionID': np.arange(1001 + start, 1001 + start + n),
+                'StudentID':     _students(rng, n, students),
+                'BookISBN':      isbns[rng.integers(0, len(isbns), n)],
+                'CheckoutDate':  checkout,
+                'ReturnDate':    _nulls(rng, returned, max(null_rate, 0.2)),
+                'Department':    _choice(rng, DEPARTMENTS, n),
+                'BookCategory':  _choice(rng, BOOK_CATEGORIES, n),
+            }))
+
+
+def write_digital(path, rows, rng, null_rate):
+    header = ['Date', 'UserType', 'ResourceType', 'Faculty', 'DownloadCount', 'Duration_Minutes']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('"' + header[0] + ';' + ';'.join(f'""{c}""' for c in header[1:]) + '"\n')
+        for start in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - start)
+            dates, _ = _dates(rng, n, DIGITAL_DATE_FORMATS)
+            duration = np.where(rng.random(n) < max(null_rate, 0.3), 'NULL"',
+                                _join('""', rng.integers(10, 120, n), '"""'))
+            f.write(_lines(_join('"', dates,
+                                 ';""', _choice(rng, USER_TYPES, n),
+                                 '"";""', _choice(rng, RESOURCE_TYPES, n),
+                                 '"";""', _choice(rng, DEPARTMENTS, n),
+                                 '"";""', rng.integers(1, 11, n),
+                                 '"";', duration)))
+
+
+def write_rooms(path, rows, rng, students, rooms, null_rate):
+    columns = ['BookingID', 'RoomNumber', 'BookingDate', 'TimeSlot', 'StudentID', 'DurationHours', 'Purpose']
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(f'"{c}"' for c in columns) + '\n')
+        for start in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - start)
+            room = _join(np.asarray(ROOM_PREFIXES)[rng.integers(0, len(ROOM_PREFIXES), n)],
+                         rng.integers(101, 101 + rooms, n))
+            dates, _ = _dates(rng, n, ROOM_DATE_FORMATS)
+            f.write(_quoted_csv(columns, {
+                'BookingID':     np.arange(5001 + start, 5001 + start + n),
+                'RoomNumber':    room,
+                'BookingDate':   dates,
+                'TimeSlot':      _choice(rng, TIME_SLOTS, n),
+                'StudentID':     _nulls(rng, _students(rng, n, students), max(null_rate, 0.15)),
+                'DurationHours': _choice(rng, DURATION_HOURS, n),
+                'Purpose':       _choice(rng, PURPOSES, n),
+            }))
+
+
+def generate(out_dir, rows, seed=42, students=5000, rooms=40, null_rate=0.05):
+    """Write the three source files with `rows` rows each; returns {source: path}"""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = {
+        'book_transactions': os.path.join(out_dir, 'book_transactions.csv'),
+        'digital_usage':     os.path.join(out_dir, 'digital_usage.csv'),
+        'room_bookings':     os.path.join(out_dir, 'room_bookings.csv'),
+    }
+    write_books(paths['book_transactions'], rows, rng, students, null_rate)
+    write_digital(paths['digital_usage'], rows, rng, null_rate)
+    write_rooms(paths['room_bookings'], rows, rng, students, rooms, null_rate)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000, help='rows per source file')
+    parser.add_argument('--out-dir', required=True)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--rooms', type=int, default=40)
+    args = parser.parse_args()
+
+    for source, path in generate(args.out_dir, args.rows, args.seed, args.students, args.rooms).items():
+        print(f"{source:18s} {path}  ({os.path.getsize(path) / 1024 ** 2:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()